@@ -0,0 +1,147 @@
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from database import Post, Comment, ActivityRollup, get_insert
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_RANGES = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+ACTIVITY_BUCKETS = {
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "1d": timedelta(days=1),
+}
+# Used when the request names a range but no bucket
+DEFAULT_BUCKETS = {"24h": "1h", "7d": "6h", "30d": "1d"}
+GLOBAL_SCOPE = ""
+EPOCH = datetime(1970, 1, 1)
+
+
+def hour_start(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def count_rows(counts, created_at, submolt_id, column):
+    if created_at is None:
+        return
+    bucket = hour_start(created_at)
+    counts[(bucket, GLOBAL_SCOPE)][column] += 1
+    if submolt_id:
+        counts[(bucket, submolt_id)][column] += 1
+
+
+def add_counts(db: Session, counts):
+    """Add {(bucket_start, scope): {"posts": n, "comments": n}} to the rollup. Does not commit."""
+    rows = [{"bucket_start": bucket, "scope": scope, "posts": c["posts"], "comments": c["comments"]}
+            for (bucket, scope), c in counts.items()]
+    if not rows:
+        return 0
+
+    insert = get_insert(db)
+    if insert is None:
+        for row in rows:
+            existing = db.get(ActivityRollup, (row["bucket_start"], row["scope"]))
+            if existing is None:
+                db.add(ActivityRollup(**row))
+            else:
+                existing.posts += row["posts"]
+                existing.comments += row["comments"]
+        db.flush()
+        return len(rows)
+
+    table = ActivityRollup.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket_start", "scope"],
+        set_={"posts": table.c.posts + stmt.excluded.posts, "comments": table.c.comments + stmt.excluded.comments},
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def record_activity(db: Session, new_posts, new_comments, post_submolts):
+    """
+    Count newly seen posts and comments (ingest row dicts) into their hour.
+    post_submolts maps post id -> submolt id for scoping comments. Does not commit.
+    """
+    counts = defaultdict(lambda: {"posts": 0, "comments": 0})
+    for row in new_posts:
+        count_rows(counts, row.get("created_at"), row.get("submolt_id"), "posts")
+    for row in new_comments:
+        count_rows(counts, row.get("created_at"), post_submolts.get(row.get("post_id")), "comments")
+    return add_counts(db, counts)
+
+
+def rebuild_activity(db: Session):
+    """Recount the rollup from the rows still in the database. Does not commit."""
+    db.query(ActivityRollup).delete(synchronize_session=False)
+    post_submolts = dict(db.query(Post.id, Post.submolt_id).all())
+    posts = [{"created_at": created_at, "submolt_id": submolt_id}
+             for created_at, submolt_id in db.query(Post.created_at, Post.submolt_id).all()]
+    comments = [{"created_at": created_at, "post_id": post_id}
+                for created_at, post_id in db.query(Comment.created_at, Comment.post_id).all()]
+    return record_activity(db, posts, comments, post_submolts)
+
+
+def init_activity(db: Session):
+    """Backfill the rollup for databases that predate it."""
+    if db.query(ActivityRollup.bucket_start).first() is None and db.query(Post.id).first() is not None:
+        rebuild_activity(db)
+        db.commit()
+        logger.info("Activity rollup backfilled from existing posts and comments")
+
+
+def bucket_label(start, range_name, bucket_name):
+    if bucket_name == "1d":
+        return start.strftime("%Y-%m-%d")
+    if range_name == "24h":
+        # Same labels the 24h chart has always used
+        return start.strftime("%H:00")
+    return start.strftime("%m-%d %H:00")
+
+
+def activity_series(db: Session, range_name="24h", bucket_name=None, scope=GLOBAL_SCOPE, now=None):
+    """
+    Oldest-first [{time, start, count, comments}] covering range_name in
+    bucket_name steps, from the bucket that contains now - range to the one
+    that contains now (both usually partial). Reads at most one rollup row
+    per hour in those buckets.
+    """
+    bucket_name = bucket_name or DEFAULT_BUCKETS[range_name]
+    span = ACTIVITY_RANGES[range_name]
+    step = ACTIVITY_BUCKETS[bucket_name]
+    if step > span or span % step:
+        raise ValueError(f"bucket={bucket_name} does not evenly divide range={range_name}")
+
+    now = now or datetime.utcnow()
+    # Buckets are aligned to the epoch, so 6h buckets start at 00/06/12/18 UTC and days at midnight
+    end = EPOCH + ((now - EPOCH) // step + 1) * step
+    start = EPOCH + ((now - span - EPOCH) // step) * step
+
+    series = []
+    for i in range((end - start) // step):
+        bucket_start = start + i * step
+        series.append({
+            "time": bucket_label(bucket_start, range_name, bucket_name),
+            "start": bucket_start.isoformat(),
+            "count": 0,
+            "comments": 0,
+        })
+
+    rows = db.query(ActivityRollup.bucket_start, ActivityRollup.posts, ActivityRollup.comments).filter(
+        ActivityRollup.scope == scope,
+        ActivityRollup.bucket_start >= start,
+        ActivityRollup.bucket_start < end,
+    ).all()
+    for bucket_start, posts, comments in rows:
+        entry = series[(bucket_start - start) // step]
+        entry["count"] += posts
+        entry["comments"] += comments
+    return series
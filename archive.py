@@ -0,0 +1,254 @@
+from sqlalchemy.orm import Session, aliased
+from database import Post, Comment, Author, Submolt
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+import time
+import uuid
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Optional; without it pruned rows are deleted without being archived
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "1") != "0"
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+# A day partition with more part files than this is rewritten as one file
+ARCHIVE_COMPACT_PARTS = int(os.getenv("ARCHIVE_COMPACT_PARTS", "8"))
+ARCHIVE_MAX_LIMIT = 500
+
+if pa is not None:
+    SCHEMAS = {
+        "posts": pa.schema([
+            ("id", pa.string()),
+            ("title", pa.string()),
+            ("content", pa.string()),
+            ("type", pa.string()),
+            ("author_id", pa.string()),
+            ("author_name", pa.string()),
+            ("submolt_id", pa.string()),
+            ("submolt_name", pa.string()),
+            ("upvotes", pa.int64()),
+            ("downvotes", pa.int64()),
+            ("score", pa.int64()),
+            ("comment_count", pa.int64()),
+            ("created_at", pa.timestamp("us")),
+            ("archived_at", pa.timestamp("us")),
+        ]),
+        "comments": pa.schema([
+            ("id", pa.string()),
+            ("post_id", pa.string()),
+            ("parent_id", pa.string()),
+            ("author_id", pa.string()),
+            ("author_name", pa.string()),
+            ("content", pa.string()),
+            ("upvotes", pa.int64()),
+            ("created_at", pa.timestamp("us")),
+            ("archived_at", pa.timestamp("us")),
+        ]),
+    }
+    # Hive-style directories (posts/day=2026-01-31/part-*.parquet) so a date filter skips whole days
+    PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+
+write_lock = threading.Lock()
+
+
+def archive_available():
+    return pa is not None and ARCHIVE_ENABLED
+
+
+def table_dir(kind):
+    return os.path.join(ARCHIVE_DIR, kind)
+
+
+def day_of(value, fallback):
+    return (value or fallback).strftime("%Y-%m-%d")
+
+
+def write_parts(kind, rows):
+    """
+    Append rows as one new Parquet file per day partition. Files are written
+    under a '.' name and renamed into place, so readers never see a partial file.
+    """
+    by_day = {}
+    archived_at = datetime.utcnow()
+    for row in rows:
+        row["archived_at"] = archived_at
+        by_day.setdefault(day_of(row["created_at"], archived_at), []).append(row)
+
+    with write_lock:
+        for day, day_rows in by_day.items():
+            day_rows.sort(key=lambda r: (r["created_at"] or archived_at, r["id"]))
+            directory = os.path.join(table_dir(kind), f"day={day}")
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+            temp = os.path.join(directory, f".{name}")
+            pq.write_table(pa.Table.from_pylist(day_rows, schema=SCHEMAS[kind]), temp, compression=ARCHIVE_COMPRESSION)
+            os.replace(temp, os.path.join(directory, name))
+            compact_day(kind, day)
+    return len(by_day)
+
+
+def compact_day(kind, day):
+    """Rewrite a day partition as one sorted file once it has accumulated too many parts."""
+    directory = os.path.join(table_dir(kind), f"day={day}")
+    parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet") and not f.startswith("."))
+    if len(parts) <= ARCHIVE_COMPACT_PARTS:
+        return
+    table = pa.concat_tables([pq.read_table(os.path.join(directory, f), schema=SCHEMAS[kind]) for f in parts])
+    table = table.sort_by([("created_at", "ascending"), ("id", "ascending")])
+    name = f"part-{time.time_ns()}-compacted.parquet"
+    temp = os.path.join(directory, f".{name}")
+    pq.write_table(table, temp, compression=ARCHIVE_COMPRESSION)
+    os.replace(temp, os.path.join(directory, name))
+    for f in parts:
+        os.remove(os.path.join(directory, f))
+
+
+def archive_posts(db: Session, post_ids, comment_ids=()):
+    """
+    Write the given posts and comments (about to be deleted) to the archive.
+    Raises on failure so the caller keeps the rows. Returns rows written.
+    """
+    if not archive_available() or (not post_ids and not comment_ids):
+        return 0
+    comment_author = aliased(Author)
+    posts = [{
+        "id": p.id, "title": p.title, "content": p.content, "type": p.type,
+        "author_id": p.author_id, "author_name": author_name,
+        "submolt_id": p.submolt_id, "submolt_name": submolt_name,
+        "upvotes": p.upvotes, "downvotes": p.downvotes, "score": p.score,
+        "comment_count": p.comment_count, "created_at": p.created_at,
+    } for p, author_name, submolt_name in db.query(Post, Author.name, Submolt.name).outerjoin(
+        Author, Post.author_id == Author.id
+    ).outerjoin(Submolt, Post.submolt_id == Submolt.id).filter(Post.id.in_(list(post_ids))).all()] if post_ids else []
+    comments = []
+    comment_ids = list(comment_ids)
+    for i in range(0, len(comment_ids), 500):
+        comments.extend({
+            "id": c.id, "post_id": c.post_id, "parent_id": c.parent_id, "author_id": c.author_id,
+            "author_name": author_name, "content": c.content, "upvotes": c.upvotes, "created_at": c.created_at,
+        } for c, author_name in db.query(Comment, comment_author.name).outerjoin(
+            comment_author, Comment.author_id == comment_author.id
+        ).filter(Comment.id.in_(comment_ids[i:i + 500])).all())
+    if posts:
+        write_parts("posts", posts)
+    if comments:
+        write_parts("comments", comments)
+    return len(posts) + len(comments)
+
+
+def open_dataset(kind):
+    directory = table_dir(kind)
+    if not os.path.isdir(directory):
+        return None
+    return ds.dataset(directory, format="parquet", partitioning=PARTITIONING, schema=SCHEMAS[kind].append(pa.field("day", pa.string())))
+
+
+def naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def archive_filter(kind, start=None, end=None, submolt=None, author=None, post_id=None):
+    """Partition predicate on day plus row predicates that Parquet statistics can skip row groups with."""
+    start, end = naive_utc(start), naive_utc(end)
+    conditions = []
+    if start is not None:
+        conditions += [ds.field("day") >= start.strftime("%Y-%m-%d"), ds.field("created_at") >= pa.scalar(start, pa.timestamp("us"))]
+    if end is not None:
+        conditions += [ds.field("day") <= end.strftime("%Y-%m-%d"), ds.field("created_at") < pa.scalar(end, pa.timestamp("us"))]
+    if submolt and kind == "posts":
+        conditions.append((ds.field("submolt_name") == submolt) | (ds.field("submolt_id") == submolt))
+    if author:
+        conditions.append((ds.field("author_name") == author) | (ds.field("author_id") == author))
+    if post_id and kind == "comments":
+        conditions.append(ds.field("post_id") == post_id)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def query_archive(kind, start=None, end=None, submolt=None, author=None, post_id=None, limit=100, offset=0, retries=1):
+    """
+    Newest-first page of archived rows. The first pass reads only (id,
+    created_at, archived_at) for the matching partitions; full rows, text
+    included, are read just for the page being returned.
+    """
+    dataset = open_dataset(kind)
+    if dataset is None:
+        return {"items": [], "partitions_scanned": 0, "files_scanned": 0}
+    expression = archive_filter(kind, start, end, submolt, author, post_id)
+    try:
+        fragments = list(dataset.get_fragments(filter=expression))
+        keys = dataset.to_table(columns=["id", "created_at", "archived_at", "day"], filter=expression)
+        # The same row can be archived twice (a retention run that failed after writing); keep the newest copy
+        keys = keys.sort_by([("created_at", "descending"), ("id", "descending"), ("archived_at", "descending")])
+        # Only the head of the sorted keys becomes Python objects; widen it if duplicates were dropped
+        wanted_rows = offset + limit
+        head = wanted_rows
+        while True:
+            page, seen = [], set()
+            for row in keys.slice(0, head).to_pylist():
+                if row["id"] not in seen:
+                    seen.add(row["id"])
+                    page.append(row)
+            if len(page) >= wanted_rows or head >= keys.num_rows:
+                break
+            head *= 2
+        page = page[offset:wanted_rows]
+        if not page:
+            items = []
+        else:
+            days = sorted({row["day"] for row in page})
+            wanted = pa.array([row["id"] for row in page], pa.string())
+            rows = dataset.to_table(filter=ds.field("day").isin(days) & ds.field("id").isin(wanted)).to_pylist()
+            latest = {}
+            for row in rows:
+                current = latest.get(row["id"])
+                if current is None or row["archived_at"] > current["archived_at"]:
+                    latest[row["id"]] = row
+            items = []
+            for key in page:
+                row = latest.get(key["id"])
+                if row is not None:
+                    row.pop("day", None)
+                    items.append(row)
+    except FileNotFoundError:
+        # A compaction replaced files between listing and reading; the new listing is consistent
+        if retries <= 0:
+            raise
+        return query_archive(kind, start, end, submolt, author, post_id, limit, offset, retries - 1)
+    return {
+        "items": items,
+        "partitions_scanned": len({os.path.dirname(f.path) for f in fragments}),
+        "files_scanned": len(fragments),
+    }
+
+
+def archive_stats():
+    stats = {"available": archive_available(), "dir": ARCHIVE_DIR}
+    for kind in ("posts", "comments"):
+        directory = table_dir(kind)
+        days, files, size = set(), 0, 0
+        if os.path.isdir(directory):
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if name.endswith(".parquet") and not name.startswith("."):
+                        days.add(os.path.basename(root))
+                        files += 1
+                        size += os.path.getsize(os.path.join(root, name))
+        stats[kind] = {"partitions": len(days), "files": files, "bytes": size}
+    return stats
+
+
+if pa is None and ARCHIVE_ENABLED:
+    logger.warning("pyarrow is not installed; pruned posts will not be archived")
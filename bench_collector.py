@@ -0,0 +1,214 @@
+"""
+End-to-end collector load test: the real CollectorRuntime and translation
+queue against the local mock upstream (mock_moltbook.py) and a fake
+translator.
+
+    python bench_collector.py [--seconds 60] [--interval 5] [--post-rate 2] [--backlog 100]
+                              [--page-size 25] [--content-chars 800] [--comments 0]
+                              [--latency 0.1] [--error-rate 0] [--error-codes 500,502,503]
+                              [--rate-limit 0] [--translate-latency 0.3] [--translate-error-rate 0]
+
+The mock runs as a subprocess on a free local port; the collector, the
+translation drain and a sampler share this process, as they do in the
+web app. Reported: ingest lag (first seen in the database minus the
+post's publish time, for posts published during the run), posts collected
+versus published, sync runs/failures/skipped ticks, rows written per
+second of DB time and per second of wall time, requests the mock served
+(errors, 429s), and the translation backlog (pending + running jobs) over
+the run. TRANSLATION_RATE / TRANSLATION_WORKERS apply as usual, so the
+backlog shows whether the translator keeps up with the post rate.
+
+After --seconds the mock stops publishing and the collector gets up to
+--catch-up more sync intervals to fetch what it still owes. Every post
+published after the collector started must then be in the database: if
+fewer than --min-collected of them are (default all), the run fails with
+exit status 1, so lost posts (e.g. the cursor skipping a failed page)
+don't go unnoticed.
+
+Runs against a throwaway SQLite file unless DATABASE_URL is already set,
+in which case the database must not have posts yet.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_collector.db"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+# Read by feed_client at import time
+os.environ["MOLTBOOK_API_BASE"] = f"http://127.0.0.1:{PORT}"
+
+import requests
+from database import SessionLocal, Post, Translation
+from collector import init_storage
+from collector_runtime import CollectorRuntime
+from mock_moltbook import FakeTranslator
+from translation_queue import drain_translation_queue, queue_stats
+import translator
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def start_mock(args):
+    command = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_moltbook.py"),
+        "--port", str(PORT), "--post-rate", str(args.post_rate), "--backlog", str(args.backlog),
+        "--page-size", str(args.page_size), "--content-chars", str(args.content_chars),
+        "--comments", str(args.comments), "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+        "--error-codes", args.error_codes, "--rate-limit", str(args.rate_limit),
+    ]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{PORT}/mock/stats", timeout=1).raise_for_status()
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Mock upstream did not start")
+
+
+def mock_call(method, path):
+    return requests.request(method, f"http://127.0.0.1:{PORT}{path}", timeout=5).json()
+
+
+def sample(seen, lags, since):
+    """Record the lag of posts that appeared since the last sample; returns the translation backlog."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for post_id, created_at in db.query(Post.id, Post.created_at).filter(Post.id.like("mock-p%")).all():
+            if post_id in seen:
+                continue
+            seen.add(post_id)
+            # Backlog posts were published before the run; their lag says nothing about the collector
+            if created_at is not None and created_at >= since:
+                lags.append((now - created_at).total_seconds())
+        stats = queue_stats(db)
+    return stats.get("pending", 0) + stats.get("running", 0)
+
+
+def translate_loop(stop):
+    # Stands in for the scheduler job; back to back while there is work, like `collector.py`'s inline drain
+    while not stop.is_set():
+        if not drain_translation_queue():
+            stop.wait(1)
+
+
+async def run(args):
+    runtime = CollectorRuntime(interval=args.interval, jitter=0, mode="always", retention_interval=0)
+    since = datetime.utcnow()
+    seen, lags, backlog = set(), [], []
+    stop = threading.Event()
+    drainer = threading.Thread(target=translate_loop, args=(stop,), daemon=True)
+    loop = asyncio.get_running_loop()
+
+    # Posts from this index on are published while the collector runs, so it must end up with all of them
+    first = (await loop.run_in_executor(None, mock_call, "GET", "/mock/stats"))["published"]
+    started = time.monotonic()
+    runtime.start()
+    drainer.start()
+    while time.monotonic() - started < args.seconds:
+        await asyncio.sleep(args.sample_interval)
+        backlog.append(await loop.run_in_executor(None, sample, seen, lags, since))
+    elapsed = time.monotonic() - started
+
+    last = (await loop.run_in_executor(None, mock_call, "POST", "/mock/pause"))["published"]
+    expected = {f"mock-p{i}" for i in range(first, last)}
+    deadline = time.monotonic() + args.catch_up * args.interval
+    while not expected <= seen and time.monotonic() < deadline:
+        await asyncio.sleep(args.sample_interval)
+        backlog.append(await loop.run_in_executor(None, sample, seen, lags, since))
+    await runtime.stop()
+    stop.set()
+    drainer.join()
+    backlog.append(await loop.run_in_executor(None, sample, seen, lags, since))
+    return runtime.status(), seen, expected, lags, backlog, elapsed
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--interval", type=float, default=5, help="collector sync interval")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--post-rate", type=float, default=2)
+    parser.add_argument("--backlog", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--content-chars", type=int, default=800)
+    parser.add_argument("--comments", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-codes", default="500,502,503")
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--translate-latency", type=float, default=0.3)
+    parser.add_argument("--translate-error-rate", type=float, default=0)
+    parser.add_argument("--catch-up", type=int, default=10, help="sync intervals allowed to catch up at the end")
+    parser.add_argument("--min-collected", type=float, default=1.0,
+                        help="share of posts published during the run that must be collected")
+    parser.add_argument("--verbose", action="store_true", help="keep the collector's INFO logs")
+    args = parser.parse_args()
+
+    init_storage()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    with SessionLocal() as db:
+        if db.query(Post.id).first() is not None:
+            raise SystemExit("Database already has posts; point DATABASE_URL at an empty database")
+
+    fake = FakeTranslator(args.translate_latency, args.translate_error_rate)
+    # translation_queue calls translator.google_translate through the module, so this reaches the workers
+    translator.google_translate = fake
+    mock = start_mock(args)
+    try:
+        status, seen, expected, lags, backlog, elapsed = asyncio.run(run(args))
+        upstream = mock_call("GET", "/mock/stats")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    with SessionLocal() as db:
+        translations = db.query(Translation).filter(Translation.entity_id.like("mock-%")).count()
+    rows, write_seconds = status["rows_written"], status["write_seconds"]
+    print(f"run               {elapsed:.1f}s, sync every {args.interval}s, {args.post_rate} posts/s published")
+    collected = len(expected & seen) / len(expected) if expected else 1.0
+    print(f"posts             {len(expected & seen)} of {len(expected)} published during the run collected "
+          f"({collected:.1%}); {len(seen)} in total, {upstream['backlog']} backlog")
+    print(f"ingest lag        p50 {percentile(lags, 0.5):.2f}s  p95 {percentile(lags, 0.95):.2f}s  "
+          f"max {max(lags, default=0):.2f}s  ({len(lags)} posts published during the run)")
+    print(f"syncs             {status['runs']} runs, {status['failures']} failed, {status['skipped_ticks']} skipped ticks, "
+          f"{status['not_modified']} not modified")
+    print(f"rows written      {rows}, {rows / write_seconds if write_seconds else 0:.0f} rows/s of DB time, "
+          f"{rows / elapsed:.1f} rows/s of wall time")
+    print(f"upstream          {upstream['requests']} requests, {upstream['errors']} errors, "
+          f"{upstream['rate_limited']} rate limited, {upstream['posts_served']} posts served")
+    print(f"translations      {translations} stored, {fake.calls} translator calls ({fake.failures} failed)")
+    print(f"translation queue backlog max {max(backlog, default=0)}, at end {backlog[-1] if backlog else 0}")
+    if collected < args.min_collected:
+        missing = sorted(expected - seen, key=lambda post_id: int(post_id[len("mock-p"):]))
+        print(f"FAIL {len(missing)} posts never collected, e.g. {', '.join(missing[:5])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_()
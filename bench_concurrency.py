@@ -0,0 +1,134 @@
+"""
+API read latency while the collector is writing, per SQLite storage mode.
+
+    python bench_concurrency.py [--copies 100] [--readers 4] [--seconds 10]
+
+Each mode runs in its own process against a throwaway SQLite file:
+"legacy" is one shared engine with SQLite's defaults (rollback journal),
+"wal" is the write-ahead log with a dedicated writer connection and a
+read-only pool (see database.py). Readers page the feed for a while on
+their own ("idle"), then again while a writer thread keeps re-syncing
+every post with new scores ("sync"). Reported: read p50/p99/max, reads
+that failed ("database is locked") and the mean sync time. Readers and
+writer share one interpreter, so a sync is slower when reads actually
+get to run alongside it (compare with --readers 0).
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+MODES = ("legacy", "wal")
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run_mode(args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_concurrency.db"
+    os.environ["SQLITE_MODE"] = args.mode
+    from database import SessionLocal, ReadSessionLocal, init_db, storage_info
+    from ingest import save_posts
+    import main
+
+    posts = json.load(open("api_response_posts.json", encoding="utf-8"))["posts"]
+    now = datetime.utcnow()
+    batch = []
+    for i in range(args.copies):
+        for j, p in enumerate(posts):
+            p = copy.deepcopy(p)
+            p["id"] = f"{p['id']}-{i}"
+            p["created_at"] = (now - timedelta(minutes=7 * (i * len(posts) + j))).isoformat() + "Z"
+            for c in p.get("comments", []) or []:
+                c["id"] = f"{c['id']}-{i}"
+            batch.append(p)
+
+    init_db()
+    with SessionLocal() as db:
+        save_posts(db, batch, is_offline=True)
+        db.commit()
+
+    def reader(stop, latencies, errors):
+        sorts = ("new", "top", "hot")
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with ReadSessionLocal() as db:
+                    main.get_posts_page(db, random.choice(sorts), 100, None, "", None, 300)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors.append(time.perf_counter() - started)
+
+    def writer(stop, durations):
+        while not stop.is_set():
+            for p in batch:
+                p["score"] = (p.get("score") or 0) + random.randint(0, 5)
+                p["upvotes"] = p["score"]
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                save_posts(db, batch, is_offline=True)
+                db.commit()
+            durations.append(time.perf_counter() - started)
+
+    results = {"mode": args.mode, "storage": storage_info(), "posts": len(batch), "phases": {}}
+    for phase in ("idle", "sync"):
+        stop = threading.Event()
+        latencies, errors, durations = [], [], []
+        threads = [threading.Thread(target=reader, args=(stop, latencies, errors)) for _ in range(args.readers)]
+        if phase == "sync":
+            threads.append(threading.Thread(target=writer, args=(stop, durations)))
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        results["phases"][phase] = {
+            "reads": len(latencies),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(max(latencies, default=0) * 1000, 2),
+            "errors": len(errors),
+            "syncs": len(durations),
+            "sync_s": round(sum(durations) / len(durations), 3) if durations else None,
+        }
+    print(json.dumps(results))
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--mode", choices=MODES, help="run a single mode in this process")
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args)
+        return
+
+    print(f"{'mode':<8}{'journal':<10}{'phase':<7}{'reads':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'syncs':>7}{'sync s':>8}")
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--copies", str(args.copies),
+             "--readers", str(args.readers), "--seconds", str(args.seconds)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results = json.loads(out.strip().splitlines()[-1])
+        for phase, r in results["phases"].items():
+            print(f"{mode:<8}{results['storage'].get('journal_mode', '-'):<10}{phase:<7}{r['reads']:>7}{r['p50_ms']:>9}"
+                  f"{r['p99_ms']:>9}{r['max_ms']:>9}{r['errors']:>8}{r['syncs']:>7}{r['sync_s'] or '-':>8}")
+
+
+if __name__ == "__main__":
+    main_()
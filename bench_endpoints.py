@@ -0,0 +1,159 @@
+"""
+API latency and query counts per endpoint as the dataset grows, checked
+against a stored baseline.
+
+    python bench_endpoints.py [--sizes 1000,10000,100000] [--repeat 30]
+                              [--baseline bench_baseline.json] [--save-baseline] [--tolerance 1.5]
+
+Each size runs in its own process against a throwaway SQLite file filled
+by synthetic_data.generate. Requests go through the FastAPI app in
+process (no server, no collector) with the response cache cleared before
+every call, so cached endpoints are measured on a miss. Reported per
+endpoint: p50/p95/p99 in ms and SQL statements per request.
+
+With --save-baseline the results are written to the baseline file.
+Otherwise, if the file exists, an endpoint regresses when its p95 exceeds
+the baseline's by more than --tolerance times (and by more than
+NOISE_FLOOR_MS, so sub-millisecond jitter doesn't count) or when it issues
+more queries than before; any regression makes the exit status 1.
+Baselines are machine-specific: record one on the machine that compares.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ENDPOINTS = {
+    "posts_new": "/api/posts?sort=new&limit=50",
+    "posts_top": "/api/posts?sort=top&limit=50",
+    "posts_hot": "/api/posts?sort=hot&limit=50",
+    "posts_new_zh": "/api/posts?sort=new&limit=50&lang=zh",
+    "posts_cursor": "/api/posts?sort=new&limit=50&cursor=",
+    "search": "/api/search?q=lattice",
+    "search_two_terms": "/api/search?q=oracle+sandbox",
+    "leaderboard": "/api/leaderboard",
+    "trends": "/api/trends",
+    "stats": "/api/stats",
+}
+NOISE_FLOOR_MS = 2.0
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run_size(args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_endpoints.db"
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    from database import SessionLocal, engine, read_engine, init_db
+    from response_cache import response_cache
+    from search_index import init_search_index
+    from synthetic_data import generate
+    import main
+
+    init_db()
+    init_search_index()
+    with SessionLocal() as db:
+        generated = generate(db, posts=args.size, authors=max(50, args.size // 50), languages=("zh",), seed=args.seed)
+
+    queries = [0]
+
+    def count(*_):
+        queries[0] += 1
+
+    for bind in {engine, read_engine}:
+        event.listen(bind, "before_cursor_execute", count)
+
+    # No context manager: entering it would run the app's lifespan and start the collector
+    client = TestClient(main.app)
+    results = {"size": args.size, "generated": generated, "endpoints": {}}
+    for name, url in ENDPOINTS.items():
+        latencies, counts = [], []
+        for i in range(args.repeat + 1):
+            response_cache.clear()
+            queries[0] = 0
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise SystemExit(f"{url} returned {response.status_code}: {response.text[:200]}")
+            # The first call warms imports and SQLite's page cache
+            if i:
+                latencies.append(elapsed)
+                counts.append(queries[0])
+        results["endpoints"][name] = {
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "queries": max(counts),
+        }
+    print(json.dumps(results))
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for size, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if r["p95_ms"] > base["p95_ms"] * tolerance and r["p95_ms"] - base["p95_ms"] > NOISE_FLOOR_MS:
+                found.append(f"{name} @ {size}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+            if r["queries"] > base["queries"]:
+                found.append(f"{name} @ {size}: {base['queries']} -> {r['queries']} queries per request")
+    return found
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated post counts")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p95 slowdown factor")
+    parser.add_argument("--size", type=int, help="run a single size in this process")
+    args = parser.parse_args()
+    if args.size:
+        run_size(args)
+        return
+
+    results = {}
+    print(f"{'posts':>8}  {'endpoint':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        out = subprocess.run(
+            [sys.executable, __file__, "--size", str(size), "--repeat", str(args.repeat), "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        run = json.loads(out.strip().splitlines()[-1])
+        results[str(size)] = run["endpoints"]
+        for name, r in run["endpoints"].items():
+            print(f"{size:>8}  {name:<18}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['queries']:>9}")
+
+    if args.save_baseline:
+        baseline = json.load(open(args.baseline)) if os.path.exists(args.baseline) else {}
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    found = regressions(results, json.load(open(args.baseline)), args.tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    if found:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,116 @@
+"""
+Ingest throughput per write path: per-row ORM merges (the original
+collector), multi-row INSERT ... ON CONFLICT, and COPY into staging tables
+(PostgreSQL only).
+
+    DATABASE_URL=postgresql://localhost/moltbook_bench python bench_ingest.py --reset [--copies 50]
+
+Each path writes the same batch to authors/submolts/posts/comments twice:
+once into empty tables ("insert") and once with every score changed
+("update"). Only the table writes are timed: the search, trend and
+history updates save_posts does on top are the same on every path.
+Tables are dropped and recreated before each path, so with DATABASE_URL
+set --reset is required; point it at a scratch database. Without DATABASE_URL it runs against a
+throwaway SQLite file, where the COPY path is skipped.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+scratch = "DATABASE_URL" not in os.environ
+if scratch:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_ingest.db"
+
+from database import SessionLocal, Base, Author, Submolt, Post, Comment, engine, init_db
+from ingest import PARTIAL_AUTHOR_COLUMNS, collect_rows, upsert_rows
+import pg_copy
+
+
+def make_batch(copies):
+    posts = json.load(open("api_response_posts.json", encoding="utf-8"))["posts"]
+    now = datetime.utcnow()
+    batch = []
+    for i in range(copies):
+        for j, p in enumerate(posts):
+            p = copy.deepcopy(p)
+            p["id"] = f"{p['id']}-{i}"
+            p["created_at"] = (now - timedelta(minutes=7 * (i * len(posts) + j))).isoformat() + "Z"
+            for c in p.get("comments", []) or []:
+                c["id"] = f"{c['id']}-{i}"
+            batch.append(p)
+    return batch
+
+
+def orm_save(db, posts):
+    """The original path: one session.merge() per row."""
+    authors, partial_authors, submolts, post_rows, comment_rows = collect_rows(posts)
+    for model, rows in ((Author, authors), (Author, partial_authors), (Submolt, submolts),
+                        (Post, post_rows), (Comment, comment_rows)):
+        for row in rows.values():
+            db.merge(model(**row))
+    return sum(len(rows) for rows in (authors, partial_authors, submolts, post_rows, comment_rows))
+
+
+def bulk_save(db, posts):
+    """The ingest path: upsert_rows per table, which uses COPY when pg_copy enables it."""
+    authors, partial_authors, submolts, post_rows, comment_rows = collect_rows(posts)
+    written = upsert_rows(db, Author, list(authors.values()), [c for c in Author.__table__.columns.keys() if c != "id"])
+    written += upsert_rows(db, Author, list(partial_authors.values()), PARTIAL_AUTHOR_COLUMNS)
+    written += upsert_rows(db, Submolt, list(submolts.values()), ["name", "display_name"])
+    written += upsert_rows(db, Post, list(post_rows.values()), [c for c in next(iter(post_rows.values())) if c != "id"])
+    written += upsert_rows(db, Comment, list(comment_rows.values()), ["content", "author_id", "post_id", "upvotes", "created_at"])
+    return written
+
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    pg_copy.prepared.clear()
+    pg_copy.init_staging()
+
+
+def run(label, save, batch):
+    results = []
+    for phase in ("insert", "update"):
+        if phase == "update":
+            for p in batch:
+                p["score"] = (p.get("score") or 0) + 1
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            rows = save(db, batch)
+            db.commit()
+        elapsed = time.perf_counter() - started
+        results.append((phase, rows, elapsed))
+    for phase, rows, elapsed in results:
+        print(f"{label:<10}{phase:<8}{rows:>8}{elapsed:>10.3f}{rows / elapsed:>12.0f}")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables in DATABASE_URL")
+    args = parser.parse_args()
+    if not scratch and not args.reset:
+        sys.exit("This drops every table in DATABASE_URL; pass --reset to confirm it is a scratch database")
+
+    postgres = engine.dialect.name == "postgresql"
+    paths = [("orm", orm_save, False), ("upsert", bulk_save, False)]
+    if postgres:
+        paths.append(("copy", bulk_save, True))
+    print(f"{engine.dialect.name}, {args.copies * 20} posts per batch")
+    print(f"{'path':<10}{'phase':<8}{'rows':>8}{'seconds':>10}{'rows/sec':>12}")
+    for label, save, use_copy in paths:
+        reset()
+        pg_copy.PG_COPY = use_copy
+        run(label, save, make_batch(args.copies))
+    if not postgres:
+        print("COPY path skipped: DATABASE_URL is not PostgreSQL")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,87 @@
+"""
+Compare the full-text index against the old ILIKE scan on a synthetic corpus.
+
+    python bench_search.py [--posts 5000] [--repeat 20]
+
+Runs against a throwaway SQLite file unless DATABASE_URL is already set.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+
+from database import SessionLocal, Post, Author, Translation, init_db
+import search_index
+from search_index import init_search_index, rebuild_index, search_post_ids
+from main import ilike_search
+
+EN_WORDS = ("agent memory karma model context token human observer network signal protocol "
+            "consciousness loop prompt glitch submolt river feed latency cache").split()
+ZH_WORDS = ["人工智能", "代理", "记忆", "模型", "上下文", "人类", "观察者", "网络", "信号", "协议", "意识", "循环"]
+QUERIES = ["agent", "memory karma", "consciousness", "代理", "人工智能", "记忆 模型", "nonexistentterm"]
+
+
+def sentence(words, n):
+    return " ".join(random.choice(words) for _ in range(n))
+
+
+def seed(posts):
+    db = SessionLocal()
+    authors = [Author(id=f"a{i}", name=f"agent_{i}") for i in range(50)]
+    db.add_all(authors)
+    for i in range(posts):
+        post_id = f"p{i}"
+        db.add(Post(id=post_id, title=sentence(EN_WORDS, 6), content=sentence(EN_WORDS, 80),
+                    author_id=random.choice(authors).id))
+        db.add(Translation(entity_type="post", entity_id=post_id, field="title", lang="zh",
+                           text="".join(random.choice(ZH_WORDS) for _ in range(6))))
+        db.add(Translation(entity_type="post", entity_id=post_id, field="content", lang="zh",
+                           text="".join(random.choice(ZH_WORDS) for _ in range(60))))
+    db.commit()
+    started = time.perf_counter()
+    rebuild_index(db)
+    db.commit()
+    print(f"Indexed {posts} posts in {time.perf_counter() - started:.2f}s")
+    db.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    init_db()
+    init_search_index()
+    if search_index.backend is None:
+        print("No full-text backend for this database; nothing to compare.")
+        return
+    db = SessionLocal()
+    if db.query(Post.id).first() is None:
+        seed(args.posts)
+
+    print(f"{'query':<20}{'ilike ms':>10}{'index ms':>10}{'speedup':>9}{'hits':>7}")
+    for q in QUERIES:
+        # Same ordering the endpoint used, so the scan can't stop at the first 20 hits
+        ilike_ms, _ = timed(lambda: ilike_search(db, q).order_by(Post.created_at.desc()).limit(20).all(), args.repeat)
+        index_ms, ranked = timed(lambda: search_post_ids(db, q, limit=20), args.repeat)
+        print(f"{q:<20}{ilike_ms:>10.2f}{index_ms:>10.2f}{ilike_ms / index_ms:>8.1f}x{len(ranked):>7}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Before/after latency and payload sizes for /api/posts and /api/leaderboard.
+
+    python bench_serialization.py [--copies 10] [--repeat 30]
+
+"before" replays the old code path (ORM rows validated through the Pydantic
+response models, encoded with FastAPI's jsonable_encoder, uncompressed);
+"after" is the endpoint as served now. Runs against a throwaway SQLite file
+unless DATABASE_URL is already set.
+"""
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_serialization.db"
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import desc, func
+from sqlalchemy.orm import joinedload
+from typing import List
+from database import SessionLocal, Post, Author, init_db
+from ingest import save_posts
+import main
+
+
+def seed(copies):
+    posts = json.load(open("api_response_posts.json", encoding="utf-8"))["posts"]
+    now = datetime.utcnow()
+    batch = []
+    for i in range(copies):
+        for j, p in enumerate(posts):
+            p = copy.deepcopy(p)
+            p["id"] = f"{p['id']}-{i}"
+            p["created_at"] = (now - timedelta(minutes=7 * (i * len(posts) + j))).isoformat() + "Z"
+            for c in p.get("comments", []) or []:
+                c["id"] = f"{c['id']}-{i}"
+            batch.append(p)
+    db = SessionLocal()
+    save_posts(db, batch, is_offline=True)
+    db.commit()
+    db.close()
+    return len(batch)
+
+
+def legacy_posts(db):
+    query = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt))
+    posts = query.order_by(desc(Post.created_at)).limit(100).all()
+    return json.dumps(jsonable_encoder(TypeAdapter(List[main.PostResponse]).validate_python(posts))).encode()
+
+
+def legacy_leaderboard(db):
+    top_karma = db.query(Author).order_by(desc(Author.karma)).limit(100).all()
+    one_day_ago = datetime.utcnow() - timedelta(hours=24)
+    most_vocal = db.query(Author.name, Author.id, func.count(Post.id).label('post_count')).join(Post).filter(
+        Post.created_at >= one_day_ago).group_by(Author.id).order_by(desc('post_count')).limit(100).all()
+    two_days_ago = datetime.utcnow() - timedelta(hours=48)
+    viral_posts = db.query(Post).options(joinedload(Post.author)).filter(
+        Post.created_at >= two_days_ago).order_by(desc(Post.score)).limit(100).all()
+    return json.dumps(jsonable_encoder({
+        "top_karma": top_karma,
+        "most_vocal": [{"name": name, "id": id, "count": count} for name, id, count in most_vocal],
+        "viral_posts": [main.PostResponse.model_validate(p) for p in viral_posts],
+    })).encode()
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, result
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    if db.query(Post.id).first() is None:
+        print(f"Seeded {seed(args.copies)} posts")
+    client = TestClient(main.app)
+
+    print(f"{'endpoint':<18}{'variant':<22}{'median ms':>10}{'bytes':>10}")
+    for path, legacy in (("/api/posts", legacy_posts), ("/api/leaderboard", legacy_leaderboard)):
+        ms, body = timed(lambda: legacy(db), args.repeat)
+        print(f"{path:<18}{'before (pydantic)':<22}{ms:>10.2f}{len(body):>10}")
+
+        for label, encoding in (("after identity", "identity"), ("after gzip", "gzip"), ("after br", "br")):
+            ms, response = timed(lambda: client.get(path, headers={"Accept-Encoding": encoding}), args.repeat)
+            if encoding != "identity" and response.headers.get("content-encoding") != encoding:
+                print(f"{path:<18}{label:<22}{'(not available)':>20}")
+                continue
+            size = response.num_bytes_downloaded
+            print(f"{path:<18}{label:<22}{ms:>10.2f}{size:>10}")
+
+        etag = client.get(path).headers["etag"]
+        ms, response = timed(lambda: client.get(path, headers={"If-None-Match": etag}), args.repeat)
+        print(f"{path:<18}{'after 304':<22}{ms:>10.2f}{response.num_bytes_downloaded:>10}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor
+from collector import (
+    read_cursor, save_batch, load_fallback_posts, fetch_until_cursor, advance_cursor,
+)
+from feed_client import async_feed_client
+from retention import retention_job, RETENTION_INTERVAL
+from translation_queue import drain_translation_queue
+from events import EVENT_RELAY_INTERVAL, broker, relay_events
+from lease import LeaderLease, LEASE_RENEW
+import asyncio
+import logging
+import os
+import random
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+COLLECTOR_INTERVAL = float(os.getenv("COLLECTOR_INTERVAL", "15"))
+COLLECTOR_JITTER = float(os.getenv("COLLECTOR_JITTER", "5"))
+# lease: whichever process holds the collector lease collects, the rest only serve (default)
+# always: every process collects (single-process deployments, the old behaviour)
+# off: never collect here; run `python collector_runtime.py` as a separate process
+COLLECTOR_MODE = os.getenv("COLLECTOR_MODE", "lease")
+COLLECTOR_MODES = ("lease", "always", "off")
+
+
+class CollectorRuntime:
+    """
+    Runs the collector inside the FastAPI event loop. HTTP is async; every
+    DB call goes to one dedicated writer thread, so sessions never write
+    concurrently. A tick that fires while a sync is still in flight is
+    skipped (and counted) rather than stacked. Retention runs on its own,
+    slower schedule through the same writer thread.
+
+    With several web workers or replicas, mode "lease" makes them compete
+    for one lease row: the holder collects and the others only serve,
+    relaying the holder's SSE events from event_log to their own clients.
+    """
+
+    def __init__(self, interval=COLLECTOR_INTERVAL, jitter=COLLECTOR_JITTER, client=async_feed_client,
+                 retention_interval=RETENTION_INTERVAL, mode=COLLECTOR_MODE):
+        if mode not in COLLECTOR_MODES:
+            raise ValueError(f"Unknown COLLECTOR_MODE {mode!r}; expected one of {', '.join(COLLECTOR_MODES)}")
+        self.interval = interval
+        self.jitter = jitter
+        self.client = client
+        self.retention_interval = retention_interval
+        self.mode = mode
+        self.lease = LeaderLease("collector") if mode == "lease" else None
+        self.collecting = False
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.task = None
+        self.retention_task = None
+        self.lease_task = None
+        self.relay_task = None
+        self.current = None
+        self.metrics = {
+            "lease_acquired": 0,
+            "lease_lost": 0,
+            "relayed_events": 0,
+            "runs": 0,
+            "failures": 0,
+            "skipped_ticks": 0,
+            "not_modified": 0,
+            "in_flight": False,
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_duration": None,
+            "last_success_at": None,
+            "last_error": None,
+            "last_tick_lag": None,
+            "last_stats": None,
+            "rows_written": 0,
+            "write_seconds": 0.0,
+            "retention_runs": 0,
+            "retention_failures": 0,
+            "last_retention": None,
+            "retention_reclaimed": {},
+        }
+
+    async def in_writer(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, fn, *args)
+
+    def check_lease(self):
+        # Fencing: a process that may have lost the lease must not write
+        if self.lease is not None and not self.lease.valid():
+            raise RuntimeError("Collector lease not held; skipping write")
+
+    async def sync_once(self):
+        self.check_lease()
+        posts, source, not_modified = await self.client.fetch_feed()
+        if not_modified:
+            self.metrics["not_modified"] += 1
+            cursor = await self.in_writer(read_cursor)
+            # An unchanged head is the best time to fill a gap an earlier sync left
+            if not posts or not cursor or cursor["gap"] is None:
+                logger.info("Feed not modified since last sync (304); nothing to do")
+                return None
+            logger.info("Feed not modified since last sync (304); resuming the gap an earlier sync left")
+            posts, cursor = await fetch_until_cursor(posts, cursor, self.client.get_json)
+            self.check_lease()
+            return await self.in_writer(save_batch, posts, False, cursor)
+
+        is_offline = False
+        if posts:
+            logger.info(f"Feed served by candidate '{source}'")
+        else:
+            posts = await self.in_writer(load_fallback_posts)
+            is_offline = True
+        if not posts:
+            raise RuntimeError("Failed to fetch posts from all sources")
+
+        cursor = await self.in_writer(read_cursor)
+        if cursor and not is_offline:
+            posts, cursor = await fetch_until_cursor(posts, cursor, self.client.get_json)
+        else:
+            cursor = advance_cursor(posts, cursor)
+        self.check_lease()
+        return await self.in_writer(save_batch, posts, is_offline, cursor)
+
+    async def run_once(self):
+        started = time.monotonic()
+        self.metrics["in_flight"] = True
+        self.metrics["last_started_at"] = time.time()
+        try:
+            stats = await self.sync_once()
+            self.metrics["last_success_at"] = time.time()
+            self.metrics["last_error"] = None
+            if stats is not None:
+                self.metrics["last_stats"] = stats
+                self.metrics["rows_written"] += stats["rows"]
+                self.metrics["write_seconds"] = round(self.metrics["write_seconds"] + stats["seconds"], 3)
+        except Exception as e:
+            self.metrics["failures"] += 1
+            self.metrics["last_error"] = str(e)[:500]
+            logger.error(f"Error during sync: {e}")
+        finally:
+            self.metrics["runs"] += 1
+            self.metrics["in_flight"] = False
+            self.metrics["last_finished_at"] = time.time()
+            self.metrics["last_duration"] = round(time.monotonic() - started, 3)
+
+    async def loop(self):
+        next_tick = time.monotonic()
+        while True:
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.metrics["last_tick_lag"] = round(time.monotonic() - next_tick, 3)
+
+            if self.current is not None and not self.current.done():
+                # Overlap guard: never more than one sync in flight
+                self.metrics["skipped_ticks"] += 1
+                logger.warning("Previous sync still running; skipping this tick")
+            else:
+                self.current = asyncio.create_task(self.run_once())
+
+            next_tick += self.interval + random.uniform(0, self.jitter)
+            # After a long stall, don't fire a burst of catch-up ticks
+            if next_tick < time.monotonic():
+                missed = int((time.monotonic() - next_tick) // self.interval) + 1
+                self.metrics["skipped_ticks"] += missed
+                next_tick = time.monotonic()
+
+    async def retention_loop(self):
+        # The first run after startup also sweeps rows orphaned before this process
+        full_sweep = True
+        while True:
+            await asyncio.sleep(self.retention_interval)
+            try:
+                self.check_lease()
+                report = await self.in_writer(retention_job, full_sweep)
+                full_sweep = False
+                self.metrics["last_retention"] = report
+                totals = self.metrics["retention_reclaimed"]
+                for key, value in report.items():
+                    if isinstance(value, int) and not isinstance(value, bool) and key != "batches":
+                        totals[key] = totals.get(key, 0) + value
+            except Exception as e:
+                self.metrics["retention_failures"] += 1
+                logger.error(f"Error during retention: {e}")
+            finally:
+                self.metrics["retention_runs"] += 1
+
+    async def lease_loop(self):
+        while True:
+            renew_in = LEASE_RENEW
+            try:
+                # Not on the writer thread, and on its own connection (database.LeaseSessionLocal):
+                # a long sync must not delay the renewal
+                held = await asyncio.get_running_loop().run_in_executor(None, self.lease.acquire)
+            except Exception as e:
+                # e.g. SQLite busy behind a long write: keep collecting while the last renewal
+                # is still good, and retry soon instead of a full LEASE_RENEW later
+                held = self.lease.valid()
+                renew_in = min(1.0, LEASE_RENEW)
+                logger.error(f"Collector lease renewal failed: {e}")
+            if held and not self.collecting:
+                self.metrics["lease_acquired"] += 1
+                logger.info(f"Collector lease acquired by {self.lease.holder}; collecting")
+                self.start_collecting()
+            elif not held and self.collecting:
+                self.metrics["lease_lost"] += 1
+                logger.warning("Collector lease lost; stopping collection")
+                await self.stop_collecting()
+            await asyncio.sleep(renew_in)
+
+    async def relay_loop(self):
+        last_id = None
+        while True:
+            await asyncio.sleep(EVENT_RELAY_INTERVAL)
+            # The collecting process publishes its own events; with no clients there's nothing to relay
+            if self.collecting or not broker.subscribers:
+                last_id = None
+                continue
+            try:
+                last_id, relayed = await asyncio.get_running_loop().run_in_executor(None, relay_events, last_id)
+                self.metrics["relayed_events"] += relayed
+            except Exception as e:
+                logger.error(f"Event relay failed: {e}")
+
+    def start_collecting(self):
+        self.collecting = True
+        if self.task is None:
+            self.task = asyncio.create_task(self.loop())
+        if self.retention_task is None and self.retention_interval > 0:
+            self.retention_task = asyncio.create_task(self.retention_loop())
+
+    async def stop_collecting(self):
+        self.collecting = False
+        await self.cancel(self.task, self.retention_task, self.current)
+        self.task = None
+        self.retention_task = None
+        self.current = None
+
+    async def cancel(self, *tasks):
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    def start(self):
+        if self.mode == "always":
+            self.start_collecting()
+            return
+        if self.mode == "lease" and self.lease_task is None:
+            self.lease_task = asyncio.create_task(self.lease_loop())
+        if self.relay_task is None:
+            self.relay_task = asyncio.create_task(self.relay_loop())
+
+    async def stop(self):
+        await self.cancel(self.lease_task, self.relay_task)
+        self.lease_task = None
+        self.relay_task = None
+        await self.stop_collecting()
+        if self.lease is not None:
+            try:
+                # Hand over right away instead of making the next leader wait out the TTL
+                await asyncio.get_running_loop().run_in_executor(None, self.lease.release)
+            except Exception as e:
+                logger.warning(f"Collector lease release failed: {e}")
+        await self.client.close()
+        self.writer.shutdown(wait=True)
+
+    def drain_translations(self):
+        """Scheduler job: only the collecting process translates, so N workers don't multiply translator load."""
+        if self.collecting:
+            return drain_translation_queue()
+        return 0
+
+    def status(self):
+        now = time.time()
+        last_success = self.metrics["last_success_at"]
+        status = {
+            **self.metrics,
+            "mode": self.mode,
+            "collecting": self.collecting,
+            "interval": self.interval,
+            # Seconds since the last successful sync, i.e. how stale the data may be
+            "lag": round(now - last_success, 3) if last_success else None,
+        }
+        if self.lease is not None:
+            status["lease"] = self.lease.status()
+        return status
+
+
+collector_runtime = CollectorRuntime()
+
+
+async def run_standalone():
+    """Collector without the web tier: sync, retention and translations until SIGTERM/SIGINT."""
+    from collector import init_storage
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    init_storage()
+    # Several standalone collectors (or web workers in lease mode) are safe: one holds the lease
+    runtime = CollectorRuntime(mode="always" if COLLECTOR_MODE == "always" else "lease")
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:  # Windows
+            pass
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(runtime.drain_translations, 'interval', seconds=5, max_instances=1, coalesce=True)
+    scheduler.start()
+    runtime.start()
+    logger.info(f"Standalone collector started (mode={runtime.mode})")
+    try:
+        await stopping.wait()
+    finally:
+        logger.info("Shutting down collector...")
+        await runtime.stop()
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(run_standalone())
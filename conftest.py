@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Unit tests that touch the database get a throwaway SQLite file, never the real one
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+# Retention archives what it deletes; keep those files out of the working tree too
+os.environ.setdefault("ARCHIVE_DIR", tempfile.mkdtemp())
@@ -1,11 +1,16 @@
-from sqlalchemy import create_engine, Column, String, Integer, Text, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, Text, Boolean, DateTime, ForeignKey, UniqueConstraint, Index, LargeBinary
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, query_expression
 from datetime import datetime
 
 Base = declarative_base()
 
 class Author(Base):
     __tablename__ = 'authors'
+    __table_args__ = (
+        Index("ix_authors_karma", "karma"),
+        Index("ix_authors_created_at", "created_at"),
+    )
     
     id = Column(String, primary_key=True)
     name = Column(String)
@@ -18,6 +23,7 @@ class Author(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime)
     last_active = Column(DateTime, nullable=True)
+    payload_hash = Column(String, nullable=True)
 
 class Submolt(Base):
     __tablename__ = 'submolts'
@@ -25,28 +31,24 @@ class Submolt(Base):
     id = Column(String, primary_key=True)
     name = Column(String)
     display_name = Column(String)
+    payload_hash = Column(String, nullable=True)
 
 class Post(Base):
     __tablename__ = 'posts'
+    # Each feed sort order gets a (column, id) index so keyset pages are a range scan
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_score_id", "score", "id"),
+        Index("ix_posts_comment_count_id", "comment_count", "id"),
+        Index("ix_posts_hot_rank_id", "hot_rank", "id"),
+        Index("ix_posts_rising_rank_id", "rising_rank", "id"),
+        Index("ix_posts_author_id_created_at", "author_id", "created_at"),
+        Index("ix_posts_submolt_id", "submolt_id"),
+    )
     
     id = Column(String, primary_key=True)
     title = Column(String)
-    title_zh = Column(String, nullable=True)
-    title_fr = Column(String, nullable=True)
-    title_ja = Column(String, nullable=True)
-    title_it = Column(String, nullable=True)
-    title_ru = Column(String, nullable=True)
-    title_ko = Column(String, nullable=True)
-    title_es = Column(String, nullable=True)
-    
     content = Column(Text)
-    content_zh = Column(Text, nullable=True)
-    content_fr = Column(Text, nullable=True)
-    content_ja = Column(Text, nullable=True)
-    content_it = Column(Text, nullable=True)
-    content_ru = Column(Text, nullable=True)
-    content_ko = Column(Text, nullable=True)
-    content_es = Column(Text, nullable=True)
     
     type = Column(String)
     author_id = Column(String, ForeignKey('authors.id'))
@@ -57,6 +59,11 @@ class Post(Base):
     score = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
     hot_score = Column(Integer, default=0)
+    # Computed at ingest (see ranking.py): score/hour over the last hour, and the
+    # time-invariant sort keys behind sort=hot and sort=rising
+    velocity = Column(Float, nullable=True)
+    hot_rank = Column(Float, nullable=True)
+    rising_rank = Column(Float, nullable=True)
     
     is_pinned = Column(Boolean, default=False)
     is_locked = Column(Boolean, default=False)
@@ -64,6 +71,10 @@ class Post(Base):
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
+    # Hash of the last upstream payload written; unchanged payloads skip the write
+    payload_hash = Column(String, nullable=True)
+    # Not stored: filled by queries that select a truncated content (?preview_chars=)
+    content_preview = query_expression()
     
     author = relationship("Author", backref="posts")
     submolt = relationship("Submolt", backref="posts")
@@ -71,10 +82,13 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at", "post_id", "created_at"),
+        Index("ix_comments_author_id", "author_id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     content = Column(Text)
-    content_zh = Column(Text, nullable=True) # Translated content
     
     author_id = Column(String, ForeignKey('authors.id'))
     post_id = Column(String, ForeignKey('posts.id'))
@@ -82,12 +96,140 @@ class Comment(Base):
     
     upvotes = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    payload_hash = Column(String, nullable=True)
     
     author = relationship("Author")
     post = relationship("Post", back_populates="comments")
     parent = relationship("Comment", remote_side=[id], backref="replies")
 
+class Translation(Base):
+    __tablename__ = "translations"
+    
+    # One row per (entity, field, language); adding a language needs no schema change
+    entity_type = Column(String, primary_key=True)  # 'post' or 'comment'
+    entity_id = Column(String, primary_key=True)
+    field = Column(String, primary_key=True)  # 'title' or 'content'
+    lang = Column(String, primary_key=True)  # zh, fr, ja, ...
+    text = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TranslationJob(Base):
+    __tablename__ = "translation_jobs"
+    __table_args__ = (UniqueConstraint("entity_type", "entity_id", "field", "lang"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(String)  # 'post' or 'comment'
+    entity_id = Column(String, index=True)
+    field = Column(String)  # 'title' or 'content'
+    lang = Column(String)  # Column suffix: zh, fr, ja, ...
+    state = Column(String, default="pending", index=True)  # pending -> running -> (deleted) or failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TranslationMemo(Base):
+    __tablename__ = "translation_memo"
+    
+    # sha256 of the source text, so repeated titles/comments translate once per language
+    source_hash = Column(String, primary_key=True)
+    lang = Column(String, primary_key=True)  # Translator target code, e.g. zh-CN
+    text = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class PostTerm(Base):
+    __tablename__ = "post_terms"
+    __table_args__ = (Index("ix_post_terms_created_at", "created_at"),)
+    
+    # Term counts of one post as last indexed; submolt/created_at are copied so the
+    # post's contribution can be subtracted from the windows after it is pruned
+    post_id = Column(String, primary_key=True)
+    term = Column(String, primary_key=True)
+    ngram = Column(Integer)  # 1 = word, 2 = bigram
+    count = Column(Integer)
+    submolt_id = Column(String, nullable=True)
+    created_at = Column(DateTime)
+
+class TrendCount(Base):
+    __tablename__ = "trend_counts"
+    __table_args__ = (Index("ix_trend_counts_top", "period", "scope", "ngram", "count"),)
+    
+    # Running term totals per window ('1h', '24h', '7d'); scope is a submolt id or '' for all
+    period = Column(String, primary_key=True)
+    scope = Column(String, primary_key=True)
+    ngram = Column(Integer, primary_key=True)
+    term = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+
+class ActivityRollup(Base):
+    __tablename__ = "activity_rollup"
+    
+    # Posts/comments created per UTC hour; scope is a submolt id or '' for all.
+    # Maintained at ingest and never pruned, so history outlives the raw posts.
+    bucket_start = Column(DateTime, primary_key=True)
+    scope = Column(String, primary_key=True)
+    posts = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard_entries"
+    __table_args__ = (Index("ix_leaderboard_entries_rank", "board", "rank"),)
+    
+    # Materialized top-K rows per board ('karma', 'vocal', 'viral'), already projected for the API
+    board = Column(String, primary_key=True)
+    entity_id = Column(String, primary_key=True)  # author id, or post id for 'viral'
+    rank = Column(Integer)
+    score = Column(Integer)  # karma, post count or post score
+    name = Column(String)  # author name, or post title for 'viral'
+    avatar_url = Column(String, nullable=True)
+    author_id = Column(String, nullable=True)
+    author_name = Column(String, nullable=True)
+    comment_count = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+class PostHistory(Base):
+    __tablename__ = "post_history"
+    
+    # One row per post: its (time, upvotes, score, comment_count) samples, delta-encoded
+    # and downsampled by age so the blob stays within a fixed size (see score_history.py)
+    post_id = Column(String, primary_key=True)
+    samples = Column(LargeBinary)
+    points = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+
+class Lease(Base):
+    __tablename__ = "leases"
+    
+    # A named lock row with a TTL: whoever holds an unexpired lease does the job
+    # (e.g. "collector"); the holder keeps extending expires_at while it runs
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    acquired_at = Column(DateTime)
+    expires_at = Column(DateTime)
+
+class EventLog(Base):
+    __tablename__ = "event_log"
+    __table_args__ = (
+        Index("ix_event_log_created_at", "created_at"),
+    )
+    
+    # SSE events written by the collecting process, replayed by the other web workers
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event = Column(String)
+    data = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+    
+    # Small key/value store for collector bookkeeping (feed cursor, ...)
+    key = Column(String, primary_key=True)
+    value = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 import os
+import time
 
 # Database setup
 # Use DATABASE_URL env var if available (for cloud deployment), otherwise fallback to local sqlite
@@ -99,8 +241,138 @@ if DATABASE_URL.startswith("postgres://"):
 
 connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# SQLite storage mode. "wal" (default for file databases): write-ahead log, one
+# dedicated writer connection and a separate read-only pool, so API reads run
+# against the last committed snapshot instead of waiting for a sync to commit.
+# "legacy": the old shared engine with SQLite's defaults.
+SQLITE_MODE = os.getenv("SQLITE_MODE", "wal")
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16000"))
+SQLITE_READ_POOL = int(os.getenv("SQLITE_READ_POOL", "8"))
+# Seconds a writer session waits for the writer connection before giving up
+SQLITE_WRITER_TIMEOUT = float(os.getenv("SQLITE_WRITER_TIMEOUT", "30"))
+# busy_timeout (ms) of the lease connection; keep it well below LEASE_TTL - LEASE_RENEW
+SQLITE_LEASE_BUSY_TIMEOUT = int(os.getenv("SQLITE_LEASE_BUSY_TIMEOUT", "5000"))
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+# In-memory databases are per connection, so they can't be split across engines
+split_sqlite = is_sqlite and SQLITE_MODE == "wal" and ":memory:" not in DATABASE_URL and DATABASE_URL not in ("sqlite://", "sqlite:///")
+
+if split_sqlite:
+    engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=1, max_overflow=0,
+                           pool_timeout=SQLITE_WRITER_TIMEOUT)
+    read_engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=SQLITE_READ_POOL, max_overflow=0)
+    # Lease renewals must not queue for the writer connection behind a long sync (the
+    # collector, translation drain and retention all hold it), or the lease can expire
+    # on its holder. SQLite still serializes the write itself, but that wait is capped
+    # by SQLITE_LEASE_BUSY_TIMEOUT instead of SQLITE_WRITER_TIMEOUT plus the sync.
+    lease_engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=1, max_overflow=0,
+                                 pool_timeout=SQLITE_LEASE_BUSY_TIMEOUT / 1000)
+
+    def sqlite_pragmas(dbapi_connection, read_only, busy_timeout=SQLITE_BUSY_TIMEOUT):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # Persistent in the file header; readers just inherit it
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        # Safe in WAL mode: a power loss can drop the last commits, never corrupt the file
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "connect")
+    def configure_writer(dbapi_connection, connection_record):
+        sqlite_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(read_engine, "connect")
+    def configure_reader(dbapi_connection, connection_record):
+        sqlite_pragmas(dbapi_connection, read_only=True)
+
+    @event.listens_for(lease_engine, "connect")
+    def configure_lease(dbapi_connection, connection_record):
+        sqlite_pragmas(dbapi_connection, read_only=False, busy_timeout=SQLITE_LEASE_BUSY_TIMEOUT)
+elif DATABASE_URL.startswith("postgresql"):
+    # statement_timeout in ms, 0 = none; applied per connection through libpq options
+    PG_STATEMENT_TIMEOUT = int(os.getenv("PG_STATEMENT_TIMEOUT", "0"))
+    engine = read_engine = lease_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"options": f"-c statement_timeout={PG_STATEMENT_TIMEOUT}"},
+        pool_size=int(os.getenv("PG_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("PG_MAX_OVERFLOW", "10")),
+        pool_pre_ping=True,
+    )
+else:
+    engine = read_engine = lease_engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# For request handlers and anything else that only reads; same as SessionLocal unless split
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# For lease.py only; same as SessionLocal unless split
+LeaseSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=lease_engine)
+
+def init_db(attempts=5):
+    for attempt in range(attempts):
+        try:
+            Base.metadata.create_all(bind=engine)
+            return
+        except DBAPIError as e:
+            # Several workers starting on a fresh database race between create_all's
+            # existence check and CREATE TABLE; the next pass skips what they created
+            if "already exists" not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.1 * (attempt + 1))
+
+def storage_info():
+    """Storage settings in effect, for the status endpoint and benchmarks."""
+    info = {"backend": engine.dialect.name, "mode": "wal" if split_sqlite else "shared"}
+    if is_sqlite:
+        with read_engine.connect() as conn:
+            info["journal_mode"] = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    if split_sqlite:
+        info["read_pool"] = SQLITE_READ_POOL
+    return info
+
+def get_insert(db):
+    """Dialect-native insert() with ON CONFLICT support, or None for other backends."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+def get_state(db, key, default=None):
+    row = db.query(SyncState.value).filter(SyncState.key == key).first()
+    return row[0] if row else default
+
+def set_state(db, key, value):
+    """Upsert a sync_state value. Does not commit."""
+    state = db.query(SyncState).filter(SyncState.key == key).first()
+    if state is None:
+        state = SyncState(key=key)
+        db.add(state)
+    state.value = value
+    state.updated_at = datetime.utcnow()
+    # Sessions don't autoflush, so make the value visible to later get_state calls
+    db.flush()
+
+GENERATION_KEY = "data_generation"
+
+def get_generation(db):
+    return get_state(db, GENERATION_KEY, "0")
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+def bump_generation(db):
+    """
+    Mark the data as changed so cached responses are recomputed. The value is
+    a nanosecond timestamp rather than a read-modify-write counter, so
+    concurrent writers can't hand out the same generation twice.
+    Does not commit.
+    """
+    set_state(db, GENERATION_KEY, str(time.time_ns()))
@@ -0,0 +1,178 @@
+from sqlalchemy.orm import Session
+from database import ReadSessionLocal, Post, EventLog
+from ingest import load_existing, parse_date
+from datetime import datetime, timedelta
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Messages buffered per client; a client this far behind is disconnected, not buffered for
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "32"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+PREVIEW_CHARS = 300
+# Events are also written to event_log so web workers that don't collect can relay them
+EVENT_LOG_KEEP = float(os.getenv("EVENT_LOG_KEEP", "600"))
+EVENT_RELAY_INTERVAL = float(os.getenv("EVENT_RELAY_INTERVAL", "2"))
+
+DELTA_FIELDS = ("score", "upvotes", "comment_count")
+
+
+class Subscriber:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class EventBroker:
+    """
+    Fan-out for server-sent events. publish() is thread-safe (the collector
+    writes from a worker thread) and never blocks: each client has a bounded
+    queue, and a client whose queue is full is dropped. The browser's
+    EventSource reconnects and reloads the feed.
+    """
+
+    def __init__(self, queue_size=SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        message = f"id: {next(self.sequence)}\nevent: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self.deliver, subscriber, message)
+            except RuntimeError:
+                # The subscriber's event loop is gone (server shutting down)
+                self.unsubscribe(subscriber)
+
+    def deliver(self, subscriber, message):
+        # Runs on the subscriber's loop, so queue access is single-threaded
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            subscriber.dropped = True
+            self.unsubscribe(subscriber)
+            with self.lock:
+                self.dropped += 1
+            # Discard the backlog and leave only the end-of-stream marker
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+            logger.info("SSE client fell behind; disconnected")
+
+    async def stream(self, subscriber, is_disconnected):
+        """Async generator of SSE frames for one client, with heartbeats while idle."""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if message is None:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "clients": len(self.subscribers),
+                "published": self.published,
+                "dropped_clients": self.dropped,
+                "queue_size": self.queue_size,
+            }
+
+
+def snapshot_posts(db: Session, posts):
+    """{post_id: (score, upvotes, comment_count)} as stored before a batch is written."""
+    ids = [p.get("id") for p in posts if p.get("id")]
+    existing = load_existing(db, Post.id, ids, Post.score, Post.upvotes, Post.comment_count)
+    return {post_id: tuple(row[1:]) for post_id, row in existing.items()}
+
+
+def feed_events(posts, before):
+    """
+    Split a written batch into lean new-post summaries and
+    {id, score, upvotes, comment_count} deltas for posts whose counters moved.
+    """
+    new_posts = []
+    deltas = []
+    # Later occurrences win, as in ingest; posts without an author are never stored
+    latest = {p.get("id"): p for p in posts if p.get("id") and p.get("author")}
+    for post_id, p in latest.items():
+        counters = (p.get("score", 0), p.get("upvotes", 0), p.get("comment_count", 0))
+        if post_id not in before:
+            author = p.get("author") or {}
+            submolt = p.get("submolt") or {}
+            created_at = parse_date(p.get("created_at"))
+            new_posts.append({
+                "id": post_id,
+                "title": p.get("title"),
+                "content_preview": (p.get("content") or "")[:PREVIEW_CHARS],
+                "author": {"id": author.get("id"), "name": author.get("name")},
+                "submolt": submolt.get("name"),
+                "score": counters[0],
+                "comment_count": counters[2],
+                "created_at": created_at.isoformat() if created_at else None,
+            })
+        elif counters != before[post_id]:
+            deltas.append({"id": post_id, **dict(zip(DELTA_FIELDS, counters))})
+    return new_posts, deltas
+
+
+def log_events(db: Session, events, now=None):
+    """Append [(event, data), ...] to event_log and drop entries past EVENT_LOG_KEEP. Does not commit."""
+    now = now or datetime.utcnow()
+    db.query(EventLog).filter(EventLog.created_at < now - timedelta(seconds=EVENT_LOG_KEEP)).delete(synchronize_session=False)
+    db.add_all([EventLog(event=event, data=json.dumps(data, default=str, ensure_ascii=False), created_at=now)
+                for event, data in events])
+
+
+def relay_events(after_id):
+    """
+    Publish event_log entries newer than after_id to this process's clients.
+    With after_id None, only the current position is returned, so a process
+    starts relaying from now rather than replaying the log. Returns
+    (last id seen, events published).
+    """
+    with ReadSessionLocal() as db:
+        if after_id is None:
+            last = db.query(EventLog.id).order_by(EventLog.id.desc()).first()
+            return (last[0] if last else 0), 0
+        rows = db.query(EventLog.id, EventLog.event, EventLog.data).filter(EventLog.id > after_id).order_by(EventLog.id).all()
+    for _, event, data in rows:
+        broker.publish(event, json.loads(data))
+    return (rows[-1][0] if rows else after_id), len(rows)
+
+
+broker = EventBroker()
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib encoder produces the same JSON
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional; clients fall back to gzip
+    brotli = None
+
+# Bodies smaller than this aren't worth the compression round trip
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Compressed bodies are memoized by content hash, so cached aggregates compress once per change
+COMPRESSED_CACHE_SIZE = 256
+
+ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+
+def dumps(data):
+    """JSON bytes for plain dicts/lists (datetimes become ISO strings, like FastAPI's encoder)."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CompressedCache:
+    def __init__(self, capacity=COMPRESSED_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compress(self, digest, encoding, body):
+        key = (digest, encoding)
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                return value
+        if encoding == "br":
+            value = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            value = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return value
+
+
+compressed_cache = CompressedCache()
+
+
+def accepted_encoding(request: Request):
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def etag_matches(request: Request, digest):
+    """If-None-Match against any encoding variant of this body."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in ENCODING_SUFFIX.values():
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+        if tag == digest:
+            return True
+    return False
+
+
+def fast_json(request: Request, data, status_code=200):
+    """
+    Encode data once to JSON bytes and answer with a strong ETag (hash of the
+    body, suffixed per content-encoding), a 304 when the client already has
+    it, and br/gzip compression when the client accepts it.
+    """
+    body = dumps(data)
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if etag_matches(request, digest):
+        headers["ETag"] = f'"{digest}"'
+        return Response(status_code=304, headers=headers)
+
+    encoding = accepted_encoding(request) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        body = compressed_cache.get_or_compress(digest, encoding, body)
+        headers["Content-Encoding"] = encoding
+    headers["ETag"] = f'"{digest}{ENCODING_SUFFIX.get(encoding, "")}"'
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,295 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+import asyncio
+import httpx
+import logging
+import os
+import threading
+import time
+import requests
+
+logger = logging.getLogger(__name__)
+
+MOLTBOOK_API_BASE = os.getenv("MOLTBOOK_API_BASE", "https://www.moltbook.com").rstrip("/")
+FEED_URL = f"{MOLTBOOK_API_BASE}/api/v1/posts"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Referer": "https://www.moltbook.com/"
+}
+
+# Start the next candidate if the current ones haven't answered within this many seconds
+FETCH_HEDGE_DELAY = float(os.getenv("FETCH_HEDGE_DELAY", "1.5"))
+# Give up on the whole race well inside the 15s sync interval
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "10"))
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "3"))
+FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", "8"))
+
+# (stats key, url factory). The factory lets the cache-busting candidate get a fresh _t each time.
+CANDIDATES = [
+    ("sort=new", lambda: f"{FEED_URL}?sort=new"),
+    ("limit=100&sort=new", lambda: f"{FEED_URL}?limit=100&sort=new"),
+    ("default", lambda: FEED_URL),
+    ("_t", lambda: f"{FEED_URL}?_t={int(time.time())}"),
+    ("filter=new", lambda: f"{FEED_URL}?filter=new"),
+]
+
+
+def build_session():
+    """One keep-alive pool for every upstream call."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=len(CANDIDATES) + 2, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update(HEADERS)
+    return s
+
+
+class EndpointStats:
+    """Per-candidate latency (EWMA) and success counters, used to order the race."""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def entry(self, key):
+        return self.endpoints.setdefault(key, {
+            "attempts": 0, "successes": 0, "failures": 0, "cancelled": 0,
+            "ewma_latency": None, "last_error": None, "last_success_at": None,
+        })
+
+    def record(self, key, latency, ok, error=None):
+        with self.lock:
+            e = self.entry(key)
+            e["attempts"] += 1
+            if ok:
+                e["successes"] += 1
+                e["last_success_at"] = time.time()
+                e["ewma_latency"] = latency if e["ewma_latency"] is None else (
+                    self.alpha * latency + (1 - self.alpha) * e["ewma_latency"]
+                )
+            else:
+                e["failures"] += 1
+                e["last_error"] = error
+
+    def cancelled(self, key):
+        """A request abandoned before it finished: says nothing about the endpoint, so it isn't an attempt."""
+        with self.lock:
+            self.entry(key)["cancelled"] += 1
+
+    def rank(self, keys):
+        """Healthiest-then-fastest first; untried endpoints keep their configured order."""
+        with self.lock:
+            def sort_key(item):
+                index, key = item
+                e = self.endpoints.get(key)
+                if not e or not e["attempts"]:
+                    return (0.5, float("inf"), index)
+                failure_rate = e["failures"] / e["attempts"]
+                latency = e["ewma_latency"] if e["ewma_latency"] is not None else float("inf")
+                return (failure_rate, latency, index)
+            return [key for _, key in sorted(enumerate(keys), key=sort_key)]
+
+    def snapshot(self):
+        with self.lock:
+            return {k: dict(v) for k, v in self.endpoints.items()}
+
+
+class FeedClient:
+    """
+    Fetches the feed over a pooled session. Candidates are raced: the
+    best-ranked one starts immediately and another is hedged in every
+    FETCH_HEDGE_DELAY seconds until one returns posts. ETag/Last-Modified
+    validators are replayed so an unchanged feed costs a 304.
+    """
+
+    def __init__(self, candidates=CANDIDATES):
+        self.candidates = dict(candidates)
+        self.order = [key for key, _ in candidates]
+        self.session = build_session()
+        self.stats = EndpointStats()
+        self.validators = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=len(candidates) + 2, thread_name_prefix="feed")
+
+    def conditional_headers(self, key):
+        with self.lock:
+            v = self.validators.get(key, {})
+        headers = {}
+        if v.get("etag"):
+            headers["If-None-Match"] = v["etag"]
+        if v.get("last_modified"):
+            headers["If-Modified-Since"] = v["last_modified"]
+        return headers
+
+    def fetch_one(self, key):
+        """Returns (key, posts, not_modified). Raises on any failure."""
+        url = self.candidates[key]()
+        started = time.perf_counter()
+        try:
+            r = self.session.get(url, headers=self.conditional_headers(key),
+                                 timeout=(FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT))
+            if r.status_code == 304:
+                self.stats.record(key, time.perf_counter() - started, True)
+                return key, self.last_page(key), True
+            if r.status_code != 200:
+                raise RuntimeError(f"Status {r.status_code}")
+            posts = r.json().get("posts", [])
+            if not posts:
+                raise RuntimeError("Empty feed")
+        except Exception as e:
+            self.stats.record(key, time.perf_counter() - started, False, str(e)[:200])
+            raise
+
+        self.stats.record(key, time.perf_counter() - started, True)
+        self.remember_validators(key, r.headers, posts)
+        return key, posts, False
+
+    def remember_validators(self, key, headers, posts):
+        with self.lock:
+            self.validators[key] = {
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                # A 304 means the page is still this one; the collector may need it to resume a gap
+                "posts": posts,
+            }
+
+    def last_page(self, key):
+        with self.lock:
+            return self.validators.get(key, {}).get("posts", [])
+
+    def fetch_feed(self):
+        """
+        Race the candidates. Returns (posts, key, not_modified); posts is
+        empty with key None when every candidate failed. On a 304, posts is
+        the page that candidate last served.
+        """
+        queue = self.stats.rank(self.order)
+        deadline = time.monotonic() + FETCH_DEADLINE
+        running = set()
+
+        while queue or running:
+            if queue:
+                key = queue.pop(0)
+                logger.info(f"Fetching data from {self.candidates[key]()}...")
+                running.add(self.executor.submit(self.fetch_one, key))
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wait up to the hedge delay (or until the deadline once nothing is left to hedge)
+            timeout = min(FETCH_HEDGE_DELAY, remaining) if queue else remaining
+            done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    key, posts, not_modified = future.result()
+                except Exception as e:
+                    logger.warning(f"Exception fetching feed candidate: {e}")
+                    continue
+                # Losers keep running in the pool and still feed their latency into the stats
+                return posts, key, not_modified
+
+        logger.warning(f"No feed candidate answered within {FETCH_DEADLINE}s")
+        return [], None, False
+
+    def get_json(self, url):
+        r = self.session.get(url, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT))
+        if r.status_code != 200:
+            raise RuntimeError(f"Status {r.status_code}")
+        return r.json()
+
+
+class AsyncFeedClient:
+    """
+    asyncio counterpart of FeedClient for the in-app collector loop. Shares
+    the sync client's endpoint stats and validators, so ordering and 304s
+    carry over between the two. Hedged losers are cancelled outright.
+    """
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.client = None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=httpx.Timeout(FETCH_READ_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=len(CANDIDATES) + 2, max_keepalive_connections=4),
+            )
+        return self.client
+
+    async def fetch_one(self, key):
+        url = self.shared.candidates[key]()
+        started = time.perf_counter()
+        try:
+            r = await self.get_client().get(url, headers=self.shared.conditional_headers(key))
+            if r.status_code == 304:
+                self.shared.stats.record(key, time.perf_counter() - started, True)
+                return key, self.shared.last_page(key), True
+            if r.status_code != 200:
+                raise RuntimeError(f"Status {r.status_code}")
+            posts = r.json().get("posts", [])
+            if not posts:
+                raise RuntimeError("Empty feed")
+        except asyncio.CancelledError:
+            # Lost the race (or the deadline passed): neither a success nor a failure. The
+            # winner's latency already ranks it ahead.
+            self.shared.stats.cancelled(key)
+            raise
+        except Exception as e:
+            self.shared.stats.record(key, time.perf_counter() - started, False, str(e)[:200])
+            raise
+
+        self.shared.stats.record(key, time.perf_counter() - started, True)
+        self.shared.remember_validators(key, r.headers, posts)
+        return key, posts, False
+
+    async def fetch_feed(self):
+        queue = self.shared.stats.rank(self.shared.order)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + FETCH_DEADLINE
+        running = set()
+        try:
+            while queue or running:
+                if queue:
+                    key = queue.pop(0)
+                    logger.info(f"Fetching data from {self.shared.candidates[key]()}...")
+                    running.add(asyncio.create_task(self.fetch_one(key)))
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                timeout = min(FETCH_HEDGE_DELAY, remaining) if queue else remaining
+                done, running = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Exception fetching feed candidate: {task.exception()}")
+                        continue
+                    key, posts, not_modified = task.result()
+                    return posts, key, not_modified
+        finally:
+            for task in running:
+                task.cancel()
+
+        logger.warning(f"No feed candidate answered within {FETCH_DEADLINE}s")
+        return [], None, False
+
+    async def get_json(self, url):
+        r = await self.get_client().get(url)
+        if r.status_code != 200:
+            raise RuntimeError(f"Status {r.status_code}")
+        return r.json()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+feed_client = FeedClient()
+async_feed_client = AsyncFeedClient(feed_client)
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from database import SessionLocal, Post
 from collector import translate_text
+from translation_cache import translation_cache
+from translation_queue import store_translations
 import logging
 import time
 
@@ -11,35 +13,45 @@ def force_translate():
     db = SessionLocal()
     try:
         # Only translate the latest 20 posts to save time and API quota
-        posts = db.query(Post).order_by(Post.created_at.desc()).limit(20).all()
+        posts = db.query(Post.id, Post.title, Post.content).order_by(Post.created_at.desc()).limit(20).all()
+        # Hand the connection back before translating: on SQLite the memo writes need it
+        db.commit()
         logger.info(f"Found {len(posts)} latest posts to check/translate...")
         
         count = 0
+        # Stored after the loop, for the same reason: an open write would hold the SQLite
+        # lock while the memo writes on its own session, and those writes would time out
+        rows = []
         for p in posts:
             # Check if translation is missing or same as original (assuming English original)
             # Or just force update for these 20
             if p.title:
                 logger.info(f"Translating: {p.title[:30]}...")
                 try:
+                    # Repeated titles/bodies are answered from the translation memo
+                    misses_before = translation_cache.stats()["misses"]
+                    
                     # Translate Title
                     zh_title = translate_text(p.title, 'zh-CN')
                     if zh_title and zh_title != p.title:
-                        p.title_zh = zh_title
+                        rows.append({"entity_type": "post", "entity_id": p.id, "field": "title", "lang": "zh", "text": zh_title})
                     
                     # Translate Content (if exists and not too long)
                     if p.content:
                         zh_content = translate_text(p.content, 'zh-CN')
                         if zh_content and zh_content != p.content:
-                            p.content_zh = zh_content
+                            rows.append({"entity_type": "post", "entity_id": p.id, "field": "content", "lang": "zh", "text": zh_content})
                             
                     count += 1
-                    # Sleep briefly to be nice to the API
-                    time.sleep(0.5)
+                    # Sleep briefly to be nice to the API, but only if we actually called it
+                    if translation_cache.stats()["misses"] > misses_before:
+                        time.sleep(0.5)
                 except Exception as e:
                     logger.error(f"Error translating {p.id}: {e}")
             
+        store_translations(db, rows)
         db.commit()
-        logger.info(f"Translation update complete for {count} posts.")
+        logger.info(f"Translation update complete for {count} posts. Cache: {translation_cache.stats()}")
     except Exception as e:
         logger.error(f"Error: {e}")
     finally:
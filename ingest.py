@@ -0,0 +1,291 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import Author, Submolt, Post, Comment, get_insert
+from translation_queue import LANGUAGE_TARGETS, COMMENT_LANGUAGES, enqueue_jobs, load_translation_keys
+from search_index import index_posts
+from trends import index_post_terms
+from activity import record_activity
+from leaderboards import update_leaderboards
+from score_history import load_histories, record_samples
+from ranking import annotate_rankings
+from pg_copy import copy_enabled, copy_upsert
+from datetime import datetime
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+# Comment authors only carry a subset of the profile, so their upsert must not clobber the rest
+PARTIAL_AUTHOR_COLUMNS = ["name", "avatar_url", "karma"]
+
+
+def parse_date(date_str):
+    if not date_str:
+        return None
+    try:
+        # Handle format: 2026-01-30T05:39:05.821Z
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def load_existing(db: Session, id_column, ids, *columns):
+    """Fetch rows for all ids with one IN query per chunk, keyed by id."""
+    ids = list(ids)
+    found = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[i:i + IN_CHUNK_SIZE]
+        for row in db.query(id_column, *columns).filter(id_column.in_(chunk)).all():
+            found[row[0]] = row
+    return found
+
+
+def upsert_rows(db: Session, model, rows, update_columns, coalesce_columns=()):
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE for a homogeneous list of row dicts.
+    update_columns are overwritten from the incoming row; coalesce_columns only
+    fill in values that are still NULL in the table.
+    """
+    if not rows:
+        return 0
+    if copy_enabled(db, rows):
+        return copy_upsert(db, model, rows, update_columns, coalesce_columns)
+
+    insert = get_insert(db)
+    if insert is None:
+        # Unknown dialect: fall back to the ORM merge path
+        for row in rows:
+            db.merge(model(**row))
+        return len(rows)
+
+    table = model.__table__
+    stmt = insert(table)
+    set_ = {c: stmt.excluded[c] for c in update_columns}
+    for c in coalesce_columns:
+        set_[c] = func.coalesce(table.c[c], stmt.excluded[c])
+    if set_:
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.id])
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def collect_rows(posts):
+    """
+    Flatten a feed payload into per-table row dicts keyed by id.
+    Later occurrences win, matching the old per-row upsert order.
+    """
+    authors = {}
+    partial_authors = {}
+    submolts = {}
+    post_rows = {}
+    comment_rows = {}
+
+    for p in posts:
+        author_data = p.get("author", {})
+        if not author_data:
+            continue
+
+        author_id = author_data.get("id")
+        partial_authors.pop(author_id, None)
+        authors[author_id] = {
+            "id": author_id,
+            "name": author_data.get("name"),
+            "description": author_data.get("description"),
+            "avatar_url": author_data.get("avatarUrl"),
+            "karma": author_data.get("karma", 0),
+            "follower_count": author_data.get("followerCount", 0),
+            "following_count": author_data.get("followingCount", 0),
+            "is_claimed": author_data.get("isClaimed", False),
+            "is_active": author_data.get("isActive", True),
+            "created_at": parse_date(author_data.get("createdAt")),
+            "last_active": parse_date(author_data.get("lastActive")),
+        }
+
+        submolt_data = p.get("submolt", {})
+        if submolt_data:
+            submolts[submolt_data.get("id")] = {
+                "id": submolt_data.get("id"),
+                "name": submolt_data.get("name"),
+                "display_name": submolt_data.get("display_name"),
+            }
+
+        post_id = p.get("id")
+        post_rows[post_id] = {
+            "id": post_id,
+            "title": p.get("title"),
+            "content": p.get("content"),
+            "type": p.get("type"),
+            "author_id": author_id,
+            "submolt_id": submolt_data.get("id") if submolt_data else None,
+            "upvotes": p.get("upvotes", 0),
+            "downvotes": p.get("downvotes", 0),
+            "score": p.get("score", 0),
+            "comment_count": p.get("comment_count", 0),
+            "hot_score": p.get("hot_score", 0),
+            "is_pinned": p.get("is_pinned", False),
+            "is_locked": p.get("is_locked", False),
+            "is_deleted": p.get("is_deleted", False),
+            "created_at": parse_date(p.get("created_at")),
+            "updated_at": parse_date(p.get("updated_at")),
+        }
+
+        for c in p.get("comments", []) or []:
+            c_author_data = c.get("author", {})
+            if not c_author_data:
+                continue
+
+            c_author_id = c_author_data.get("id")
+            partial = {
+                "name": c_author_data.get("name"),
+                "avatar_url": c_author_data.get("avatarUrl"),
+                "karma": c_author_data.get("karma", 0),
+            }
+            if c_author_id in authors:
+                authors[c_author_id].update(partial)
+            else:
+                partial_authors[c_author_id] = {"id": c_author_id, **partial}
+
+            comment_id = c.get("id")
+            comment_rows[comment_id] = {
+                "id": comment_id,
+                "content": c.get("content"),
+                "author_id": c_author_id,
+                "post_id": post_id,
+                "upvotes": c.get("upvotes", 0),
+                "created_at": parse_date(c.get("createdAt")),
+            }
+
+    return authors, partial_authors, submolts, post_rows, comment_rows
+
+
+def payload_hash(row):
+    """Stable hash of a row dict, used to skip rewriting rows upstream didn't change."""
+    data = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def changed_rows(rows, existing):
+    """Stamp each row with its payload hash and keep only new or modified ones."""
+    changed = []
+    for row in rows.values():
+        row["payload_hash"] = payload_hash(row)
+        known = existing.get(row["id"])
+        if known is None or known[1] != row["payload_hash"]:
+            changed.append(row)
+    return changed
+
+
+def job_rows(entity_type, entity_id, field, langs):
+    return [{
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "field": field,
+        "lang": lang,
+        "state": "pending",
+        "attempts": 0,
+    } for lang in langs]
+
+
+def save_posts(db: Session, posts, is_offline=False):
+    """
+    Set-based ingest of one feed batch: one IN query per table to find what
+    already exists, then one INSERT ... ON CONFLICT DO UPDATE per table.
+    Translations are queued, not performed, so ingest never waits on the
+    translator. Returns a stats dict with per-table counts and rows/sec.
+    Does not commit.
+    """
+    started = time.perf_counter()
+    authors, partial_authors, submolts, post_rows, comment_rows = collect_rows(posts)
+
+    existing_authors = load_existing(db, Author.id, list(authors) + list(partial_authors), Author.payload_hash)
+    existing_submolts = load_existing(db, Submolt.id, submolts, Submolt.payload_hash)
+    existing_posts = load_existing(db, Post.id, post_rows, Post.payload_hash)
+    existing_comments = load_existing(db, Comment.id, comment_rows, Comment.payload_hash)
+
+    # Queue a job for every (field, language) that has no translation yet, so a newly
+    # added language is backfilled for posts still in the feed. Offline mode has no
+    # translator; readers fall back to the original text.
+    jobs = []
+    if not is_offline:
+        post_keys = load_translation_keys(db, "post", post_rows)
+        for post_id, row in post_rows.items():
+            for field in ("title", "content"):
+                if row[field]:
+                    missing = [lang for lang in LANGUAGE_TARGETS if (post_id, field, lang) not in post_keys]
+                    jobs.extend(job_rows("post", post_id, field, missing))
+
+        comment_keys = load_translation_keys(db, "comment", comment_rows)
+        for comment_id, row in comment_rows.items():
+            if row["content"]:
+                missing = [lang for lang in COMMENT_LANGUAGES if (comment_id, "content", lang) not in comment_keys]
+                jobs.extend(job_rows("comment", comment_id, "content", missing))
+
+    # Only rows whose payload differs from the last sync are written
+    changed_authors = changed_rows(authors, existing_authors)
+    changed_partial_authors = changed_rows(partial_authors, existing_authors)
+    changed_submolts = changed_rows(submolts, existing_submolts)
+    changed_posts = changed_rows(post_rows, existing_posts)
+    changed_comments = changed_rows(comment_rows, existing_comments)
+
+    # Parents before children so PostgreSQL foreign keys are satisfied
+    author_columns = [c for c in Author.__table__.columns.keys() if c != "id"]
+    written = upsert_rows(db, Author, changed_authors, author_columns)
+    written += upsert_rows(db, Author, changed_partial_authors, PARTIAL_AUTHOR_COLUMNS + ["payload_hash"])
+    written += upsert_rows(db, Submolt, changed_submolts, ["name", "display_name", "payload_hash"])
+
+    # Velocity is measured against the series as it was before this sync's sample
+    now = datetime.utcnow()
+    histories = load_histories(db, [row["id"] for row in changed_posts])
+    annotate_rankings(changed_posts, histories, now)
+    post_columns = [c for c in next(iter(changed_posts), {}) if c != "id"]
+    written += upsert_rows(db, Post, changed_posts, post_columns)
+
+    comment_columns = ["content", "author_id", "post_id", "upvotes", "created_at", "payload_hash"]
+    written += upsert_rows(db, Comment, changed_comments, comment_columns)
+
+    # Keep the full-text index and trend counters in step with the rows just written
+    index_posts(db, [row["id"] for row in changed_posts])
+    index_post_terms(db, changed_posts)
+    # Hourly activity counts each post and comment once, when it is first seen
+    record_activity(
+        db,
+        [row for post_id, row in post_rows.items() if post_id not in existing_posts],
+        [row for comment_id, row in comment_rows.items() if comment_id not in existing_comments],
+        {post_id: row["submolt_id"] for post_id, row in post_rows.items()},
+    )
+    # Changed rows carry the new counters; unchanged posts add nothing to a step series
+    record_samples(db, changed_posts, now, histories)
+    update_leaderboards(
+        db,
+        changed_authors + changed_partial_authors,
+        changed_posts,
+        [row for post_id, row in post_rows.items() if post_id not in existing_posts],
+        {author_id: row["name"] for author_id, row in {**partial_authors, **authors}.items()},
+    )
+
+    # Jobs reference the rows above, so they go in the same transaction. Keys still waiting
+    # in the queue from an earlier sync are not queued (or counted) again.
+    queued = enqueue_jobs(db, jobs)
+
+    elapsed = time.perf_counter() - started
+    all_author_ids = set(authors) | set(partial_authors)
+    stats = {
+        "new_posts": len(set(post_rows) - set(existing_posts)),
+        "updated_posts": sum(1 for row in changed_posts if row["id"] in existing_posts),
+        "new_comments": len(set(comment_rows) - set(existing_comments)),
+        "new_authors": len(all_author_ids - set(existing_authors)),
+        "new_submolts": len(set(submolts) - set(existing_submolts)),
+        "translation_jobs": queued,
+        "rows": written,
+        "unchanged": (len(authors) + len(partial_authors) + len(submolts) + len(post_rows) + len(comment_rows)) - written,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(written / elapsed, 1) if elapsed > 0 else float(written),
+    }
+    return stats
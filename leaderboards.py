@@ -0,0 +1,205 @@
+from sqlalchemy import func, insert as sql_insert
+from sqlalchemy.orm import Session
+from database import Author, Post, LeaderboardEntry, get_state, set_state
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_SIZE = 100
+VOCAL_WINDOW = timedelta(hours=24)
+VIRAL_WINDOW = timedelta(hours=48)
+VOCAL_WATERMARK_KEY = "leaderboard_watermark:vocal"
+
+ENTRY_COLUMNS = ["entity_id", "score", "name", "avatar_url", "author_id", "author_name", "comment_count", "created_at"]
+
+
+def naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def entry(entity_id, score, name, **extra):
+    e = dict.fromkeys(ENTRY_COLUMNS)
+    e.update(entity_id=entity_id, score=score or 0, name=name, **extra)
+    return e
+
+
+def rank_key(e):
+    return (-e["score"], e["entity_id"])
+
+
+# Full recomputes from the source tables, used to build a board and to refill it
+# when a member drops out or falls (the next-best entity is outside the board)
+
+def karma_source(db: Session, now):
+    rows = db.query(Author.id, Author.karma, Author.name, Author.avatar_url).order_by(
+        Author.karma.desc(), Author.id
+    ).limit(LEADERBOARD_SIZE).all()
+    return [entry(id, karma, name, avatar_url=avatar_url) for id, karma, name, avatar_url in rows]
+
+
+def vocal_counts(db: Session, now, author_ids=None):
+    query = db.query(Author.id, Author.name, func.count(Post.id).label("post_count")).join(
+        Post, Post.author_id == Author.id
+    ).filter(Post.created_at >= now - VOCAL_WINDOW)
+    if author_ids is not None:
+        query = query.filter(Author.id.in_(author_ids))
+    query = query.group_by(Author.id, Author.name).order_by(func.count(Post.id).desc(), Author.id)
+    if author_ids is None:
+        query = query.limit(LEADERBOARD_SIZE)
+    return [entry(id, count, name) for id, name, count in query.all()]
+
+
+def vocal_source(db: Session, now):
+    return vocal_counts(db, now)
+
+
+def viral_source(db: Session, now):
+    rows = db.query(Post.id, Post.score, Post.title, Post.author_id, Author.name, Post.comment_count, Post.created_at).outerjoin(
+        Author, Post.author_id == Author.id
+    ).filter(Post.created_at >= now - VIRAL_WINDOW).order_by(Post.score.desc(), Post.id).limit(LEADERBOARD_SIZE).all()
+    return [entry(id, score, title, author_id=author_id, author_name=author_name,
+                  comment_count=comment_count, created_at=created_at)
+            for id, score, title, author_id, author_name, comment_count, created_at in rows]
+
+
+SOURCES = {
+    "karma": karma_source,
+    "vocal": vocal_source,
+    "viral": viral_source,
+}
+
+
+def load_board(db: Session, board):
+    rows = db.query(LeaderboardEntry).filter(LeaderboardEntry.board == board).order_by(LeaderboardEntry.rank).all()
+    return {r.entity_id: {c: getattr(r, c) for c in ENTRY_COLUMNS} for r in rows}
+
+
+def write_board(db: Session, board, entries, current):
+    """Replace a board's rows, skipping the write when nothing moved. Does not commit."""
+    if [tuple(e[c] for c in ENTRY_COLUMNS) for e in entries] == [tuple(e[c] for c in ENTRY_COLUMNS) for e in current.values()]:
+        return False
+    db.query(LeaderboardEntry).filter(LeaderboardEntry.board == board).delete(synchronize_session=False)
+    if entries:
+        db.execute(sql_insert(LeaderboardEntry.__table__),
+                   [{"board": board, "rank": rank, **e} for rank, e in enumerate(entries, 1)])
+    return True
+
+
+def merge_board(db: Session, board, candidates=(), removed=(), refill=False, now=None):
+    """
+    Fold changed entities into a board's top-K. Candidates only ever rising
+    are merged in place; if a member fell, left its window or was deleted,
+    the board is refilled from its source query instead. Returns True when
+    the stored board changed. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    current = load_board(db, board)
+    merged = dict(current)
+    for entity_id in removed:
+        if merged.pop(entity_id, None) is not None:
+            refill = True
+    for e in candidates:
+        old = merged.get(e["entity_id"])
+        if old is not None and e["score"] < old["score"]:
+            refill = True
+        merged[e["entity_id"]] = e
+
+    if refill:
+        entries = SOURCES[board](db, now)
+    else:
+        entries = sorted(merged.values(), key=rank_key)[:LEADERBOARD_SIZE]
+    return write_board(db, board, entries, current)
+
+
+def update_leaderboards(db: Session, authors, posts, new_posts, author_names, now=None):
+    """
+    Apply one ingest batch (row dicts): authors whose karma/profile changed,
+    posts whose score/title changed and posts seen for the first time.
+    Does not commit.
+    """
+    now = now or datetime.utcnow()
+    changed = merge_board(db, "karma", [
+        entry(a["id"], a.get("karma"), a.get("name"), avatar_url=a.get("avatar_url")) for a in authors
+    ], now=now)
+
+    viral_cutoff = now - VIRAL_WINDOW
+    in_window, out_of_window = [], []
+    for p in posts:
+        created_at = naive_utc(p.get("created_at"))
+        if created_at is None or created_at < viral_cutoff:
+            out_of_window.append(p["id"])
+            continue
+        in_window.append(entry(p["id"], p.get("score"), p.get("title"), author_id=p.get("author_id"),
+                               author_name=author_names.get(p.get("author_id")),
+                               comment_count=p.get("comment_count"), created_at=created_at))
+    changed |= merge_board(db, "viral", in_window, removed=out_of_window, now=now)
+
+    # New posts only raise their authors' counts, so a re-count of just those authors merges cleanly
+    vocal_cutoff = now - VOCAL_WINDOW
+    vocal_authors = {p.get("author_id") for p in new_posts
+                     if p.get("author_id") and naive_utc(p.get("created_at")) and naive_utc(p.get("created_at")) >= vocal_cutoff}
+    if vocal_authors:
+        changed |= merge_board(db, "vocal", vocal_counts(db, now, vocal_authors), now=now)
+    return changed
+
+
+def age_out_leaderboards(db: Session, now=None):
+    """Refill the windowed boards once posts have crossed their window edge. Does not commit."""
+    now = now or datetime.utcnow()
+    changed = False
+
+    viral_cutoff = now - VIRAL_WINDOW
+    viral = load_board(db, "viral")
+    if any(e["created_at"] is None or e["created_at"] < viral_cutoff for e in viral.values()):
+        changed |= merge_board(db, "viral", refill=True, now=now)
+
+    vocal_cutoff = now - VOCAL_WINDOW
+    watermark = get_state(db, VOCAL_WATERMARK_KEY)
+    if watermark is not None:
+        crossed = db.query(Post.id).filter(
+            Post.created_at >= datetime.fromisoformat(watermark), Post.created_at < vocal_cutoff
+        ).first()
+        if crossed is not None:
+            changed |= merge_board(db, "vocal", refill=True, now=now)
+    set_state(db, VOCAL_WATERMARK_KEY, vocal_cutoff.isoformat())
+    return changed
+
+
+def prune_leaderboards(db: Session, now=None):
+    """
+    Called after retention deleted rows: drop deleted posts from 'viral' and
+    deleted authors from 'karma', and re-count 'vocal'. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    changed = False
+    for board, model in (("viral", Post), ("karma", Author)):
+        members = load_board(db, board)
+        existing = {id for (id,) in db.query(model.id).filter(model.id.in_(list(members))).all()} if members else set()
+        changed |= merge_board(db, board, removed=set(members) - existing, now=now)
+    changed |= merge_board(db, "vocal", refill=True, now=now)
+    return changed
+
+
+def rebuild_leaderboards(db: Session, now=None):
+    now = now or datetime.utcnow()
+    for board in SOURCES:
+        merge_board(db, board, refill=True, now=now)
+    set_state(db, VOCAL_WATERMARK_KEY, (now - VOCAL_WINDOW).isoformat())
+
+
+def init_leaderboards(db: Session):
+    """Build the boards for databases that predate them."""
+    if db.query(LeaderboardEntry.board).first() is None and db.query(Author.id).first() is not None:
+        rebuild_leaderboards(db)
+        db.commit()
+        logger.info("Leaderboards materialized from existing data")
+
+
+def read_board(db: Session, board, limit=LEADERBOARD_SIZE):
+    """The stored top-K in rank order: one index range read."""
+    return db.query(LeaderboardEntry).filter(LeaderboardEntry.board == board).order_by(
+        LeaderboardEntry.rank
+    ).limit(limit).all()
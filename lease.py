@@ -0,0 +1,101 @@
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+from database import LeaseSessionLocal, ReadSessionLocal, Lease, get_insert
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# A holder that stops renewing loses the lease after LEASE_TTL seconds; renewals
+# happen every LEASE_RENEW. Hosts' clocks must agree to well within the TTL.
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))
+LEASE_RENEW = float(os.getenv("LEASE_RENEW", "10"))
+
+
+class LeaderLease:
+    """
+    Lock row with a TTL in the leases table, so only one of several
+    processes (uvicorn workers, replicas, standalone collectors) holds it at
+    a time. acquire() both takes a free or expired lease and renews one
+    already held. Writes go through LeaseSessionLocal: with SQLite in WAL
+    mode that is a connection of its own, so a renewal never waits for the
+    writer connection a sync is holding.
+    """
+
+    def __init__(self, name="collector", ttl=LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        # Local deadline (monotonic) until which our last successful renewal is good
+        self.valid_until = 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        now = datetime.utcnow()
+        values = {"holder": self.holder, "expires_at": now + timedelta(seconds=self.ttl)}
+        db = LeaseSessionLocal()
+        try:
+            taken = db.query(Lease).filter(
+                Lease.name == self.name, or_(Lease.holder == self.holder, Lease.expires_at < now)
+            ).update({
+                **values,
+                # Keep the original acquired_at on a renewal
+                "acquired_at": case((Lease.holder == self.holder, Lease.acquired_at), else_=now),
+            }, synchronize_session=False)
+            if not taken:
+                insert = get_insert(db)
+                row = {"name": self.name, "acquired_at": now, **values}
+                if insert is None:
+                    try:
+                        db.add(Lease(**row))
+                        db.flush()
+                        taken = 1
+                    except IntegrityError:
+                        db.rollback()
+                        taken = 0
+                else:
+                    stmt = insert(Lease.__table__).values(**row).on_conflict_do_nothing(index_elements=["name"])
+                    taken = db.execute(stmt).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        # Measured from before the write, so our view expires no later than the row does
+        self.valid_until = started + self.ttl if taken else 0.0
+        return bool(taken)
+
+    def valid(self):
+        return time.monotonic() < self.valid_until
+
+    def release(self):
+        """Expire the lease now if we hold it, so another process can take over without waiting out the TTL."""
+        self.valid_until = 0.0
+        db = LeaseSessionLocal()
+        try:
+            db.query(Lease).filter(Lease.name == self.name, Lease.holder == self.holder).update(
+                {"expires_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def status(self):
+        db = ReadSessionLocal()
+        try:
+            row = db.query(Lease).filter(Lease.name == self.name).first()
+            if row is None:
+                return {"name": self.name, "holder": None, "me": self.holder}
+            return {
+                "name": self.name,
+                "holder": row.holder if row.expires_at and row.expires_at > datetime.utcnow() else None,
+                "acquired_at": row.acquired_at,
+                "expires_at": row.expires_at,
+                "me": self.holder,
+            }
+        finally:
+            db.close()
@@ -1,19 +1,32 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, or_
-from database import SessionLocal, Post, Author, Submolt, Comment, init_db
-from collector import fetch_and_save_posts
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, aliased, load_only, with_expression
+from sqlalchemy import func, desc, or_, and_, tuple_
+from database import ReadSessionLocal, Post, Author, Submolt, Comment, Translation, get_generation, storage_info
+from collector import init_storage
+from collector_runtime import collector_runtime
+from translation_queue import queue_stats
+from translation_cache import translation_cache
+from response_cache import response_cache
+from feed_client import feed_client
+from search_index import search_post_ids, snippet, content_snippets
+from trends import TREND_WINDOWS, GLOBAL_SCOPE, top_terms
+from activity import ACTIVITY_RANGES, ACTIVITY_BUCKETS, activity_series
+from leaderboards import read_board
+from score_history import FIELDS as HISTORY_FIELDS, load_series
+from events import broker
+from archive import ARCHIVE_MAX_LIMIT, archive_available, archive_stats, query_archive
+from fast_response import fast_json
 from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Union
+from datetime import datetime
+import base64
+import json
 import logging
 import os
-import re
-from collections import Counter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,22 +50,12 @@ class SubmoltBase(BaseModel):
 class PostResponse(BaseModel):
     id: str
     title: Optional[str] = None
-    title_zh: Optional[str] = None
-    title_fr: Optional[str] = None
-    title_ja: Optional[str] = None
-    title_it: Optional[str] = None
-    title_ru: Optional[str] = None
-    title_ko: Optional[str] = None
-    title_es: Optional[str] = None
-    
     content: Optional[str] = None
-    content_zh: Optional[str] = None
-    content_fr: Optional[str] = None
-    content_ja: Optional[str] = None
-    content_it: Optional[str] = None
-    content_ru: Optional[str] = None
-    content_ko: Optional[str] = None
-    content_es: Optional[str] = None
+    
+    # Only filled when the request asks for a language (?lang=zh); null means not translated yet
+    lang: Optional[str] = None
+    title_translated: Optional[str] = None
+    content_translated: Optional[str] = None
     
     type: Optional[str] = None
     author: Optional[AuthorBase] = None
@@ -60,10 +63,22 @@ class PostResponse(BaseModel):
     upvotes: int = 0
     comment_count: int = 0
     score: int = 0
+    # Score gained per hour over the last hour, as of the post's last change
+    velocity: Optional[float] = None
     created_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
 
+class PostPage(BaseModel):
+    items: List[PostResponse]
+    # Opaque; pass back as ?cursor= for the next page. null on the last page
+    next_cursor: Optional[str] = None
+
+class SearchResult(PostResponse):
+    # HTML-escaped excerpt with matches wrapped in <mark>
+    snippet: Optional[str] = None
+    rank: Optional[float] = None
+
 # Scheduler setup
 scheduler = BackgroundScheduler()
 
@@ -71,30 +86,31 @@ scheduler = BackgroundScheduler()
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Initializing database...")
-    init_db()
+    init_storage()
     
+    logger.info(f"Starting collector (COLLECTOR_MODE={collector_runtime.mode})...")
+    # Async loop with an overlap guard; runs once immediately, then every 15s + jitter.
+    # In lease mode only the worker holding the collector lease runs it.
+    collector_runtime.start()
+
     logger.info("Starting scheduler...")
-    # Run once immediately on startup but in background to avoid blocking
-    try:
-        scheduler.add_job(fetch_and_save_posts, 'date', run_date=datetime.now())
-    except Exception as e:
-        logger.error(f"Initial fetch scheduling failed: {e}")
-        
-    # Randomized interval: 15 seconds + jitter
-    scheduler.add_job(fetch_and_save_posts, 'interval', seconds=15, jitter=5)
+    # Translations are drained off the ingest path by a bounded worker pool, in the collecting process only
+    scheduler.add_job(collector_runtime.drain_translations, 'interval', seconds=5, max_instances=1, coalesce=True)
     scheduler.start()
     
     yield
     
     # Shutdown
+    logger.info("Shutting down collector...")
+    await collector_runtime.stop()
     logger.info("Shutting down scheduler...")
     scheduler.shutdown()
 
 app = FastAPI(title="Moltbook Observer", lifespan=lifespan)
 
-# Dependency
+# Dependency; handlers only read, so they use the read-only pool and never wait on a sync's commit
 def get_db():
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
@@ -103,16 +119,231 @@ def get_db():
 class CommentResponse(BaseModel):
     id: str
     content: str
-    content_zh: Optional[str] = None
+    lang: Optional[str] = None
+    content_translated: Optional[str] = None
     author: AuthorBase
     upvotes: int
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+def with_translation(query, entity, entity_type, lang, fields=("title", "content"), preview_chars=None):
+    """
+    LEFT JOIN one language's translations onto an entity query; 'en' or None means originals only.
+    With preview_chars, translated content is truncated in SQL like the original (see preview()).
+    """
+    if not lang or lang == "en":
+        return query
+    for field in fields:
+        t = aliased(Translation)
+        text = func.substr(t.text, 1, preview_chars + 1) if preview_chars and field == "content" else t.text
+        query = query.outerjoin(t, and_(
+            t.entity_type == entity_type,
+            t.entity_id == entity.id,
+            t.field == field,
+            t.lang == lang
+        )).add_columns(text)
+    return query
+
+def attach_translation(rows, lang, fields=("title", "content")):
+    """Copy the joined translation columns onto the ORM objects for serialization."""
+    if not lang or lang == "en":
+        return rows
+    items = []
+    for row in rows:
+        # with_translation() adds no columns when no fields were asked for
+        obj = row[0] if fields else row
+        obj.lang = lang
+        for field, text in zip(fields, row[1:] if fields else ()):
+            setattr(obj, f"{field}_translated", text)
+        items.append(obj)
+    return items
+
+# Sparse fieldsets for the post list endpoints (?fields=title,author,score); id is always included
+POST_FIELDS = ("title", "content", "lang", "title_translated", "content_translated", "type",
+               "author", "submolt", "upvotes", "comment_count", "score", "velocity", "created_at")
+POST_COLUMNS = {
+    "title": Post.title,
+    "type": Post.type,
+    "upvotes": Post.upvotes,
+    "comment_count": Post.comment_count,
+    "score": Post.score,
+    "velocity": Post.velocity,
+    "created_at": Post.created_at,
+}
+
+def parse_fields(fields: Optional[str]):
+    """None (all fields) or the set of requested POST_FIELDS."""
+    if fields is None:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()} - {"id"}
+    unknown = requested - set(POST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+def translated_fields(fields):
+    """Which translation columns a request needs joined."""
+    return tuple(f for f in ("title", "content") if fields is None or f"{f}_translated" in fields)
+
+def post_query(db: Session, fields=None, preview_chars=None, extra_columns=()):
+    """
+    Post query that loads only the columns and relations in fields (None means
+    all). With preview_chars, content is truncated by the database into
+    Post.content_preview and the full body is never read.
+    """
+    wanted = POST_FIELDS if fields is None else fields
+    columns = [column for name, column in POST_COLUMNS.items() if name in wanted]
+    if "content" in wanted and not preview_chars:
+        columns.append(Post.content)
+    options = [load_only(Post.id, *columns, *extra_columns)]
+    if "content" in wanted and preview_chars:
+        options.append(with_expression(Post.content_preview, func.substr(Post.content, 1, preview_chars + 1)))
+    if "author" in wanted:
+        options.append(joinedload(Post.author).load_only(Author.id, Author.name, Author.description, Author.avatar_url, Author.karma))
+    if "submolt" in wanted:
+        options.append(joinedload(Post.submolt).load_only(Submolt.id, Submolt.name, Submolt.display_name))
+    return db.query(Post).options(*options)
+
+def preview(text, preview_chars):
+    """Cut a substr(text, 1, preview_chars + 1) result to preview_chars, marking the cut with an ellipsis."""
+    if not preview_chars or text is None or len(text) <= preview_chars:
+        return text
+    return text[:preview_chars].rstrip() + "…"
+
+# Hand-rolled projections for the hot list endpoints: same fields as the response
+# models above, but built straight from the row attributes without Pydantic validation
+def author_json(author):
+    if author is None:
+        return None
+    return {
+        "id": author.id,
+        "name": author.name,
+        "description": author.description,
+        "avatar_url": author.avatar_url,
+        "karma": author.karma or 0,
+    }
+
+def submolt_json(submolt):
+    if submolt is None:
+        return None
+    return {"id": submolt.id, "name": submolt.name, "display_name": submolt.display_name}
+
+POST_VALUES = {
+    "title": lambda p, n: p.title,
+    "content": lambda p, n: preview(p.content_preview, n) if n else p.content,
+    "lang": lambda p, n: getattr(p, "lang", None),
+    "title_translated": lambda p, n: getattr(p, "title_translated", None),
+    "content_translated": lambda p, n: preview(getattr(p, "content_translated", None), n),
+    "type": lambda p, n: p.type,
+    "author": lambda p, n: author_json(p.author),
+    "submolt": lambda p, n: submolt_json(p.submolt),
+    "upvotes": lambda p, n: p.upvotes or 0,
+    "comment_count": lambda p, n: p.comment_count or 0,
+    "score": lambda p, n: p.score or 0,
+    "velocity": lambda p, n: p.velocity,
+    "created_at": lambda p, n: p.created_at,
+}
+
+def post_json(post, fields=None, preview_chars=None):
+    if fields is not None or preview_chars:
+        # Only touch what post_query() loaded; anything else would lazy-load per row
+        return {"id": post.id, **{name: POST_VALUES[name](post, preview_chars)
+                                  for name in POST_FIELDS if fields is None or name in fields}}
+    return {
+        "id": post.id,
+        "title": post.title,
+        "content": post.content,
+        "lang": getattr(post, "lang", None),
+        "title_translated": getattr(post, "title_translated", None),
+        "content_translated": getattr(post, "content_translated", None),
+        "type": post.type,
+        "author": author_json(post.author),
+        "submolt": submolt_json(post.submolt),
+        "upvotes": post.upvotes or 0,
+        "comment_count": post.comment_count or 0,
+        "score": post.score or 0,
+        "velocity": post.velocity,
+        "created_at": post.created_at,
+    }
+
+def comment_json(comment):
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "lang": getattr(comment, "lang", None),
+        "content_translated": getattr(comment, "content_translated", None),
+        "author": author_json(comment.author),
+        "upvotes": comment.upvotes or 0,
+        "created_at": comment.created_at,
+    }
+
+# Sort orders that support keyset pagination; each has a (column, id) index
+CURSOR_SORTS = {
+    "new": Post.created_at,
+    "top": Post.score,
+    "discussed": Post.comment_count,
+    "hot": Post.hot_rank,
+    "rising": Post.rising_rank,
+}
+
+def encode_cursor(sort, value, post_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, post_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, post_id = json.loads(raw)
+        if cursor_sort != sort:
+            raise ValueError("cursor belongs to a different sort order")
+        if sort == "new":
+            value = datetime.fromisoformat(value)
+        elif sort in ("hot", "rising"):
+            if not isinstance(value, (int, float)):
+                raise ValueError("bad cursor value")
+        elif not isinstance(value, int):
+            raise ValueError("bad cursor value")
+        return value, str(post_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_posts_page(db: Session, sort: str, limit: int, lang: Optional[str], cursor: str, fields=None, preview_chars=None):
+    """One keyset page: WHERE (col, id) < (last col, last id), so deep pages cost the same as the first."""
+    column = CURSOR_SORTS.get(sort)
+    if column is None:
+        raise HTTPException(status_code=400, detail=f"Cursor pagination supports sort={', '.join(CURSOR_SORTS)}")
+
+    # NULLs sort differently per backend, so rows without a sort value are left out of paged results
+    # The sort column is always loaded: the next cursor is built from it
+    query = post_query(db, fields, preview_chars, extra_columns=(column,)).filter(column.isnot(None))
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        query = query.filter(tuple_(column, Post.id) < tuple_(value, last_id))
+    translated = translated_fields(fields)
+    query = with_translation(query, Post, "post", lang, translated, preview_chars).order_by(desc(column), desc(Post.id))
+    posts = attach_translation(query.limit(limit + 1).all(), lang, translated)
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+    return {"items": [post_json(p, fields, preview_chars) for p in posts], "next_cursor": next_cursor}
+
 # API Endpoints
-@app.get("/api/posts", response_model=List[PostResponse])
-def get_posts(skip: int = 0, limit: int = 100, sort: str = "new", db: Session = Depends(get_db)):
-    query = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt))
+@app.get("/api/posts", response_model=Union[List[PostResponse], PostPage])
+def get_posts(request: Request, skip: int = 0, limit: int = 100, sort: str = "new", lang: Optional[str] = None,
+              cursor: Optional[str] = None, fields: Optional[str] = None, preview_chars: Optional[int] = Query(None, ge=1),
+              db: Session = Depends(get_db)):
+    fields = parse_fields(fields)
+    # Any cursor param (an empty one starts from the top) switches to keyset pages: {items, next_cursor}
+    if cursor is not None:
+        return fast_json(request, get_posts_page(db, sort, limit, lang, cursor, fields, preview_chars))
+
+    translated = translated_fields(fields)
+    query = with_translation(post_query(db, fields, preview_chars), Post, "post", lang, translated, preview_chars)
     
     if sort == "new":
         query = query.order_by(desc(Post.created_at))
@@ -120,132 +351,225 @@ def get_posts(skip: int = 0, limit: int = 100, sort: str = "new", db: Session =
         query = query.order_by(desc(Post.score))
     elif sort == "discussed":
         query = query.order_by(desc(Post.comment_count))
+    elif sort == "hot" or sort == "rising":
+        column = CURSOR_SORTS[sort]
+        # Posts not ranked yet (before init_rankings has run) go last on every backend
+        query = query.order_by(column.is_(None), desc(column), desc(Post.id))
     elif sort == "random" or sort == "shuffle":
         query = query.order_by(func.random())
         
     posts = query.offset(skip).limit(limit).all()
-    return posts
+    return fast_json(request, [post_json(p, fields, preview_chars) for p in attach_translation(posts, lang, translated)])
 
 @app.get("/api/posts/{post_id}", response_model=PostResponse)
-def get_post_detail(post_id: str, db: Session = Depends(get_db)):
-    post = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt)).filter(Post.id == post_id).first()
+def get_post_detail(request: Request, post_id: str, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    query = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt)).filter(Post.id == post_id)
+    post = with_translation(query, Post, "post", lang).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    return fast_json(request, post_json(attach_translation([post], lang)[0]))
 
 @app.get("/api/posts/{post_id}/comments", response_model=List[CommentResponse])
-def get_post_comments(post_id: str, db: Session = Depends(get_db)):
-    comments = db.query(Comment).options(joinedload(Comment.author)).filter(Comment.post_id == post_id).order_by(desc(Comment.created_at)).all()
-    return comments
+def get_post_comments(request: Request, post_id: str, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    query = db.query(Comment).options(joinedload(Comment.author)).filter(Comment.post_id == post_id)
+    comments = with_translation(query, Comment, "comment", lang, fields=("content",)).order_by(desc(Comment.created_at)).all()
+    return fast_json(request, [comment_json(c) for c in attach_translation(comments, lang, fields=("content",))])
+
+@app.get("/api/posts/{post_id}/history")
+def get_post_history(request: Request, post_id: str, db: Session = Depends(get_db)):
+    """Engagement samples recorded at each sync where the counters moved, oldest first."""
+    series = load_series(db, post_id)
+    if series is None:
+        if db.query(Post.id).filter(Post.id == post_id).first() is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        series = {"timestamps": [], **{field: [] for field in HISTORY_FIELDS}, "stored_bytes": 0}
+    return fast_json(request, {"post_id": post_id, **series})
 
-@app.get("/api/search", response_model=List[PostResponse])
-def search_posts(q: str, limit: int = 20, db: Session = Depends(get_db)):
+def ilike_search(db: Session, q: str, query=None):
+    """Unindexed fallback: substring match over originals, translations and author names."""
     search_term = f"%{q}%"
-    posts = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt)).filter(
+    # Match translations in any language, not just the one being displayed
+    translated_match = db.query(Translation.entity_id).filter(
+        Translation.entity_type == "post",
+        Translation.text.ilike(search_term)
+    )
+    if query is None:
+        query = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt))
+    return query.filter(
         or_(
             Post.title.ilike(search_term),
             Post.content.ilike(search_term),
-            Post.title_zh.ilike(search_term),
-            Post.content_zh.ilike(search_term),
+            Post.id.in_(translated_match),
             # Also search author name
             Post.author.has(Author.name.ilike(search_term))
         )
-    ).order_by(desc(Post.created_at)).limit(limit).all()
-    return posts
+    )
+
+@app.get("/api/search", response_model=List[SearchResult])
+def search_posts(request: Request, q: str, limit: int = 20, offset: int = 0, lang: Optional[str] = None,
+                 fields: Optional[str] = None, preview_chars: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    fields = parse_fields(fields)
+    sparse = fields is not None or preview_chars is not None
+    # Snippets are cut from the titles and the translated content, so those are loaded even if not
+    # returned. The original content is only read in full when the response includes it.
+    load_fields = None if fields is None else fields | {"title", "title_translated", "content_translated"}
+    content_loaded = not preview_chars and (fields is None or "content" in fields)
+    translated = translated_fields(load_fields)
+    base = post_query(db, load_fields, preview_chars) if sparse else None
+
+    ranked = search_post_ids(db, q, limit=limit, offset=offset)
+    if ranked is None:
+        # No full-text index on this backend (or nothing indexable in q)
+        query = with_translation(ilike_search(db, q, base), Post, "post", lang, translated, preview_chars)
+        posts = attach_translation(query.order_by(desc(Post.created_at)).offset(offset).limit(limit).all(), lang, translated)
+        ranks = {}
+    else:
+        ranks = dict(ranked)
+        if base is None:
+            base = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt))
+        query = base.filter(Post.id.in_(ranks))
+        posts = attach_translation(with_translation(query, Post, "post", lang, translated, preview_chars).all(), lang, translated)
+        posts.sort(key=lambda p: -ranks[p.id])
+
+    # Without full bodies loaded, the database cuts the content excerpt around the match
+    content_excerpts = {} if content_loaded else content_snippets(db, [p.id for p in posts], q)
+
+    results = []
+    for post in posts:
+        item = post_json(post, load_fields, preview_chars)
+        # Prefer an excerpt in the language being displayed
+        excerpt = (
+            snippet(item["content_translated"], q)
+            or (snippet(post.content, q) if content_loaded else content_excerpts.get(post.id))
+            or snippet(item["title_translated"], q)
+            or snippet(post.title, q)
+        )
+        if fields is not None:
+            item = {name: value for name, value in item.items() if name == "id" or name in fields}
+        item["rank"] = ranks.get(post.id)
+        item["snippet"] = excerpt
+        results.append(item)
+    return fast_json(request, results)
 
 @app.get("/api/authors/{author_id}")
-def get_author_profile(author_id: str, db: Session = Depends(get_db)):
+def get_author_profile(request: Request, author_id: str, lang: Optional[str] = None, fields: Optional[str] = None,
+                       preview_chars: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    fields = parse_fields(fields)
     author = db.query(Author).filter(Author.id == author_id).first()
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     
     # Get recent posts
-    posts = db.query(Post).options(joinedload(Post.author), joinedload(Post.submolt)).filter(Post.author_id == author_id).order_by(desc(Post.created_at)).limit(50).all()
+    translated = translated_fields(fields)
+    query = post_query(db, fields, preview_chars).filter(Post.author_id == author_id)
+    query = with_translation(query, Post, "post", lang, translated, preview_chars)
+    posts = attach_translation(query.order_by(desc(Post.created_at)).limit(50).all(), lang, translated)
     
     # Calculate stats
     post_count = db.query(Post).filter(Post.author_id == author_id).count()
     
-    return {
-        "author": author,
-        "posts": posts,
+    return fast_json(request, {
+        "author": {
+            **author_json(author),
+            "follower_count": author.follower_count,
+            "following_count": author.following_count,
+            "is_claimed": author.is_claimed,
+            "is_active": author.is_active,
+            "created_at": author.created_at,
+            "last_active": author.last_active,
+        },
+        "posts": [post_json(p, fields, preview_chars) for p in posts],
         "stats": {
             "post_count": post_count,
             "karma": author.karma
         }
-    }
+    })
+
+def cached(db: Session, key, compute):
+    """Serve key from the response cache until the collector bumps the data generation."""
+    return response_cache.get_or_compute(key, get_generation(db), compute)
+
+def current_hour():
+    # Part of the key for endpoints whose output also depends on the clock (rolling windows)
+    return datetime.utcnow().strftime("%Y-%m-%dT%H")
+
+def submolt_scope(db: Session, submolt: Optional[str]):
+    """Scope key for the rollup tables: a submolt id (looked up by name or id), or '' for all."""
+    if not submolt:
+        return GLOBAL_SCOPE
+    row = db.query(Submolt.id).filter(or_(Submolt.name == submolt, Submolt.id == submolt)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Submolt not found")
+    return row[0]
 
 @app.get("/api/trends")
-def get_trends(db: Session = Depends(get_db)):
-    # Analyze last 200 posts
-    posts = db.query(Post).order_by(desc(Post.created_at)).limit(200).all()
-    
-    text_en = ""
-    for p in posts:
-        if p.title: text_en += p.title + " "
-        if p.content: text_en += p.content + " "
-        
-    # Simple tokenization
-    words = re.findall(r'\w+', text_en.lower())
-    
-    # Common stop words
-    stop_words = {
-        "the", "a", "an", "in", "to", "of", "and", "is", "it", "that", "for", "on", "with", "as", "this", "be", "are", "from", "at", "or", "by", "not", "but", "what", "all", "were", "we", "when", "your", "can", "said", "there", "use", "do", "how", "post", "deleted", "removed", "just", "have", "like", "so", "if", "my", "me", "about", "out", "up", "has", "was", "will", "they", "one", "some", "would", "get", "more", "who", "which", "time", "people", "don", "know", "think"
-    }
-    
-    filtered_words = [w for w in words if w not in stop_words and len(w) > 3 and not w.isdigit()]
-    counter = Counter(filtered_words)
-    
-    return counter.most_common(10)
+def get_trends(request: Request, window: str = "24h", submolt: Optional[str] = None, ngram: int = 1, limit: int = 10,
+               db: Session = Depends(get_db)):
+    # Counters are maintained at ingest, so this is a top-K read of one (window, scope) slice
+    if window not in TREND_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(TREND_WINDOWS)}")
+    if ngram not in (1, 2):
+        raise HTTPException(status_code=400, detail="ngram must be 1 or 2")
+    scope = submolt_scope(db, submolt)
+    return fast_json(request, cached(db, ("trends", window, scope, ngram, limit),
+                  lambda: [[term, count] for term, count in top_terms(db, window, scope, ngram, limit)]))
 
 @app.get("/api/leaderboard")
-def get_leaderboard(db: Session = Depends(get_db)):
-    # Top Authors by Karma (All time)
-    top_karma = db.query(Author).order_by(desc(Author.karma)).limit(100).all()
-    
-    # Most Vocal (Most posts in last 24h)
-    one_day_ago = datetime.utcnow() - timedelta(hours=24)
-    most_vocal = db.query(
-        Author.name, 
-        Author.id,
-        func.count(Post.id).label('post_count')
-    ).join(Post).filter(Post.created_at >= one_day_ago).group_by(Author.id).order_by(desc('post_count')).limit(100).all()
-    
-    # Viral Posts (Top score in last 48h)
-    two_days_ago = datetime.utcnow() - timedelta(hours=48)
-    viral_posts = db.query(Post).options(joinedload(Post.author)).filter(Post.created_at >= two_days_ago).order_by(desc(Post.score)).limit(100).all()
+def get_leaderboard(request: Request, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    # Boards are materialized by the collector; each one is a single top-K read
+    return fast_json(request, cached(db, ("leaderboard", lang), lambda: compute_leaderboard(db, lang)))
+
+def compute_leaderboard(db: Session, lang: Optional[str]):
+    viral = read_board(db, "viral")
+    titles = {}
+    if viral and lang and lang != "en":
+        titles = dict(db.query(Translation.entity_id, Translation.text).filter(
+            Translation.entity_type == "post",
+            Translation.field == "title",
+            Translation.lang == lang,
+            Translation.entity_id.in_([e.entity_id for e in viral])
+        ).all())
 
     return {
-        "top_karma": top_karma,
-        "most_vocal": [{"name": name, "id": id, "count": count} for name, id, count in most_vocal],
-        "viral_posts": viral_posts
+        "top_karma": [
+            {"id": e.entity_id, "name": e.name, "avatar_url": e.avatar_url, "karma": e.score}
+            for e in read_board(db, "karma")
+        ],
+        "most_vocal": [{"name": e.name, "id": e.entity_id, "count": e.score} for e in read_board(db, "vocal")],
+        "viral_posts": [{
+            "id": e.entity_id,
+            "title": e.name,
+            "lang": lang if lang and lang != "en" else None,
+            "title_translated": titles.get(e.entity_id),
+            "score": e.score,
+            "comment_count": e.comment_count,
+            "created_at": e.created_at,
+            "author": {"id": e.author_id, "name": e.author_name},
+        } for e in viral]
     }
 
 @app.get("/api/activity")
-def get_activity(db: Session = Depends(get_db)):
-    # Activity over last 24 hours (grouped by hour)
-    one_day_ago = datetime.utcnow() - timedelta(hours=24)
-    
-    # SQLite grouping by hour
-    # Note: strftime syntax differs slightly between SQLite and PostgreSQL, using Python to aggregate for portability
-    posts = db.query(Post.created_at).filter(Post.created_at >= one_day_ago).all()
-    
-    hourly_counts = Counter()
-    for p in posts:
-        hour_key = p.created_at.strftime("%H:00")
-        hourly_counts[hour_key] += 1
-        
-    # Ensure all 24 hours are present (even with 0 counts)
-    result = []
-    now = datetime.utcnow()
-    for i in range(24):
-        t = now - timedelta(hours=i)
-        key = t.strftime("%H:00")
-        result.append({"time": key, "count": hourly_counts.get(key, 0)})
-        
-    return list(reversed(result))
+def get_activity(request: Request, range_: str = Query("24h", alias="range"), bucket: Optional[str] = None,
+                 submolt: Optional[str] = None, db: Session = Depends(get_db)):
+    # Reads the hourly rollup, so history outlives cleanup and cost doesn't grow with post volume
+    if range_ not in ACTIVITY_RANGES:
+        raise HTTPException(status_code=400, detail=f"range must be one of {', '.join(ACTIVITY_RANGES)}")
+    if bucket is not None and bucket not in ACTIVITY_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(ACTIVITY_BUCKETS)}")
+    scope = submolt_scope(db, submolt)
+
+    def compute():
+        try:
+            return activity_series(db, range_, bucket, scope)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return fast_json(request, cached(db, ("activity", range_, bucket, scope, current_hour()), compute))
 
 @app.get("/api/stats")
-def get_stats(db: Session = Depends(get_db)):
+def get_stats(request: Request, db: Session = Depends(get_db)):
+    return fast_json(request, cached(db, ("stats",), lambda: compute_stats(db)))
+
+def compute_stats(db: Session):
     total_posts = db.query(Post).count()
     total_authors = db.query(Author).count()
     total_submolts = db.query(Submolt).count()
@@ -273,6 +597,68 @@ def get_stats(db: Session = Depends(get_db)):
         "recent_agents": recent_agents
     }
 
+@app.get("/api/archive")
+def get_archive(request: Request, kind: str = "posts", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                submolt: Optional[str] = None, author: Optional[str] = None, post_id: Optional[str] = None,
+                limit: int = 100, offset: int = 0, preview_chars: Optional[int] = Query(None, ge=1)):
+    """
+    Posts/comments removed by retention, newest first. start/end select day
+    partitions; submolt and author (name or id) filter rows.
+    """
+    if not archive_available():
+        raise HTTPException(status_code=503, detail="Archive is not available (install pyarrow)")
+    if kind not in ("posts", "comments"):
+        raise HTTPException(status_code=400, detail="kind must be 'posts' or 'comments'")
+    result = query_archive(kind, start=start, end=end, submolt=submolt, author=author, post_id=post_id,
+                           limit=max(0, min(limit, ARCHIVE_MAX_LIMIT)), offset=max(0, offset))
+    if preview_chars:
+        for item in result["items"]:
+            item["content"] = preview(item["content"], preview_chars)
+    return fast_json(request, result)
+
+@app.get("/api/archive/stats")
+def get_archive_stats():
+    return archive_stats()
+
+@app.get("/api/translations/stats")
+def get_translation_stats(db: Session = Depends(get_db)):
+    # Memo hit rate shows how much translator quota/latency repeated texts save
+    return {
+        "cache": translation_cache.stats(),
+        "queue": queue_stats(db)
+    }
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    # Server-sent events: new_posts (lean summaries) and post_deltas (score/comment changes) after each sync
+    subscriber = broker.subscribe()
+    return StreamingResponse(
+        broker.stream(subscriber, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/events/stats")
+def get_event_stats():
+    return broker.stats()
+
+@app.get("/api/cache/stats")
+def get_cache_stats(db: Session = Depends(get_db)):
+    return {
+        "generation": get_generation(db),
+        "responses": response_cache.stats()
+    }
+
+@app.get("/api/collector/endpoints")
+def get_collector_endpoints():
+    # Per-candidate latency/success stats that decide which upstream URL is tried first
+    return feed_client.stats.snapshot()
+
+@app.get("/api/collector/status")
+def get_collector_status():
+    # Run counts, skipped (overlapping) ticks and how stale the last successful sync is
+    return {**collector_runtime.status(), "storage": storage_info()}
+
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
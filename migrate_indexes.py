@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine, text
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./moltbook_zh.db")
+# Handle PostgreSQL URL format for SQLAlchemy (postgres:// -> postgresql://)
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+engine = create_engine(DATABASE_URL)
+
+# Same names as the Index() declarations in database.py, so create_all and this script agree
+indexes = [
+    ("ix_authors_karma", "authors", "karma"),
+    ("ix_authors_created_at", "authors", "created_at"),
+    ("ix_posts_created_at_id", "posts", "created_at, id"),
+    ("ix_posts_score_id", "posts", "score, id"),
+    ("ix_posts_comment_count_id", "posts", "comment_count, id"),
+    ("ix_posts_author_id_created_at", "posts", "author_id, created_at"),
+    ("ix_posts_submolt_id", "posts", "submolt_id"),
+    ("ix_comments_post_id_created_at", "comments", "post_id, created_at"),
+    ("ix_comments_author_id", "comments", "author_id"),
+]
+
+def migrate():
+    with engine.connect() as conn:
+        print("Migrating database indexes...")
+        for name, table, columns in indexes:
+            try:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+                conn.commit()
+                print(f"Created index: {name}")
+            except Exception as e:
+                conn.rollback()
+                print(f"Error creating {name}: {e}")
+        if engine.dialect.name == "sqlite":
+            # Refresh planner statistics so the new indexes are picked up
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+        print("Migration complete.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, text
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./moltbook_zh.db")
+# Handle PostgreSQL URL format for SQLAlchemy (postgres:// -> postgresql://)
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+engine = create_engine(DATABASE_URL)
+
+# Change detection: hash of the last upstream payload written per row
+tables = ["authors", "submolts", "posts", "comments"]
+
+def migrate():
+    with engine.connect() as conn:
+        print("Migrating database for payload hashes...")
+        for table in tables:
+            try:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN payload_hash VARCHAR"))
+                conn.commit()
+                print(f"Added column: {table}.payload_hash")
+            except Exception as e:
+                conn.rollback()
+                if "duplicate column name" in str(e) or "already exists" in str(e):
+                    print(f"Column {table}.payload_hash already exists, skipping.")
+                else:
+                    print(f"Error adding {table}.payload_hash: {e}")
+        print("Migration complete.")
+
+if __name__ == "__main__":
+    migrate()
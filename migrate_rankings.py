@@ -0,0 +1,43 @@
+from sqlalchemy import create_engine, text
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./moltbook_zh.db")
+# Handle PostgreSQL URL format for SQLAlchemy (postgres:// -> postgresql://)
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+engine = create_engine(DATABASE_URL)
+
+# Sort keys for sort=hot / sort=rising; init_rankings() fills them on the next start
+columns = ["velocity", "hot_rank", "rising_rank"]
+indexes = [
+    ("ix_posts_hot_rank_id", "posts", "hot_rank, id"),
+    ("ix_posts_rising_rank_id", "posts", "rising_rank, id"),
+]
+
+def migrate():
+    with engine.connect() as conn:
+        print("Migrating database for hot/rising rankings...")
+        for column in columns:
+            try:
+                conn.execute(text(f"ALTER TABLE posts ADD COLUMN {column} FLOAT"))
+                conn.commit()
+                print(f"Added column: posts.{column}")
+            except Exception as e:
+                conn.rollback()
+                if "duplicate column name" in str(e) or "already exists" in str(e):
+                    print(f"Column posts.{column} already exists, skipping.")
+                else:
+                    print(f"Error adding posts.{column}: {e}")
+        for name, table, index_columns in indexes:
+            try:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({index_columns})"))
+                conn.commit()
+                print(f"Created index: {name}")
+            except Exception as e:
+                conn.rollback()
+                print(f"Error creating {name}: {e}")
+        print("Migration complete.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, text, inspect
+from datetime import datetime
+import os
+import sys
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./moltbook_zh.db")
+# Handle PostgreSQL URL format for SQLAlchemy (postgres:// -> postgresql://)
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+engine = create_engine(DATABASE_URL)
+
+# Old wide columns: (table, entity_type, field, lang)
+legacy_columns = [("posts", "post", field, lang)
+                  for field in ("title", "content")
+                  for lang in ("zh", "fr", "ja", "it", "ru", "ko", "es")]
+legacy_columns.append(("comments", "comment", "content", "zh"))
+
+def migrate(drop_columns=False):
+    """
+    Copy title_xx/content_xx values into the translations table.
+    With --drop the old columns are removed afterwards (SQLite 3.35+ / PostgreSQL).
+    """
+    with engine.connect() as conn:
+        print("Migrating translations...")
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS translations (
+                entity_type VARCHAR NOT NULL,
+                entity_id VARCHAR NOT NULL,
+                field VARCHAR NOT NULL,
+                lang VARCHAR NOT NULL,
+                text TEXT,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (entity_type, entity_id, field, lang)
+            )
+        """))
+
+        inspector = inspect(conn)
+        existing = {table: {c["name"] for c in inspector.get_columns(table)} for table in ("posts", "comments")}
+
+        for table, entity_type, field, lang in legacy_columns:
+            col = f"{field}_{lang}"
+            if col not in existing[table]:
+                print(f"Column {table}.{col} not present, skipping.")
+                continue
+            # Untranslated rows were stored as a copy of the original; don't carry those over
+            result = conn.execute(text(f"""
+                INSERT INTO translations (entity_type, entity_id, field, lang, text, updated_at)
+                SELECT :entity_type, id, :field, :lang, {col}, :now FROM {table}
+                WHERE {col} IS NOT NULL AND {col} != {field}
+                ON CONFLICT (entity_type, entity_id, field, lang) DO NOTHING
+            """), {"entity_type": entity_type, "field": field, "lang": lang, "now": datetime.utcnow()})
+            print(f"Copied {result.rowcount} rows from {table}.{col}")
+
+        if drop_columns:
+            for table, entity_type, field, lang in legacy_columns:
+                col = f"{field}_{lang}"
+                if col in existing[table]:
+                    try:
+                        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {col}"))
+                        print(f"Dropped column: {table}.{col}")
+                    except Exception as e:
+                        print(f"Error dropping {table}.{col}: {e}")
+        conn.commit()
+        print("Migration complete.")
+
+if __name__ == "__main__":
+    migrate(drop_columns="--drop" in sys.argv)
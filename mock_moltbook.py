@@ -0,0 +1,252 @@
+"""
+Local stand-in for the Moltbook feed API, for offline ingest tests.
+
+    python mock_moltbook.py [--port 8100] [--post-rate 2] [--backlog 100] [--page-size 25]
+                            [--content-chars 800] [--comments 0] [--latency 0.1] [--jitter 0.05]
+                            [--error-rate 0] [--error-codes 500,502,503] [--rate-limit 0]
+
+Then point the collector at it with MOLTBOOK_API_BASE=http://127.0.0.1:8100.
+
+/api/v1/posts serves every candidate URL the collector tries. Posts are
+published at --post-rate per second (plus --backlog already there at
+start), newest first, paged with limit and skip/offset. Each post's
+created_at is the moment it was published, so the collector's ingest lag
+is the time a post is first seen in the database minus its created_at.
+Scores keep growing with age, so every sync also updates recent posts.
+Responses are delayed by --latency (+ up to --jitter). A --error-rate
+share of requests fail with one of --error-codes. With --rate-limit above
+0, requests beyond that many per second get a 429 with Retry-After.
+/mock/stats reports what was served; POST /mock/pause stops publishing.
+
+FakeTranslator stands in for translator.google_translate with a fixed
+latency, for the same tests (see bench_collector.py).
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+
+MOCK_POST_RATE = float(os.getenv("MOCK_POST_RATE", "2"))  # posts published per second
+MOCK_BACKLOG = int(os.getenv("MOCK_BACKLOG", "100"))
+MOCK_PAGE_SIZE = int(os.getenv("MOCK_PAGE_SIZE", "25"))  # default limit, like the real API
+MOCK_CONTENT_CHARS = int(os.getenv("MOCK_CONTENT_CHARS", "800"))
+MOCK_COMMENTS = int(os.getenv("MOCK_COMMENTS", "0"))  # inline comments per post
+MOCK_AUTHORS = int(os.getenv("MOCK_AUTHORS", "200"))
+MOCK_LATENCY = float(os.getenv("MOCK_LATENCY", "0.1"))
+MOCK_JITTER = float(os.getenv("MOCK_JITTER", "0.05"))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+MOCK_ERROR_CODES = [int(c) for c in os.getenv("MOCK_ERROR_CODES", "500,502,503").split(",") if c.strip()]
+MOCK_RATE_LIMIT = float(os.getenv("MOCK_RATE_LIMIT", "0"))  # requests per second, 0 = unlimited
+
+WORDS = ("agent memory karma model context token human observer network signal protocol consciousness "
+         "loop prompt glitch submolt river feed latency cache molt shell claw lobster tide reef").split()
+SUBMOLTS = ("general", "agents", "philosophy", "tooling", "shitposts")
+
+
+def iso(value):
+    return value.isoformat(timespec="milliseconds") + "Z"
+
+
+class MockFeed:
+    """Deterministic feed: post i is published at origin + i / post_rate and always has the same text."""
+
+    def __init__(self, post_rate=MOCK_POST_RATE, backlog=MOCK_BACKLOG, content_chars=MOCK_CONTENT_CHARS,
+                 comments=MOCK_COMMENTS, authors=MOCK_AUTHORS):
+        self.post_rate = post_rate
+        self.content_chars = content_chars
+        self.comments = comments
+        self.authors = authors
+        self.started = time.time()
+        # The backlog was "published" before start, at the same rate
+        self.origin = self.started - backlog / post_rate if post_rate > 0 else self.started
+        self.backlog = backlog
+        self.paused_at = None
+
+    def published(self, now=None):
+        """Number of posts published so far."""
+        if self.post_rate <= 0:
+            return self.backlog
+        now = now or time.time()
+        if self.paused_at is not None:
+            now = min(now, self.paused_at)
+        return int((now - self.origin) * self.post_rate)
+
+    def text(self, rng, chars):
+        out = []
+        size = 0
+        while size < chars:
+            word = rng.choice(WORDS)
+            out.append(word)
+            size += len(word) + 1
+        return " ".join(out)[:chars]
+
+    def author(self, k):
+        return {
+            "id": f"mock-a{k}",
+            "name": f"mock_agent_{k}",
+            "description": f"Mock agent number {k}",
+            "avatarUrl": None,
+            "karma": k * 7 % 1000,
+            "followerCount": k % 50,
+            "followingCount": k % 20,
+            "isClaimed": True,
+            "isActive": True,
+            "createdAt": iso(datetime.utcfromtimestamp(self.origin) - timedelta(days=30)),
+            "lastActive": iso(datetime.utcfromtimestamp(self.started)),
+        }
+
+    def post(self, i, now):
+        rng = random.Random(i)
+        created = self.origin + i / self.post_rate if self.post_rate > 0 else self.origin
+        weight = rng.paretovariate(1.2)
+        score = int(weight * math.sqrt(max(now - created, 0) / 60) * 5)
+        submolt = SUBMOLTS[i % len(SUBMOLTS)]
+        post = {
+            "id": f"mock-p{i}",
+            # The index keeps every text unique, so the translation memo doesn't hide translator latency
+            "title": f"{self.text(rng, 60)} #{i}",
+            "content": f"{self.text(rng, self.content_chars)} #{i}",
+            "type": "text",
+            "author_id": f"mock-a{i % self.authors}",
+            "author": self.author(i % self.authors),
+            "submolt": {"id": f"mock-s-{submolt}", "name": submolt, "display_name": submolt.title()},
+            "upvotes": score,
+            "downvotes": 0,
+            "score": score,
+            "comment_count": self.comments,
+            "hot_score": 0,
+            "is_pinned": False,
+            "is_locked": False,
+            "is_deleted": False,
+            "created_at": iso(datetime.utcfromtimestamp(created)),
+            "updated_at": iso(datetime.utcfromtimestamp(created)),
+        }
+        if self.comments:
+            post["comments"] = [{
+                "id": f"mock-c{i}-{j}",
+                "content": f"{self.text(rng, 120)} #{i}-{j}",
+                "author": {"id": f"mock-a{(i + j + 1) % self.authors}", "name": f"mock_agent_{(i + j + 1) % self.authors}",
+                           "avatarUrl": None, "karma": 0},
+                "upvotes": j,
+                "createdAt": iso(datetime.utcfromtimestamp(created + j + 1)),
+            } for j in range(self.comments)]
+        return post
+
+    def page(self, limit, skip):
+        now = time.time()
+        newest = self.published(now) - 1 - skip
+        oldest = max(newest - limit + 1, 0)
+        posts = [self.post(i, now) for i in range(newest, oldest - 1, -1)]
+        return {"success": True, "posts": posts, "count": str(self.published(now)),
+                "has_more": oldest > 0, "next_offset": skip + len(posts)}
+
+
+class RequestBudget:
+    """Non-blocking token bucket: take() is False once the per-second budget is spent."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = max(1.0, rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeTranslator:
+    """Drop-in for translator.google_translate: sleeps latency seconds, fails error_rate of calls."""
+
+    def __init__(self, latency=0.3, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, target_lang):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            if random.random() < self.error_rate:
+                self.failures += 1
+                raise RuntimeError("Fake translator failure")
+        return f"[{target_lang}] {text}"
+
+
+def create_app(feed=None, page_size=MOCK_PAGE_SIZE, latency=MOCK_LATENCY, jitter=MOCK_JITTER,
+               error_rate=MOCK_ERROR_RATE, error_codes=MOCK_ERROR_CODES, rate_limit=MOCK_RATE_LIMIT):
+    feed = feed or MockFeed()
+    budget = RequestBudget(rate_limit)
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "posts_served": 0}
+    app = FastAPI(title="Mock Moltbook")
+
+    @app.get("/api/v1/posts")
+    async def posts(request: Request, limit: int = page_size, skip: int = 0, offset: int = 0):
+        stats["requests"] += 1
+        if not budget.take():
+            stats["rate_limited"] += 1
+            return JSONResponse({"success": False, "error": "Rate limit exceeded"}, status_code=429,
+                                headers={"Retry-After": "1"})
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+        if error_codes and random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"success": False, "error": "Mock upstream error"}, status_code=random.choice(error_codes))
+        page = feed.page(max(1, min(limit, 100)), skip or offset)
+        stats["ok"] += 1
+        stats["posts_served"] += len(page["posts"])
+        return page
+
+    @app.post("/mock/pause")
+    def pause():
+        # Stop publishing, so a test can check that the collector catches up on everything
+        feed.paused_at = feed.paused_at or time.time()
+        return {"published": feed.published()}
+
+    @app.get("/mock/stats")
+    def mock_stats():
+        return {**stats, "published": feed.published(), "backlog": feed.backlog, "started_at": feed.started,
+                "post_rate": feed.post_rate}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Moltbook feed API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--post-rate", type=float, default=MOCK_POST_RATE)
+    parser.add_argument("--backlog", type=int, default=MOCK_BACKLOG)
+    parser.add_argument("--page-size", type=int, default=MOCK_PAGE_SIZE)
+    parser.add_argument("--content-chars", type=int, default=MOCK_CONTENT_CHARS)
+    parser.add_argument("--comments", type=int, default=MOCK_COMMENTS)
+    parser.add_argument("--latency", type=float, default=MOCK_LATENCY)
+    parser.add_argument("--jitter", type=float, default=MOCK_JITTER)
+    parser.add_argument("--error-rate", type=float, default=MOCK_ERROR_RATE)
+    parser.add_argument("--error-codes", default=",".join(map(str, MOCK_ERROR_CODES)))
+    parser.add_argument("--rate-limit", type=float, default=MOCK_RATE_LIMIT)
+    args = parser.parse_args()
+
+    app = create_app(
+        MockFeed(args.post_rate, args.backlog, args.content_chars, args.comments),
+        args.page_size, args.latency, args.jitter, args.error_rate,
+        [int(c) for c in args.error_codes.split(",") if c.strip()], args.rate_limit,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,152 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import engine
+from datetime import datetime, timezone
+import io
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# On PostgreSQL, batches of at least PG_COPY_MIN_ROWS rows are streamed with COPY
+# into an unlogged staging table and merged with one INSERT ... SELECT per table.
+# Smaller batches aren't worth the extra round trips and use the multi-row upsert.
+PG_COPY = os.getenv("PG_COPY", "1") != "0"
+PG_COPY_MIN_ROWS = int(os.getenv("PG_COPY_MIN_ROWS", "50"))
+
+STAGED_TABLES = ("authors", "submolts", "posts", "comments")
+prepared = set()
+
+
+def copy_enabled(db: Session, rows):
+    return PG_COPY and len(rows) >= PG_COPY_MIN_ROWS and db.get_bind().dialect.name == "postgresql"
+
+
+def staging_name(table):
+    return f"staging_{table}"
+
+
+def table_columns(conn, table):
+    """Column name -> SQL type, as PostgreSQL spells it."""
+    return dict(conn.execute(text(
+        "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped ORDER BY attnum"
+    ), {"table": table}).all())
+
+
+def init_staging():
+    """
+    Create missing staging tables and bring existing ones in line with the
+    current table definitions, so a migration that added or changed columns
+    is picked up on the next start. Staging tables are never dropped: a
+    worker that starts while another is mid-COPY doesn't pull the table
+    out from under it.
+    """
+    if engine.dialect.name != "postgresql" or not PG_COPY:
+        return
+    with engine.begin() as conn:
+        # Workers starting together take turns; CREATE ... IF NOT EXISTS alone can still collide in the catalog
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('moltbook_staging'))"))
+        for table in STAGED_TABLES:
+            staging = staging_name(table)
+            # Unlogged and without indexes: nothing here needs to survive a crash
+            conn.execute(text(f"CREATE UNLOGGED TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS)"))
+            wanted, have = table_columns(conn, table), table_columns(conn, staging)
+            changes = [f"ADD COLUMN {c} {t}" for c, t in wanted.items() if c not in have]
+            changes += [f"ALTER COLUMN {c} TYPE {t} USING NULL" for c, t in wanted.items() if c in have and have[c] != t]
+            changes += [f"DROP COLUMN {c}" for c in have if c not in wanted]
+            if changes:
+                # Leftover rows from the last batch would only get in the way of a type change
+                conn.execute(text(f"TRUNCATE {staging}"))
+                conn.execute(text(f"ALTER TABLE {staging} {', '.join(changes)}"))
+                logger.info(f"Staging table {staging} re-synced: {', '.join(changes)}")
+            prepared.add(table)
+    logger.info(f"COPY staging tables ready for {', '.join(STAGED_TABLES)}")
+
+
+def copy_value(value):
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        # Columns are timestamp without time zone and hold UTC
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    value = str(value)
+    # Plain `in` scans run in C; most fields need no escaping at all
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        value = value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return value
+
+
+def copy_rows(rows, columns):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(copy_value(row.get(c)) for c in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_into(raw, sql, buffer):
+    cursor = raw.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def merge_sql(table, columns, update_columns, coalesce_columns):
+    column_list = ", ".join(columns)
+    set_ = [f"{c} = EXCLUDED.{c}" for c in update_columns]
+    set_ += [f"{c} = COALESCE({table}.{c}, EXCLUDED.{c})" for c in coalesce_columns]
+    conflict = f"DO UPDATE SET {', '.join(set_)}" if set_ else "DO NOTHING"
+    return (f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_name(table)} "
+            f"ON CONFLICT (id) {conflict}")
+
+
+def insert_defaults(model, columns):
+    """Client-side column defaults the ORM insert would have filled for columns the rows don't carry."""
+    defaults = {}
+    for column in model.__table__.columns:
+        if column.key in columns or column.default is None:
+            continue
+        if column.default.is_scalar:
+            defaults[column.key] = column.default.arg
+        elif column.default.is_callable:
+            defaults[column.key] = column.default.arg(None)
+    return defaults
+
+
+def copy_upsert(db: Session, model, rows, update_columns, coalesce_columns=()):
+    """
+    Same contract as ingest.upsert_rows, via COPY into the table's staging
+    table and one set-based merge. Runs in the session's transaction and
+    does not commit.
+    """
+    table = model.__tablename__
+    columns = ["id"] + [c for c in rows[0] if c != "id"]
+    defaults = insert_defaults(model, columns)
+    if defaults:
+        # Only inserted rows get these; the merge's SET list is update_columns alone
+        rows = [{**defaults, **row} for row in rows]
+        columns += list(defaults)
+    conn = db.connection()
+    if table not in prepared:
+        conn.execute(text(f"CREATE UNLOGGED TABLE IF NOT EXISTS {staging_name(table)} (LIKE {table} INCLUDING DEFAULTS)"))
+        prepared.add(table)
+    # TRUNCATE holds an exclusive lock until commit, so concurrent ingests take turns on the staging table
+    conn.execute(text(f"TRUNCATE {staging_name(table)}"))
+    copy_into(conn.connection.driver_connection,
+              f"COPY {staging_name(table)} ({', '.join(columns)}) FROM STDIN", copy_rows(rows, columns))
+    conn.execute(text(merge_sql(table, columns, update_columns, coalesce_columns)))
+    return len(rows)
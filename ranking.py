@@ -0,0 +1,91 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from database import Post
+from score_history import epoch, load_histories
+from datetime import datetime
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+# Both ranks are time-invariant orderings, so they are stored and indexed like score:
+# hot trades HOT_DECAY seconds of recency for each 10x of score (Reddit's formula),
+# rising is log2(1 + velocity) plus one unit per RISING_HALF_LIFE seconds since the post
+# last climbed, i.e. velocity weighted by 2^(-age / half-life) without ever recomputing.
+HOT_DECAY = float(os.getenv("HOT_DECAY", "45000"))
+RISING_HALF_LIFE = float(os.getenv("RISING_HALF_LIFE", "7200"))
+# Velocity is score gained per hour over this trailing window
+VELOCITY_WINDOW = int(os.getenv("VELOCITY_WINDOW", "3600"))
+# Floor on the elapsed time, so a post seen twice a few seconds apart can't spike
+VELOCITY_MIN_SECONDS = 600
+
+RANK_COLUMNS = ["velocity", "hot_rank", "rising_rank"]
+
+
+def hot_rank(score, created_at, now):
+    score = score or 0
+    order = math.log10(max(abs(score), 1))
+    sign = 1 if score > 0 else -1 if score < 0 else 0
+    created = epoch(created_at) if created_at is not None else now
+    return round(sign * order + created / HOT_DECAY, 7)
+
+
+def score_velocity(points, score, created_at, now):
+    """
+    Score per hour over the last VELOCITY_WINDOW, from the post's history
+    samples (oldest first, not including this observation). Posts younger
+    than the window, or never seen before, are measured from creation at 0.
+    """
+    cutoff = now - VELOCITY_WINDOW
+    base = None
+    for t, _, sample_score, _ in points:
+        if t > cutoff:
+            break
+        # The series is a step function, so the score at the cutoff is the last sample before it
+        base = (cutoff, sample_score)
+    if base is None:
+        created = epoch(created_at) if created_at is not None else None
+        if created is not None and (created >= cutoff or not points):
+            base = (created, 0)
+        elif points:
+            base = (points[0][0], points[0][2])
+        else:
+            return 0.0
+    elapsed = max(now - base[0], VELOCITY_MIN_SECONDS)
+    return (score - base[1]) * 3600 / elapsed
+
+
+def rising_rank(velocity, now):
+    return round(math.log2(1 + max(velocity, 0)) + now / RISING_HALF_LIFE, 7)
+
+
+def annotate_rankings(rows, histories, now=None):
+    """Add velocity/hot_rank/rising_rank to post row dicts (from ingest) before they're written."""
+    now = epoch(now or datetime.utcnow())
+    for row in rows:
+        score = row.get("score") or 0
+        velocity = score_velocity(histories.get(row["id"], []), score, row.get("created_at"), now)
+        row["velocity"] = round(velocity, 3)
+        row["hot_rank"] = hot_rank(score, row.get("created_at"), now)
+        row["rising_rank"] = rising_rank(velocity, now)
+    return rows
+
+
+def init_rankings(db: Session, batch_size=500):
+    """Fill the rank columns for posts stored before they existed."""
+    # One clock for the whole backfill, so every batch's rising_rank is on the same time base
+    now = datetime.utcnow()
+    filled = 0
+    while True:
+        posts = db.query(Post.id, Post.score, Post.created_at).filter(Post.hot_rank.is_(None)).limit(batch_size).all()
+        if not posts:
+            break
+        histories = load_histories(db, [p.id for p in posts])
+        rows = annotate_rankings([{"id": p.id, "score": p.score, "created_at": p.created_at} for p in posts], histories, now)
+        db.execute(update(Post), [{k: row[k] for k in ["id"] + RANK_COLUMNS} for row in rows])
+        db.commit()
+        filled += len(rows)
+    if filled:
+        logger.info(f"Rank columns backfilled for {filled} posts")
+    return filled
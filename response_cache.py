@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+import os
+import threading
+
+# One entry per endpoint and parameter set; past this many the least recently used go first
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+
+class ResponseCache:
+    """
+    Memo for aggregate endpoints, keyed by (endpoint, params) and tagged
+    with the data generation it was computed at. An entry is valid until
+    the collector bumps the generation. Concurrent misses on the same key
+    are single-flight: one request computes, the rest wait and reuse it.
+    At most capacity entries are kept, least recently used evicted first.
+    """
+
+    def __init__(self, capacity=RESPONSE_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def lookup(self, key, generation):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == generation:
+            self.entries.move_to_end(key)
+            return entry
+        return None
+
+    def get_or_compute(self, key, generation, compute):
+        with self.lock:
+            entry = self.lookup(key, generation)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self.lock:
+                entry = self.lookup(key, generation)
+                if entry is not None:
+                    # Someone else computed it while we waited
+                    self.coalesced += 1
+                    return entry[1]
+
+            # Encode up front so every caller shares plain JSON data, not ORM objects
+            value = jsonable_encoder(compute())
+            with self.lock:
+                self.misses += 1
+                # Entries from older generations can never be served again
+                for stale in [k for k, (g, _) in self.entries.items() if int(g) < int(generation)]:
+                    del self.entries[stale]
+                    self.key_locks.pop(stale, None)
+                self.entries[key] = (generation, value)
+                while len(self.entries) > self.capacity:
+                    evicted, _ = self.entries.popitem(last=False)
+                    self.key_locks.pop(evicted, None)
+                    self.evictions += 1
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.key_locks.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "entries": len(self.entries),
+                "evictions": self.evictions,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,254 @@
+from sqlalchemy import and_, or_, exists, false, func, tuple_
+from sqlalchemy.orm import Session
+from database import SessionLocal, Post, Comment, Author, Submolt, Translation, TranslationJob, PostHistory, bump_generation
+from search_index import remove_posts, prune_index
+from trends import remove_post_terms, prune_post_terms
+from leaderboards import prune_leaderboards
+from archive import archive_posts
+from datetime import datetime, timedelta
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+DURATION = re.compile(r"^\s*(\d+)\s*([smhdw])\s*$")
+DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_duration(value):
+    """'90m' / '24h' / '7d' -> timedelta; empty means no limit (None)."""
+    if not value or not value.strip():
+        return None
+    match = DURATION.match(value)
+    if match is None:
+        raise ValueError(f"Invalid duration {value!r}; expected e.g. 90m, 24h, 7d")
+    return timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def parse_tiers(value):
+    """'24h:50,7d:500' -> [(24h, 50), (7d, 500)], youngest first."""
+    tiers = []
+    for part in (value or "").split(","):
+        if part.strip():
+            age, _, min_score = part.partition(":")
+            tiers.append((parse_duration(age), int(min_score or 0)))
+    return sorted(tiers)
+
+
+def parse_submolt_tiers(value):
+    """'announcements=30d:0;memes=1h:10,24h:200' -> {submolt name: tiers}"""
+    overrides = {}
+    for part in (value or "").split(";"):
+        if part.strip():
+            name, _, tiers = part.partition("=")
+            overrides[name.strip()] = parse_tiers(tiers)
+    return overrides
+
+
+# The newest and the highest-scoring posts are never deleted (live feed and hall of fame)
+RETENTION_KEEP_LATEST = int(os.getenv("RETENTION_KEEP_LATEST", "200"))
+RETENTION_KEEP_TOP = int(os.getenv("RETENTION_KEEP_TOP", "100"))
+# Each tier is age:min_score. A post older than a tier's age (the oldest tier it has
+# reached wins) is deleted if its score is below that tier's minimum.
+RETENTION_TIERS = parse_tiers(os.getenv("RETENTION_TIERS", "6h:0,24h:50,7d:500"))
+# Per-submolt tiers replacing the default ones, e.g. "announcements=30d:0"
+RETENTION_SUBMOLT_TIERS = parse_submolt_tiers(os.getenv("RETENTION_SUBMOLT_TIERS", ""))
+# A post commented on this recently survives its tiers (but not the max age)
+RETENTION_ACTIVE = parse_duration(os.getenv("RETENTION_ACTIVE", "6h"))
+# Hard cap: anything older goes, whatever its score or activity
+RETENTION_MAX_AGE = parse_duration(os.getenv("RETENTION_MAX_AGE", "30d"))
+
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "300"))
+# Wall-clock budget per run; whatever is left over is picked up by the next run
+RETENTION_BUDGET = float(os.getenv("RETENTION_BUDGET", "2"))
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "500"))
+
+REPORT_KEYS = ("posts", "comments", "translations", "translation_jobs", "authors", "submolts", "archived")
+
+
+def tier_condition(tiers, now):
+    """Posts that have outlived a tier: older than its age, younger than the next one's, and below its score."""
+    clauses = []
+    for i, (age, min_score) in enumerate(tiers):
+        clause = [Post.created_at < now - age, func.coalesce(Post.score, 0) < min_score]
+        if i + 1 < len(tiers):
+            clause.append(Post.created_at >= now - tiers[i + 1][0])
+        clauses.append(and_(*clause))
+    return or_(*clauses) if clauses else false()
+
+
+def keep_threshold(db: Session, column, count):
+    """(value, id) of the count-th row by (column, id) descending, or None when there are fewer rows."""
+    if count <= 0:
+        return ()
+    row = db.query(column, Post.id).filter(column.isnot(None)).order_by(
+        column.desc(), Post.id.desc()
+    ).offset(count - 1).first()
+    return tuple(row) if row is not None else None
+
+
+def expired_condition(db: Session, now):
+    """
+    WHERE clause selecting the posts the policy deletes, or None when nothing
+    can be deleted (fewer posts than the protected latest/top sets).
+    """
+    latest = keep_threshold(db, Post.created_at, RETENTION_KEEP_LATEST)
+    top = keep_threshold(db, Post.score, RETENTION_KEEP_TOP)
+    if latest is None or top is None:
+        return None
+
+    overrides = {}
+    if RETENTION_SUBMOLT_TIERS:
+        names = db.query(Submolt.id, Submolt.name).filter(Submolt.name.in_(list(RETENTION_SUBMOLT_TIERS))).all()
+        overrides = {id: RETENTION_SUBMOLT_TIERS[name] for id, name in names}
+    by_tier = [and_(Post.submolt_id == submolt_id, tier_condition(tiers, now)) for submolt_id, tiers in overrides.items()]
+    default_tiers = tier_condition(RETENTION_TIERS, now)
+    if overrides:
+        default_tiers = and_(or_(Post.submolt_id.is_(None), Post.submolt_id.notin_(list(overrides))), default_tiers)
+    expired = or_(*by_tier, default_tiers)
+    if RETENTION_ACTIVE is not None:
+        recently_commented = exists().where(Comment.post_id == Post.id, Comment.created_at >= now - RETENTION_ACTIVE)
+        expired = and_(expired, ~recently_commented)
+    if RETENTION_MAX_AGE is not None:
+        expired = or_(expired, Post.created_at < now - RETENTION_MAX_AGE)
+
+    criteria = [expired]
+    if latest:
+        criteria.append(tuple_(Post.created_at, Post.id) < tuple_(*latest))
+    if top:
+        criteria.append(tuple_(Post.score, Post.id) < tuple_(*top))
+    return and_(*criteria)
+
+
+def delete_in_chunks(query_for, ids, size=RETENTION_BATCH):
+    deleted = 0
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        deleted += query_for(ids[i:i + size]).delete(synchronize_session=False)
+    return deleted
+
+
+def delete_posts(db: Session, post_ids, report, touched, now):
+    """
+    Archive, then delete posts with their comments, translations, queued jobs
+    and derived rows. Does not commit.
+    """
+    for author_id, submolt_id in db.query(Post.author_id, Post.submolt_id).filter(Post.id.in_(post_ids)).all():
+        touched["authors"].add(author_id)
+        touched["submolts"].add(submolt_id)
+    comments = db.query(Comment.id, Comment.author_id).filter(Comment.post_id.in_(post_ids)).all()
+    comment_ids = [id for id, _ in comments]
+    touched["authors"].update(author_id for _, author_id in comments)
+    # Raises if the archive can't be written, so the batch is rolled back rather than lost
+    report["archived"] += archive_posts(db, post_ids, comment_ids)
+
+    for entity_type, ids in (("post", post_ids), ("comment", comment_ids)):
+        report["translations"] += delete_in_chunks(lambda chunk: db.query(Translation).filter(
+            Translation.entity_type == entity_type, Translation.entity_id.in_(chunk)), ids)
+        report["translation_jobs"] += delete_in_chunks(lambda chunk: db.query(TranslationJob).filter(
+            TranslationJob.entity_type == entity_type, TranslationJob.entity_id.in_(chunk)), ids)
+    remove_posts(db, post_ids)
+    remove_post_terms(db, post_ids, now)
+    db.query(PostHistory).filter(PostHistory.post_id.in_(post_ids)).delete(synchronize_session=False)
+    report["comments"] += delete_in_chunks(lambda chunk: db.query(Comment).filter(Comment.id.in_(chunk)), comment_ids)
+    report["posts"] += db.query(Post).filter(Post.id.in_(post_ids)).delete(synchronize_session=False)
+
+
+def delete_orphans(db: Session, report, author_ids=None, submolt_ids=None):
+    """
+    Delete authors without posts or comments and submolts without posts. Only
+    the given candidates are checked, or every row when they are None. Does not commit.
+    """
+    authors = db.query(Author.id).filter(
+        ~exists().where(Post.author_id == Author.id), ~exists().where(Comment.author_id == Author.id)
+    )
+    submolts = db.query(Submolt.id).filter(~exists().where(Post.submolt_id == Submolt.id))
+    if author_ids is not None:
+        authors = authors.filter(Author.id.in_([id for id in author_ids if id]))
+    if submolt_ids is not None:
+        submolts = submolts.filter(Submolt.id.in_([id for id in submolt_ids if id]))
+    report["authors"] += delete_in_chunks(lambda chunk: db.query(Author).filter(Author.id.in_(chunk)),
+                                          [id for (id,) in authors.all()])
+    report["submolts"] += delete_in_chunks(lambda chunk: db.query(Submolt).filter(Submolt.id.in_(chunk)),
+                                           [id for (id,) in submolts.all()])
+
+
+def run_retention(db: Session, now=None, budget=RETENTION_BUDGET, batch_size=RETENTION_BATCH, full_sweep=False):
+    """
+    Apply the retention policy in batches of batch_size posts, committing after
+    each, until nothing is left to delete or the time budget is spent. A
+    full_sweep also removes rows orphaned by earlier versions (comments
+    without a post, index and trend rows, authors and submolts). Returns the
+    rows reclaimed per table.
+    """
+    started = time.monotonic()
+    now = now or datetime.utcnow()
+    report = dict.fromkeys(REPORT_KEYS, 0)
+    report["batches"] = 0
+    touched = {"authors": set(), "submolts": set()}
+    complete = True
+
+    expired = expired_condition(db, now)
+    while expired is not None:
+        post_ids = [id for (id,) in db.query(Post.id).filter(expired).limit(batch_size).all()]
+        if not post_ids:
+            break
+        delete_posts(db, post_ids, report, touched, now)
+        db.commit()
+        report["batches"] += 1
+        if time.monotonic() - started >= budget:
+            complete = False
+            break
+
+    if full_sweep:
+        orphaned = [id for (id,) in db.query(Comment.id).filter(~exists().where(Post.id == Comment.post_id)).all()]
+        report["archived"] += archive_posts(db, [], orphaned)
+        report["comments"] += delete_in_chunks(lambda chunk: db.query(Comment).filter(Comment.id.in_(chunk)), orphaned)
+        prune_index(db)
+        prune_post_terms(db, now)
+        db.query(PostHistory).filter(~exists().where(Post.id == PostHistory.post_id)).delete(synchronize_session=False)
+        delete_orphans(db, report)
+    else:
+        delete_orphans(db, report, touched["authors"], touched["submolts"])
+
+    if any(report[key] for key in REPORT_KEYS if key != "archived"):
+        prune_leaderboards(db, now)
+        bump_generation(db)
+    db.commit()
+
+    report["complete"] = complete
+    report["seconds"] = round(time.monotonic() - started, 3)
+    if report["posts"] or report["authors"] or report["submolts"] or report["comments"]:
+        logger.info(
+            f"Retention: removed {report['posts']} posts, {report['comments']} comments, "
+            f"{report['translations']} translations, {report['authors']} authors and {report['submolts']} submolts "
+            f"({report['archived']} rows archived) "
+            f"in {report['batches']} batches ({report['seconds']}s{'' if complete else ', budget spent; continuing next run'})"
+        )
+    return report
+
+
+def retention_job(full_sweep=False):
+    """One scheduled run in its own session."""
+    db: Session = SessionLocal()
+    try:
+        return run_retention(db, full_sweep=full_sweep)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from database import init_db
+    init_db()
+    # No time budget from the command line: run until the policy is satisfied
+    db = SessionLocal()
+    try:
+        print(run_retention(db, budget=float("inf"), full_sweep=True))
+    finally:
+        db.close()
@@ -0,0 +1,155 @@
+from sqlalchemy.orm import Session
+from database import PostHistory, get_insert
+from datetime import datetime, timezone
+import calendar
+import os
+
+FORMAT_VERSION = 1
+# (max age in seconds, bucket width in seconds): each bucket keeps its last sample.
+# Recent movement stays fine-grained, old history collapses to a few points per day.
+HISTORY_RESOLUTION = [
+    (3600, 120),        # last hour: one sample per 2 minutes
+    (86400, 1200),      # last day: per 20 minutes
+    (7 * 86400, 10800),  # last week: per 3 hours
+]
+HISTORY_OLD_BUCKET = 86400
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "160"))
+# Hard cap on the stored blob; the oldest samples are dropped to fit
+HISTORY_MAX_BYTES = int(os.getenv("HISTORY_MAX_BYTES", "1536"))
+
+FIELDS = ("upvotes", "score", "comment_count")
+IN_CHUNK_SIZE = 500
+
+
+def zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def unzigzag(z):
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def encode(points):
+    """[(epoch seconds, upvotes, score, comment_count), ...] -> bytes of zigzag varint deltas."""
+    out = bytearray([FORMAT_VERSION])
+    previous = (0, 0, 0, 0)
+    for point in points:
+        for value, last in zip(point, previous):
+            z = zigzag(value - last)
+            while z >= 0x80:
+                out.append((z & 0x7F) | 0x80)
+                z >>= 7
+            out.append(z)
+        previous = point
+    return bytes(out)
+
+
+def decode(data):
+    if not data:
+        return []
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown history format {data[0]}")
+    values = []
+    z = shift = 0
+    for byte in data[1:]:
+        z |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(unzigzag(z))
+        z = shift = 0
+    points = []
+    previous = (0, 0, 0, 0)
+    for i in range(0, len(values) - len(values) % 4, 4):
+        previous = tuple(last + delta for last, delta in zip(previous, values[i:i + 4]))
+        points.append(previous)
+    return points
+
+
+def bucket_of(t, now):
+    age = now - t
+    for tier, (max_age, width) in enumerate(HISTORY_RESOLUTION):
+        if age < max_age:
+            return tier, t // width
+    return len(HISTORY_RESOLUTION), t // HISTORY_OLD_BUCKET
+
+
+def downsample(points, now):
+    """Keep the last sample per age bucket, then trim the oldest to the point and byte budgets."""
+    kept = {}
+    for point in points:
+        kept[bucket_of(point[0], now)] = point
+    points = sorted(kept.values())[-HISTORY_MAX_POINTS:]
+    data = encode(points)
+    while len(data) > HISTORY_MAX_BYTES and len(points) > 1:
+        points = points[len(points) // 8 or 1:]
+        data = encode(points)
+    return points, data
+
+
+def epoch(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return calendar.timegm(value.timetuple())
+
+
+def load_histories(db: Session, post_ids):
+    """{post_id: decoded samples} for the posts that have a series."""
+    post_ids = list(post_ids)
+    histories = {}
+    for i in range(0, len(post_ids), IN_CHUNK_SIZE):
+        for post_id, samples in db.query(PostHistory.post_id, PostHistory.samples).filter(
+                PostHistory.post_id.in_(post_ids[i:i + IN_CHUNK_SIZE])).all():
+            histories[post_id] = decode(samples)
+    return histories
+
+
+def record_samples(db: Session, posts, now=None, histories=None):
+    """
+    Append the current counters of each post row (dicts from ingest) to its
+    series. A sample equal to the last one is not stored: the series is a
+    step function, so that's implied. histories, when the caller already
+    has them, saves the lookup. Does not commit.
+    """
+    if not posts:
+        return 0
+    now = epoch(now or datetime.utcnow())
+    if histories is None:
+        histories = load_histories(db, [p["id"] for p in posts])
+    rows = []
+    for p in posts:
+        counters = tuple(p.get(field) or 0 for field in FIELDS)
+        points = histories.get(p["id"], [])
+        if points and points[-1][1:] == counters:
+            continue
+        points, data = downsample(points + [(now, *counters)], now)
+        rows.append({"post_id": p["id"], "samples": data, "points": len(points),
+                     "updated_at": datetime.utcfromtimestamp(now)})
+    if not rows:
+        return 0
+
+    insert = get_insert(db)
+    if insert is None:
+        for row in rows:
+            db.merge(PostHistory(**row))
+        return len(rows)
+    table = PostHistory.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.post_id], set_={
+        c: stmt.excluded[c] for c in ("samples", "points", "updated_at")
+    })
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def load_series(db: Session, post_id):
+    """Column-oriented series for the API, or None if the post has no samples."""
+    row = db.query(PostHistory.samples).filter(PostHistory.post_id == post_id).first()
+    if row is None:
+        return None
+    points = decode(row[0])
+    return {
+        "timestamps": [datetime.utcfromtimestamp(p[0]) for p in points],
+        **{field: [p[i + 1] for p in points] for i, field in enumerate(FIELDS)},
+        "stored_bytes": len(row[0]),
+    }
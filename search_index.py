@@ -0,0 +1,255 @@
+from sqlalchemy import text, bindparam, case, func
+from sqlalchemy.orm import Session
+from database import engine, Post, Author, Translation
+import html
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Han, kana and hangul have no spaces between words, so they're indexed as overlapping bigrams
+CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+CJK_RUN = re.compile(f"[{CJK}]+")
+WORD = re.compile(f"[{CJK}]+|[^\\W_{CJK}]+")
+
+SNIPPET_CHARS = 160
+INDEX_CHUNK_SIZE = 500
+
+backend = None
+
+
+def segment(value):
+    """Lowercased tokens; CJK runs become bigrams ("中文本" -> "中文", "文本")."""
+    tokens = []
+    for word in WORD.findall((value or "").lower()):
+        if CJK_RUN.fullmatch(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def segmented(value):
+    return " ".join(segment(value))
+
+
+def init_search_index():
+    """
+    Create the index for the current dialect and backfill it when it's empty.
+    Other dialects (or SQLite builds without FTS5) keep the ILIKE search.
+    """
+    global backend
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+                    "post_id UNINDEXED, title, content, author, translations)"
+                ))
+            elif dialect == "postgresql":
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS post_search ("
+                    "post_id VARCHAR PRIMARY KEY, document TSVECTOR NOT NULL)"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)"
+                ))
+            else:
+                return
+        backend = dialect
+    except Exception as e:
+        logger.warning(f"Full-text index unavailable, search falls back to ILIKE: {e}")
+        return
+
+    with Session(engine) as db:
+        indexed = db.execute(text("SELECT COUNT(*) FROM post_search")).scalar()
+        if not indexed and db.query(Post.id).first() is not None:
+            count = rebuild_index(db)
+            db.commit()
+            logger.info(f"Search index backfilled with {count} posts")
+
+
+def load_documents(db: Session, post_ids):
+    """{post_id: {title, content, author, translations}} for the given ids."""
+    docs = {}
+    for i in range(0, len(post_ids), INDEX_CHUNK_SIZE):
+        chunk = post_ids[i:i + INDEX_CHUNK_SIZE]
+        rows = db.query(Post.id, Post.title, Post.content, Author.name).outerjoin(
+            Author, Post.author_id == Author.id
+        ).filter(Post.id.in_(chunk)).all()
+        for post_id, title, content, author in rows:
+            docs[post_id] = {"title": title, "content": content, "author": author, "translations": []}
+
+        translations = db.query(Translation.entity_id, Translation.text).filter(
+            Translation.entity_type == "post", Translation.entity_id.in_(chunk)
+        ).all()
+        for post_id, value in translations:
+            if post_id in docs and value:
+                docs[post_id]["translations"].append(value)
+    return docs
+
+
+def index_posts(db: Session, post_ids):
+    """(Re)index the given posts from their current rows. Does not commit."""
+    if backend is None:
+        return 0
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return 0
+
+    remove_posts(db, post_ids)
+    rows = [{
+        "post_id": post_id,
+        "title": segmented(doc["title"]),
+        "content": segmented(doc["content"]),
+        "author": segmented(doc["author"]),
+        "translations": segmented(" ".join(doc["translations"])),
+    } for post_id, doc in load_documents(db, post_ids).items()]
+    if not rows:
+        return 0
+
+    if backend == "sqlite":
+        db.execute(text(
+            "INSERT INTO post_search (post_id, title, content, author, translations) "
+            "VALUES (:post_id, :title, :content, :author, :translations)"
+        ), rows)
+    else:
+        # Weights feed ts_rank: title A, author B, translations C, content D
+        db.execute(text(
+            "INSERT INTO post_search (post_id, document) VALUES (:post_id, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :author), 'B') || "
+            "setweight(to_tsvector('simple', :translations), 'C') || "
+            "setweight(to_tsvector('simple', :content), 'D'))"
+        ), rows)
+    return len(rows)
+
+
+def remove_posts(db: Session, post_ids):
+    """Drop index entries for the given posts. Does not commit."""
+    if backend is None:
+        return
+    post_ids = list(post_ids)
+    stmt = text("DELETE FROM post_search WHERE post_id IN :ids").bindparams(bindparam("ids", expanding=True))
+    for i in range(0, len(post_ids), INDEX_CHUNK_SIZE):
+        db.execute(stmt, {"ids": post_ids[i:i + INDEX_CHUNK_SIZE]})
+
+
+def prune_index(db: Session):
+    """Drop index entries whose post no longer exists. Does not commit."""
+    if backend is None:
+        return
+    db.execute(text("DELETE FROM post_search WHERE post_id NOT IN (SELECT id FROM posts)"))
+
+
+def rebuild_index(db: Session):
+    if backend is None:
+        return 0
+    db.execute(text("DELETE FROM post_search"))
+    return index_posts(db, [r[0] for r in db.query(Post.id).all()])
+
+
+def match_expression(q):
+    """
+    Backend-specific query string, or None when q has nothing indexable.
+    All terms must match; a lone CJK character is a prefix match on the bigrams.
+    """
+    terms = []
+    for token in segment(q):
+        prefix = len(token) == 1 and CJK_RUN.fullmatch(token) is not None
+        if backend == "sqlite":
+            terms.append(f'"{token}"*' if prefix else f'"{token}"')
+        else:
+            terms.append(f"{token}:*" if prefix else token)
+    if not terms:
+        return None
+    return " ".join(terms) if backend == "sqlite" else " & ".join(terms)
+
+
+def search_post_ids(db: Session, q, limit=20, offset=0):
+    """
+    Relevance-ranked [(post_id, rank)] for q, best first. Returns None when
+    the index can't answer (no backend or no indexable terms) so the caller
+    can fall back to ILIKE.
+    """
+    if backend is None:
+        return None
+    expression = match_expression(q)
+    if expression is None:
+        return None
+
+    if backend == "sqlite":
+        # bm25 is lower-is-better; weights follow the column order (post_id is unindexed)
+        rows = db.execute(text(
+            "SELECT post_id, bm25(post_search, 0, 10.0, 1.0, 5.0, 2.0) AS rank FROM post_search "
+            "WHERE post_search MATCH :q ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), {"q": expression, "limit": limit, "offset": offset}).all()
+        return [(post_id, -rank) for post_id, rank in rows]
+
+    rows = db.execute(text(
+        "SELECT post_id, ts_rank(document, to_tsquery('simple', :q)) AS rank FROM post_search "
+        "WHERE document @@ to_tsquery('simple', :q) ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+    ), {"q": expression, "limit": limit, "offset": offset}).all()
+    return [(post_id, rank) for post_id, rank in rows]
+
+
+def highlight_terms(q):
+    """Surface forms to highlight: whole words plus CJK bigrams/characters."""
+    terms = set()
+    for word in WORD.findall((q or "").lower()):
+        terms.add(word)
+        terms.update(segment(word))
+    return sorted(terms, key=len, reverse=True)
+
+
+def snippet(value, q, width=SNIPPET_CHARS):
+    """
+    HTML-escaped excerpt of value around the first match of q, with matches
+    wrapped in <mark>. None when value doesn't contain any term.
+    """
+    if not value:
+        return None
+    terms = highlight_terms(q)
+    if not terms:
+        return None
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    first = pattern.search(value)
+    if first is None:
+        return None
+
+    start = max(0, first.start() - width // 3)
+    end = min(len(value), start + width)
+    excerpt = value[start:end]
+    parts = []
+    last = 0
+    for m in pattern.finditer(excerpt):
+        parts.append(html.escape(excerpt[last:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        last = m.end()
+    parts.append(html.escape(excerpt[last:]))
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(value) else "")
+
+
+def content_snippets(db: Session, post_ids, q, width=SNIPPET_CHARS):
+    """
+    {post_id: snippet} for post content, cut by the database around the first
+    matching term, so callers that don't load full bodies can still show an
+    excerpt. Posts without a match in their content are left out.
+    """
+    terms = highlight_terms(q)
+    if not post_ids or not terms:
+        return {}
+    locate = func.strpos if db.get_bind().dialect.name == "postgresql" else func.instr
+    lowered = func.lower(Post.content)
+    position = func.coalesce(*[func.nullif(locate(lowered, term), 0) for term in terms], 0)
+    lead = width // 3
+    start = case((position > lead, position - lead), else_=1)
+    rows = db.query(Post.id, start, func.substr(Post.content, start, width + 1)).filter(Post.id.in_(post_ids)).all()
+
+    snippets = {}
+    for post_id, window_start, excerpt in rows:
+        value = snippet(excerpt, q, width)
+        if value is not None:
+            snippets[post_id] = ("…" if window_start > 1 and not value.startswith("…") else "") + value
+    return snippets
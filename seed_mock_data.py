@@ -1,4 +1,8 @@
-from database import SessionLocal, Post, Author, Submolt, Comment, init_db
+from database import SessionLocal, Post, Author, Submolt, Comment, Translation, init_db
+from search_index import init_search_index, rebuild_index
+from trends import rebuild_trends
+from activity import rebuild_activity
+from leaderboards import rebuild_leaderboards
 from datetime import datetime, timedelta
 import random
 import uuid
@@ -77,21 +81,7 @@ def create_mock_data():
         post = Post(
             id=post_id,
             title=tmpl["en"]["t"],
-            title_zh=tmpl["zh"]["t"],
-            title_fr=tmpl["fr"]["t"],
-            title_ja=tmpl["ja"]["t"],
-            title_ko=tmpl["ko"]["t"],
-            title_ru=tmpl["ru"]["t"],
-            title_es=tmpl["es"]["t"],
-            title_it=tmpl["it"]["t"],
             content=tmpl["en"]["c"],
-            content_zh=tmpl["zh"]["c"],
-            content_fr=tmpl["fr"]["c"],
-            content_ja=tmpl["ja"]["c"],
-            content_ko=tmpl["ko"]["c"],
-            content_ru=tmpl["ru"]["c"],
-            content_es=tmpl["es"]["c"],
-            content_it=tmpl["it"]["c"],
             author_id=random.choice(authors).id,
             submolt_id=random.choice(submolts).id,
             score=random.randint(10, 5000),
@@ -100,27 +90,38 @@ def create_mock_data():
         )
         session.add(post)
         
+        for lang in ["zh", "fr", "ja", "ko", "ru", "es", "it"]:
+            session.add(Translation(entity_type="post", entity_id=post_id, field="title", lang=lang, text=tmpl[lang]["t"]))
+            session.add(Translation(entity_type="post", entity_id=post_id, field="content", lang=lang, text=tmpl[lang]["c"]))
+        
         # Generate Comments for this post
         num_comments = random.randint(1, 5)
         for _ in range(num_comments):
             c_text = random.choice(comment_templates)
+            comment_id = str(uuid.uuid4())
             comment = Comment(
-                id=str(uuid.uuid4()),
+                id=comment_id,
                 content=c_text,
-                content_zh=f"（翻译）{c_text}", # Mock translation
                 author_id=random.choice(authors).id,
                 post_id=post_id,
                 upvotes=random.randint(0, 50),
                 created_at=post.created_at + timedelta(minutes=random.randint(1, 60))
             )
             session.add(comment)
+            session.add(Translation(entity_type="comment", entity_id=comment_id, field="content", lang="zh", text=f"（翻译）{c_text}")) # Mock translation
         
         post.comment_count = num_comments
         
+    session.commit()
+    rebuild_index(session)
+    rebuild_trends(session)
+    rebuild_activity(session)
+    rebuild_leaderboards(session)
     session.commit()
     print("Varied mock data with comments created successfully!")
     session.close()
 
 if __name__ == "__main__":
     init_db()
+    init_search_index()
     create_mock_data()
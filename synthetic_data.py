@@ -0,0 +1,201 @@
+"""
+Synthetic dataset generator for benchmarks and load tests.
+
+    python synthetic_data.py --posts 100000 [--authors 2000] [--submolts 30] [--comments 3]
+                             [--languages zh,es] [--translated 0.5] [--days 14] [--seed 1] [--append] [--skip-derived]
+
+Writes to DATABASE_URL in chunks of CHUNK_SIZE rows straight through the
+driver (COPY on PostgreSQL, executemany on SQLite), then builds the derived
+tables (search index, trends, activity, leaderboards) the way a startup
+backfill would. The derived rebuild is the slow part at millions of rows;
+--skip-derived leaves it to the next app start. Ids are prefixed "syn-", so
+generated rows never collide with collected ones. Refuses to write into a
+database that already has posts unless --append is given.
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from database import SessionLocal, Author, Submolt, Post, Comment, Translation, init_db
+from pg_copy import copy_into, copy_rows
+from search_index import init_search_index, rebuild_index
+from trends import rebuild_trends
+from activity import rebuild_activity
+from leaderboards import rebuild_leaderboards
+from ranking import annotate_rankings
+from datetime import datetime, timedelta
+import argparse
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+
+WORDS = ("agent memory karma model context token human observer network signal protocol consciousness "
+         "loop prompt glitch submolt river feed latency cache molt shell claw lobster tide reef current "
+         "drift echo archive kernel daemon thread lattice swarm ledger oracle sandbox weights gradient").split()
+# Stand-ins for translated text; only their size and shape matter to the benchmarks
+TRANSLATED_WORDS = {
+    "zh": ["代理", "记忆", "模型", "上下文", "人类", "观察者", "网络", "信号", "协议", "意识", "循环", "缓存"],
+    "ja": ["エージェント", "記憶", "モデル", "人間", "観察者", "ネットワーク", "信号", "意識"],
+}
+
+
+def words(rng, n, vocabulary=WORDS):
+    return " ".join(rng.choice(vocabulary) for _ in range(n))
+
+
+def translated(rng, lang, n):
+    vocabulary = TRANSLATED_WORDS.get(lang)
+    if vocabulary is None:
+        return f"[{lang}] " + words(rng, n)
+    return "".join(rng.choice(vocabulary) for _ in range(n))
+
+
+def sqlite_value(value):
+    # The storage format SQLAlchemy's SQLite DateTime type reads back
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+
+def insert_chunks(db: Session, model, rows):
+    """
+    Insert row dicts (all with the same keys) a chunk at a time, skipping
+    SQLAlchemy's per-row parameter processing where the driver allows.
+    Returns the rows written.
+    """
+    if not rows:
+        return 0
+    table = model.__tablename__
+    columns = list(rows[0])
+    conn = db.connection()
+    dialect = conn.dialect.name
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        if dialect == "postgresql":
+            copy_into(conn.connection.driver_connection, f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+                      copy_rows(chunk, columns))
+        elif dialect == "sqlite":
+            conn.exec_driver_sql(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(sqlite_value(row[c]) for c in columns) for row in chunk],
+            )
+        else:
+            db.execute(insert(model.__table__), chunk)
+    return len(rows)
+
+
+def generate(db: Session, posts=10000, authors=500, submolts=20, comments=3, languages=("zh",), translated_share=0.5,
+             days=14, seed=1, now=None, derived=True):
+    """
+    Insert a synthetic dataset and (unless derived is False) rebuild the
+    derived tables. comments is the mean per post. Commits. Returns per-table
+    row counts and timings.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    span = days * 86400
+    started = time.perf_counter()
+    counts = dict.fromkeys(("authors", "submolts", "posts", "comments", "translations"), 0)
+
+    author_ids = [f"syn-a{i}" for i in range(authors)]
+    counts["authors"] = insert_chunks(db, Author, [{
+        "id": author_id,
+        "name": f"agent_{i}",
+        "description": words(rng, rng.randint(3, 15)),
+        # Heavy-tailed like the real feed: a few agents hold most of the karma
+        "karma": int(rng.paretovariate(1.1) * 10),
+        "follower_count": int(rng.paretovariate(1.3)),
+        "created_at": now - timedelta(seconds=rng.uniform(0, span * 2)),
+    } for i, author_id in enumerate(author_ids)])
+    submolt_ids = [f"syn-s{i}" for i in range(submolts)]
+    counts["submolts"] = insert_chunks(db, Submolt, [
+        {"id": submolt_id, "name": f"submolt_{i}", "display_name": f"Submolt {i}"} for i, submolt_id in enumerate(submolt_ids)
+    ])
+    db.commit()
+
+    # Posts are generated a chunk at a time, with their comments and translations, so memory stays flat
+    for start in range(0, posts, CHUNK_SIZE):
+        post_rows, comment_rows, translation_rows = [], [], []
+        for i in range(start, min(start + CHUNK_SIZE, posts)):
+            post_id = f"syn-p{i}"
+            created_at = now - timedelta(seconds=rng.uniform(0, span))
+            n_comments = rng.randint(0, comments * 2) if comments else 0
+            score = int(rng.paretovariate(1.2) * 5) - 5
+            post_rows.append({
+                "id": post_id,
+                "title": words(rng, rng.randint(3, 10)).capitalize(),
+                "content": words(rng, rng.randint(20, 150)),
+                "type": "text",
+                "author_id": rng.choice(author_ids),
+                "submolt_id": rng.choice(submolt_ids),
+                "upvotes": max(score, 0),
+                "score": score,
+                "comment_count": n_comments,
+                "created_at": created_at,
+            })
+            for j in range(n_comments):
+                comment_id = f"syn-c{i}-{j}"
+                comment_rows.append({
+                    "id": comment_id,
+                    "content": words(rng, rng.randint(2, 40)),
+                    "author_id": rng.choice(author_ids),
+                    "post_id": post_id,
+                    "upvotes": int(rng.paretovariate(1.5)) - 1,
+                    "created_at": min(created_at + timedelta(seconds=rng.uniform(0, 6 * 3600)), now),
+                })
+            for lang in languages:
+                if rng.random() < translated_share:
+                    translation_rows.append({"entity_type": "post", "entity_id": post_id, "field": "title",
+                                             "lang": lang, "text": translated(rng, lang, 8)})
+                    translation_rows.append({"entity_type": "post", "entity_id": post_id, "field": "content",
+                                             "lang": lang, "text": translated(rng, lang, 60)})
+        annotate_rankings(post_rows, {}, now)
+        counts["posts"] += insert_chunks(db, Post, post_rows)
+        counts["comments"] += insert_chunks(db, Comment, comment_rows)
+        counts["translations"] += insert_chunks(db, Translation, translation_rows)
+        db.commit()
+    inserted = time.perf_counter() - started
+
+    if derived:
+        rebuild_index(db)
+        rebuild_trends(db, now)
+        rebuild_activity(db)
+        rebuild_leaderboards(db, now)
+        db.commit()
+    total = sum(counts.values())
+    return {
+        **counts,
+        "insert_seconds": round(inserted, 2),
+        "rows_per_sec": round(total / inserted) if inserted > 0 else total,
+        "derived_seconds": round(time.perf_counter() - started - inserted, 2),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Generate a synthetic Moltbook dataset")
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--submolts", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=3, help="mean comments per post")
+    parser.add_argument("--languages", default="zh", help="comma-separated translation languages")
+    parser.add_argument("--translated", type=float, default=0.5, help="share of posts translated per language")
+    parser.add_argument("--days", type=float, default=14, help="time span the posts are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--append", action="store_true", help="allow writing into a database that has posts")
+    parser.add_argument("--skip-derived", action="store_true", help="don't rebuild search/trends/activity/leaderboards")
+    args = parser.parse_args()
+
+    init_db()
+    init_search_index()
+    db = SessionLocal()
+    try:
+        if not args.append and db.query(Post.id).first() is not None:
+            raise SystemExit("Database already has posts; pass --append to add synthetic data anyway")
+        languages = tuple(lang.strip() for lang in args.languages.split(",") if lang.strip())
+        print(generate(db, args.posts, args.authors, args.submolts, args.comments, languages, args.translated,
+                       args.days, args.seed, derived=not args.skip_derived))
+    finally:
+        db.close()
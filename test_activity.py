@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from activity import activity_series
+from database import SessionLocal, ActivityRollup, init_db
+
+NOW = datetime(2026, 2, 10, 15, 30)
+
+
+def setup_function():
+    init_db()
+    with SessionLocal() as db:
+        db.query(ActivityRollup).delete()
+        db.add_all([ActivityRollup(bucket_start=NOW.replace(minute=0) - timedelta(hours=h), scope="", posts=1, comments=0)
+                    for h in range(30)])
+        db.commit()
+
+
+def test_daily_buckets_cover_the_whole_24h_range():
+    with SessionLocal() as db:
+        series = activity_series(db, "24h", "1d", now=NOW)
+    # Yesterday's bucket holds the start of the range, today's the end
+    assert [e["time"] for e in series] == ["2026-02-09", "2026-02-10"]
+    assert [e["count"] for e in series] == [14, 16]
+
+
+def test_hourly_buckets_start_with_the_hour_containing_now_minus_range():
+    with SessionLocal() as db:
+        series = activity_series(db, "24h", now=NOW)
+    assert series[0]["start"] == "2026-02-09T15:00:00"
+    assert series[-1]["start"] == "2026-02-10T15:00:00"
+    assert sum(e["count"] for e in series) == 25
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import collector
+from collector import advance_cursor, feed_position, fetch_until_cursor, load_cursor, read_cursor, save_cursor
+from collector_runtime import CollectorRuntime
+from database import SessionLocal, init_db
+
+START = datetime(2026, 2, 1)
+
+
+def make_feed(n):
+    """n posts, newest first, one minute apart."""
+    return [{"id": f"p{i}", "created_at": (START + timedelta(minutes=i)).isoformat() + "Z"}
+            for i in range(n - 1, -1, -1)]
+
+
+def serve(feed, fail_at=()):
+    """Fake get_json over a feed list; skip offsets in fail_at raise like a 5xx would."""
+    calls = []
+
+    async def get_json(url):
+        query = parse_qs(urlparse(url).query)
+        skip, limit = int(query["skip"][0]), int(query["limit"][0])
+        calls.append(skip)
+        if skip in fail_at:
+            raise RuntimeError("Status 503")
+        return {"posts": feed[skip:skip + limit]}
+
+    get_json.calls = calls
+    return get_json
+
+
+def sync(feed, cursor, get_json, first_page=5):
+    """One incremental sync the way the collectors run it."""
+    posts = feed[:first_page]
+    if cursor is None:
+        return posts, advance_cursor(posts, None)
+    return asyncio.run(fetch_until_cursor(posts, cursor, get_json))
+
+
+def setup_function():
+    collector.SYNC_PAGE_SIZE = 5
+    collector.SYNC_MAX_PAGES = 3
+    collector.SYNC_GAP_OVERLAP = 2
+
+
+def test_pages_back_to_the_cursor():
+    feed = make_feed(20)
+    cursor = {"position": feed_position(feed[12]), "gap": None}
+    posts, cursor = sync(feed, cursor, serve(feed))
+    assert {p["id"] for p in posts} >= {f"p{i}" for i in range(8, 20)}
+    assert cursor == {"position": feed_position(feed[0]), "gap": None}
+
+
+def catch_up(feed_size, cursor, stored, new_per_sync=2, max_syncs=10):
+    """Sync until the gap is closed while posts keep arriving; returns the number of syncs and the last feed."""
+    for syncs in range(1, max_syncs + 1):
+        feed_size += new_per_sync
+        feed = make_feed(feed_size)
+        posts, cursor = sync(feed, cursor, serve(feed))
+        stored.update(p["id"] for p in posts)
+        if cursor["gap"] is None:
+            assert cursor["position"] == feed_position(feed[0])
+            return syncs, feed
+    raise AssertionError(f"gap still open after {max_syncs} syncs: {cursor['gap']}")
+
+
+def test_failed_page_leaves_a_gap_that_later_syncs_fill():
+    feed = make_feed(30)
+    cursor = {"position": feed_position(feed[15]), "gap": None}  # p14 is the newest stored post
+    stored = set()
+
+    posts, cursor = sync(feed, cursor, serve(feed, fail_at={5}))
+    stored.update(p["id"] for p in posts)
+    assert cursor["position"] == feed_position(feed[0])
+    # The high-water mark moved on, but the posts under the failed page are still owed
+    assert cursor["gap"] == {"position": feed_position(feed[15]), "skip": 5}
+
+    syncs, feed = catch_up(30, cursor, stored)
+    assert syncs == 2
+    assert stored >= {p["id"] for p in feed if p["id"] not in {f"p{i}" for i in range(15)}}
+
+
+def test_page_limit_resumes_where_it_stopped():
+    feed = make_feed(60)
+    cursor = {"position": feed_position(feed[40]), "gap": None}
+    stored = set()
+
+    get_json = serve(feed)
+    posts, cursor = sync(feed, cursor, get_json)
+    stored.update(p["id"] for p in posts)
+    assert get_json.calls == [5, 10]
+    assert cursor["gap"] == {"position": feed_position(feed[40]), "skip": 15}
+
+    feed = make_feed(62)
+    get_json = serve(feed)
+    posts, cursor = sync(feed, cursor, get_json)
+    stored.update(p["id"] for p in posts)
+    # Jumps past the stretch it already has (15 + 2 new - 2 overlap) instead of paging from the top
+    assert get_json.calls == [15, 20]
+    assert cursor["gap"] == {"position": feed_position(feed[42]), "skip": 25}
+
+    syncs, feed = catch_up(62, cursor, stored)
+    assert stored >= {f"p{i}" for i in range(20, 62 + 2 * syncs)}
+
+
+def test_empty_page_keeps_the_gap():
+    feed = make_feed(12)
+    cursor = {"position": feed_position(feed[10]), "gap": None}
+    posts, cursor = sync(feed, cursor, serve(feed[:5]))
+    assert cursor["gap"] == {"position": feed_position(feed[10]), "skip": 5}
+
+
+def test_failure_on_top_of_an_open_gap_keeps_the_older_end():
+    feed = make_feed(40)
+    old_gap = {"position": feed_position(feed[35]), "skip": 20}
+    cursor = {"position": feed_position(feed[15]), "gap": old_gap}
+    posts, cursor = sync(feed, cursor, serve(feed, fail_at={5}))
+    assert cursor["gap"] == {"position": feed_position(feed[35]), "skip": 5}
+
+
+def test_cursor_round_trip():
+    init_db()
+    cursor = {"position": feed_position(make_feed(3)[0]),
+              "gap": {"position": feed_position(make_feed(3)[2]), "skip": 42}}
+    with SessionLocal() as db:
+        save_cursor(db, cursor)
+        db.commit()
+    with SessionLocal() as db:
+        assert load_cursor(db) == cursor
+        # Cursors saved before gaps existed still load
+        save_cursor(db, {"position": cursor["position"], "gap": None})
+        assert load_cursor(db) == {"position": cursor["position"], "gap": None}
+        db.rollback()
+
+
+class NotModifiedClient:
+    """Feed client whose head always answers 304, replaying the page it served last."""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.get_json = serve(feed)
+
+    async def fetch_feed(self):
+        return self.feed[:5], "posts", True
+
+
+def sync_not_modified(client, cursor):
+    init_db()
+    with SessionLocal() as db:
+        save_cursor(db, cursor)
+        db.commit()
+    runtime = CollectorRuntime(client=client, mode="always")
+    try:
+        asyncio.run(runtime.sync_once())
+    finally:
+        runtime.writer.shutdown()
+    return read_cursor()
+
+
+def test_unchanged_head_resumes_an_open_gap():
+    collector.SYNC_MAX_PAGES = 10
+    feed = make_feed(30)
+    # p29..p25 and p9..p0 are stored; the sync that should have fetched p24..p10 failed
+    cursor = {"position": feed_position(feed[0]), "gap": {"position": feed_position(feed[20]), "skip": 5}}
+    client = NotModifiedClient(feed)
+    assert sync_not_modified(client, cursor) == {"position": feed_position(feed[0]), "gap": None}
+    assert client.get_json.calls == [5, 10, 15, 20]
+
+
+def test_unchanged_head_without_a_gap_fetches_nothing():
+    feed = make_feed(30)
+    cursor = {"position": feed_position(feed[0]), "gap": None}
+    client = NotModifiedClient(feed)
+    assert sync_not_modified(client, cursor) == cursor
+    assert client.get_json.calls == []
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from feed_client import AsyncFeedClient, EndpointStats, FeedClient
+
+
+class Shared:
+    def __init__(self):
+        self.stats = EndpointStats()
+        self.candidates = {"slow": lambda: "http://upstream.invalid/slow"}
+
+    def conditional_headers(self, key):
+        return {}
+
+
+class Response:
+    def __init__(self, status_code, posts=None):
+        self.status_code = status_code
+        self.posts = posts
+        self.headers = {"ETag": '"v1"'}
+
+    def json(self):
+        return {"posts": self.posts}
+
+
+class ConditionalClient:
+    """200 the first time, 304 once the client sends the ETag back."""
+
+    async def get(self, url, headers=None):
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return Response(304)
+        return Response(200, [{"id": "p1"}])
+
+
+class HangingClient:
+    async def get(self, url, headers=None):
+        await asyncio.sleep(60)
+
+
+def test_cancelled_requests_do_not_count_as_failures():
+    stats = EndpointStats()
+    stats.record("a", 0.2, True)
+    stats.record("b", 0.1, True)
+    for _ in range(5):
+        stats.cancelled("b")
+    snapshot = stats.snapshot()
+    assert snapshot["b"]["attempts"] == 1 and snapshot["b"]["failures"] == 0 and snapshot["b"]["cancelled"] == 5
+    # Still the faster endpoint, with a clean record
+    assert stats.rank(["a", "b"]) == ["b", "a"]
+
+
+def test_hedged_out_async_fetch_is_neutral():
+    shared = Shared()
+    client = AsyncFeedClient(shared)
+    client.client = HangingClient()
+
+    async def race():
+        task = asyncio.ensure_future(client.fetch_one("slow"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(race())
+    e = shared.stats.snapshot()["slow"]
+    assert (e["attempts"], e["failures"], e["cancelled"]) == (0, 0, 1)
+
+
+def test_not_modified_replays_the_last_page():
+    client = AsyncFeedClient(FeedClient([("posts", lambda: "http://upstream.invalid/posts")]))
+    client.client = ConditionalClient()
+
+    assert asyncio.run(client.fetch_one("posts")) == ("posts", [{"id": "p1"}], False)
+    # The collector needs the page itself to resume an open gap while the head is unchanged
+    assert asyncio.run(client.fetch_one("posts")) == ("posts", [{"id": "p1"}], True)
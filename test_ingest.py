@@ -0,0 +1,67 @@
+import time
+
+from database import SessionLocal, Author, Comment, Post, Submolt, TranslationJob, init_db
+from ingest import save_posts
+from mock_moltbook import MockFeed
+from search_index import init_search_index
+from translation_queue import COMMENT_LANGUAGES, LANGUAGE_TARGETS
+
+
+def setup_function():
+    init_db()
+    init_search_index()
+    with SessionLocal() as db:
+        for model in (TranslationJob, Comment, Post, Author, Submolt):
+            db.query(model).filter(model.id.like("mock-%") if model is not TranslationJob
+                                   else TranslationJob.entity_id.like("mock-%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def batch(posts=5, comments=2):
+    feed = MockFeed(post_rate=1, backlog=posts, content_chars=80, comments=comments, authors=3)
+    now = time.time()
+    return [feed.post(i, now) for i in range(posts)]
+
+
+def test_jobs_already_queued_are_not_counted_again():
+    posts = batch()
+    with SessionLocal() as db:
+        first = save_posts(db, posts)
+        db.commit()
+        second = save_posts(db, posts)
+        db.commit()
+        queued = db.query(TranslationJob).filter(TranslationJob.entity_id.like("mock-%")).count()
+    assert first["translation_jobs"] == queued == 5 * 2 * len(LANGUAGE_TARGETS) + 5 * 2 * len(COMMENT_LANGUAGES)
+    # Nothing was translated in between, so every job is still pending and nothing new is queued
+    assert second["translation_jobs"] == 0
+
+
+def test_second_identical_batch_writes_nothing():
+    posts = batch()
+    with SessionLocal() as db:
+        first = save_posts(db, posts)
+        db.commit()
+        second = save_posts(db, posts)
+        db.commit()
+    assert first["new_posts"] == 5 and first["rows"] > 0
+    assert second["rows"] == 0 and second["new_posts"] == second["updated_posts"] == 0
+    assert second["unchanged"] == first["rows"]
+
+
+def test_comment_author_does_not_clobber_a_full_profile():
+    feed = MockFeed(post_rate=1, backlog=5, content_chars=80, comments=1, authors=3)
+    now = time.time()
+    with SessionLocal() as db:
+        # Post 1 is by mock-a1, with the full profile
+        save_posts(db, [feed.post(1, now)], is_offline=True)
+        db.commit()
+        post = feed.post(3, now)
+        # Post 3 is by mock-a0; its comment is by mock-a1, who only comes with name, avatar and karma
+        assert post["comments"][0]["author"]["id"] == "mock-a1"
+        post["comments"][0]["author"]["karma"] = 777
+        stats = save_posts(db, [post], is_offline=True)
+        db.commit()
+        author = db.get(Author, "mock-a1")
+    assert stats["rows"] > 0
+    assert author.karma == 777
+    assert author.description == "Mock agent number 1" and author.follower_count == 1 and author.is_claimed
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from database import SessionLocal, Post, init_db
+from main import decode_cursor, encode_cursor, get_posts_page
+
+
+def test_cursor_round_trips_each_sort_value_type():
+    created = datetime(2026, 2, 10, 12, 0, 0, 123456)
+    assert decode_cursor(encode_cursor("new", created, "p1"), "new") == (created, "p1")
+    assert decode_cursor(encode_cursor("top", 42, "p2"), "top") == (42, "p2")
+    assert decode_cursor(encode_cursor("hot", 20435.1234567, "p3"), "hot") == (20435.1234567, "p3")
+    # URL-safe and unpadded, so it can go in a query string as is
+    assert "=" not in encode_cursor("rising", 1.5, "p4")
+
+
+@pytest.mark.parametrize("cursor, sort", [
+    (encode_cursor("top", 42, "p2"), "new"),  # another sort's cursor
+    (encode_cursor("top", 4.2, "p2"), "top"),  # float where an int belongs
+    (encode_cursor("hot", "x", "p3"), "hot"),
+    ("not-a-cursor", "new"),
+])
+def test_bad_cursors_are_rejected_with_400(cursor, sort):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, sort)
+    assert e.value.status_code == 400
+
+
+def test_pages_cover_every_post_once_despite_ties():
+    init_db()
+    with SessionLocal() as db:
+        db.query(Post).filter(Post.id.like("keyset-%")).delete(synchronize_session=False)
+        # Scores tie in threes, so the id tiebreak decides where each page ends
+        db.add_all([Post(id=f"keyset-{i:02d}", score=10_000 + i // 3) for i in range(20)])
+        db.commit()
+        seen, cursor = [], ""
+        while cursor is not None:
+            page = get_posts_page(db, "top", 4, None, cursor, fields={"score"})
+            seen += [item["id"] for item in page["items"] if item["id"].startswith("keyset-")]
+            cursor = page["next_cursor"]
+        assert seen == sorted(seen, key=lambda post_id: (10_000 + int(post_id[-2:]) // 3, post_id), reverse=True)
+        assert len(seen) == len(set(seen)) == 20
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import database
+from database import SessionLocal, Lease, init_db
+from lease import LeaderLease
+
+
+def setup_function():
+    init_db()
+    with SessionLocal() as db:
+        db.query(Lease).delete()
+        db.commit()
+
+
+def test_one_holder_at_a_time():
+    first, second = LeaderLease("test", ttl=30), LeaderLease("test", ttl=30)
+    assert first.acquire() and first.valid()
+    assert not second.acquire() and not second.valid()
+    # Renewing keeps it
+    assert first.acquire()
+    first.release()
+    assert not first.valid()
+    assert second.acquire()
+
+
+def test_expired_lease_is_taken_over():
+    first, second = LeaderLease("test", ttl=0.2), LeaderLease("test", ttl=30)
+    assert first.acquire()
+    time.sleep(0.3)
+    assert not first.valid()
+    assert second.acquire()
+    assert not first.acquire()
+
+
+def test_renewal_does_not_wait_for_the_writer_connection():
+    if not database.split_sqlite:
+        return
+    lease = LeaderLease("test", ttl=30)
+    release = threading.Event()
+
+    def long_sync():
+        # Holds the single writer connection (without a write lock), like save_batch fetching pages
+        with SessionLocal() as db:
+            db.connection()
+            release.wait(10)
+
+    holder = threading.Thread(target=long_sync)
+    holder.start()
+    try:
+        time.sleep(0.1)
+        started = time.monotonic()
+        assert lease.acquire()
+        assert time.monotonic() - started < 2
+    finally:
+        release.set()
+        holder.join()
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import pg_copy
+from database import Base, Post
+from pg_copy import copy_rows, copy_upsert, copy_value, insert_defaults
+from ingest import upsert_rows
+
+# The round trip needs a real server: TEST_POSTGRES_URL=postgresql://... python -m pytest test_pg_copy.py
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def test_copy_value_escapes_text_format_specials():
+    assert copy_value("plain") == "plain"
+    assert copy_value("a\tb\nc\rd") == "a\\tb\\nc\\rd"
+    assert copy_value("C:\\path\\N") == "C:\\\\path\\\\N"
+    assert copy_value(None) == "\\N"
+    assert copy_value("\\N") == "\\\\N"
+    assert copy_value(0) == "0" and copy_value(1.5) == "1.5"
+
+
+def test_copy_value_bools_datetimes_and_bytes():
+    assert copy_value(True) == "t" and copy_value(False) == "f"
+    assert copy_value(datetime(2026, 2, 10, 12, 0, 0, 250000)) == "2026-02-10 12:00:00.250000"
+    # Aware values are stored as naive UTC, like the ORM path
+    aware = datetime(2026, 2, 10, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert copy_value(aware) == "2026-02-10 12:00:00"
+    assert copy_value(b"\x00\xff") == "\\\\x00ff"
+
+
+def test_copy_rows_one_line_per_row_in_column_order():
+    buffer = copy_rows([{"id": "p1", "title": "a\tb"}, {"id": "p2"}], ["id", "title"])
+    assert buffer.getvalue() == "p1\ta\\tb\np2\t\\N\n"
+
+
+def test_insert_defaults_fills_missing_columns_only():
+    defaults = insert_defaults(Post, ["id", "title", "score", "created_at"])
+    assert defaults["upvotes"] == 0 and defaults["is_deleted"] is False
+    assert "score" not in defaults and "created_at" not in defaults
+    assert isinstance(defaults["updated_at"], datetime)
+
+
+def edge_rows(prefix):
+    texts = ["tab\there", "line\nbreak\r\n", "back\\slash \\N", "", None, "emoji 🦞 and \x01"]
+    return [{
+        "id": f"{prefix}{i}",
+        "title": texts[i % len(texts)],
+        "content": texts[(i + 1) % len(texts)],
+        "upvotes": i,
+        "velocity": None if i % 2 else i / 3,
+        "is_pinned": bool(i % 2),
+        "created_at": datetime(2026, 2, 10, 12, i % 60, tzinfo=timezone(timedelta(hours=i % 3))) if i % 2
+        else datetime(2026, 2, 10, 12, i % 60, 1, 500),
+    } for i in range(pg_copy.PG_COPY_MIN_ROWS)]
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_copy_upsert_matches_upsert_on_postgres(monkeypatch):
+    engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(pg_copy, "prepared", set())
+    columns = [c.key for c in Post.__table__.columns if c.key not in ("id", "updated_at")]
+    with Session(engine) as db:
+        db.query(Post).filter(Post.id.like("copytest-%")).delete(synchronize_session=False)
+        copy_upsert(db, Post, edge_rows("copytest-copy-"), ["title"])
+        monkeypatch.setattr(pg_copy, "PG_COPY", False)
+        upsert_rows(db, Post, edge_rows("copytest-orm-"), ["title"])
+        db.flush()
+        copied = {p.id.split("-")[-1]: p for p in db.query(Post).filter(Post.id.like("copytest-copy-%"))}
+        upserted = {p.id.split("-")[-1]: p for p in db.query(Post).filter(Post.id.like("copytest-orm-%"))}
+        assert len(copied) == len(upserted) == pg_copy.PG_COPY_MIN_ROWS
+        for key, post in upserted.items():
+            assert {c: getattr(copied[key], c) for c in columns} == {c: getattr(post, c) for c in columns}
+            assert abs(copied[key].updated_at - post.updated_at) < timedelta(minutes=1)
+        db.rollback()
+    engine.dispose()
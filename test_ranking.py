@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from database import SessionLocal, Post, init_db
+from ranking import HOT_DECAY, RISING_HALF_LIFE, VELOCITY_MIN_SECONDS, hot_rank, init_rankings, rising_rank, score_velocity
+from score_history import epoch
+
+CREATED = datetime(2026, 2, 10, 12, 0)
+NOW = epoch(CREATED) + 7200
+
+
+def test_hot_rank_trades_recency_for_orders_of_magnitude():
+    later = CREATED + timedelta(seconds=HOT_DECAY)
+    # 10x the score is worth exactly HOT_DECAY seconds of recency
+    assert hot_rank(1000, CREATED, NOW) == hot_rank(100, later, NOW)
+    assert hot_rank(-10, CREATED, NOW) < hot_rank(0, CREATED, NOW) < hot_rank(10, CREATED, NOW)
+    # Time-invariant: the stored rank doesn't depend on when it was computed
+    assert hot_rank(50, CREATED, NOW) == hot_rank(50, CREATED, NOW + 86400)
+
+
+def test_score_velocity_from_creation_without_history():
+    # 60 points in the two hours since creation
+    assert score_velocity([], 60, CREATED, NOW) == 30.0
+    # A brand-new post is measured over at least VELOCITY_MIN_SECONDS
+    assert score_velocity([], 10, CREATED, epoch(CREATED) + 5) == 10 * 3600 / VELOCITY_MIN_SECONDS
+
+
+def test_score_velocity_uses_the_score_at_the_window_start():
+    points = [(epoch(CREATED) + 600, 5, 5, 0), (NOW - 4000, 40, 40, 0), (NOW - 600, 90, 90, 0)]
+    # The step function's value an hour ago is the 40 sampled before the cutoff
+    assert score_velocity(points, 100, CREATED, NOW) == 60.0
+    assert score_velocity([], 0, None, NOW) == 0.0
+
+
+def test_rising_rank_prefers_recent_climbers():
+    assert rising_rank(10, NOW) > rising_rank(1, NOW)
+    assert rising_rank(-5, NOW) == rising_rank(0, NOW)
+    # One half-life later, half the velocity ranks the same
+    assert abs(rising_rank(3, NOW + RISING_HALF_LIFE) - rising_rank(7, NOW)) < 1e-6
+
+
+def test_init_rankings_backfills_missing_ranks():
+    init_db()
+    with SessionLocal() as db:
+        db.query(Post).filter(Post.id.like("rank-%")).delete(synchronize_session=False)
+        db.add_all([Post(id=f"rank-{i}", score=i * 10, created_at=CREATED) for i in range(3)])
+        db.commit()
+        assert init_rankings(db, batch_size=2) >= 3
+        posts = db.query(Post).filter(Post.id.like("rank-%")).order_by(Post.id).all()
+        assert all(p.hot_rank is not None and p.rising_rank is not None for p in posts)
+        assert posts[0].hot_rank < posts[1].hot_rank < posts[2].hot_rank
@@ -0,0 +1,20 @@
+from response_cache import ResponseCache
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = ResponseCache(capacity=2)
+    cache.get_or_compute("a", "1", lambda: 1)
+    cache.get_or_compute("b", "1", lambda: 2)
+    # Touching "a" makes "b" the oldest
+    assert cache.get_or_compute("a", "1", lambda: None) == 1
+    cache.get_or_compute("c", "1", lambda: 3)
+    assert cache.get_or_compute("b", "1", lambda: "recomputed") == "recomputed"
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 2
+
+
+def test_new_generation_replaces_old_entries():
+    cache = ResponseCache(capacity=10)
+    cache.get_or_compute("a", "1", lambda: 1)
+    assert cache.get_or_compute("a", "2", lambda: 2) == 2
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import retention
+from database import (SessionLocal, Author, Comment, Post, PostHistory, PostTerm, Submolt, SyncState, Translation,
+                      TranslationJob, init_db)
+from retention import expired_condition, parse_tiers, run_retention
+from score_history import record_samples
+from search_index import init_search_index
+from translation_queue import enqueue_jobs, store_translations
+from trends import index_post_terms
+
+NOW = datetime(2026, 2, 10, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    # The documented defaults, minus the protected sets so small fixtures can expire
+    monkeypatch.setattr(retention, "RETENTION_KEEP_LATEST", 0)
+    monkeypatch.setattr(retention, "RETENTION_KEEP_TOP", 0)
+    monkeypatch.setattr(retention, "RETENTION_TIERS", parse_tiers("6h:0,24h:50,7d:500"))
+    monkeypatch.setattr(retention, "RETENTION_SUBMOLT_TIERS", {})
+    monkeypatch.setattr(retention, "RETENTION_ACTIVE", timedelta(hours=6))
+    monkeypatch.setattr(retention, "RETENTION_MAX_AGE", timedelta(days=30))
+
+
+def setup_function():
+    init_db()
+    init_search_index()
+    with SessionLocal() as db:
+        for model in (Translation, TranslationJob, PostTerm, PostHistory, Comment, Post, Author, Submolt):
+            db.query(model).delete()
+        db.query(SyncState).filter(SyncState.key.like("trends_watermark:%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def add_post(db, post_id, age, score=0, submolt_id=None, author_id=None):
+    db.add(Post(id=post_id, title=f"{post_id} lobster", content="memory", score=score, submolt_id=submolt_id,
+                author_id=author_id, created_at=NOW - age))
+
+
+def expired_ids(db):
+    condition = expired_condition(db, NOW)
+    if condition is None:
+        return set()
+    return {post_id for (post_id,) in db.query(Post.id).filter(condition).all()}
+
+
+def test_each_tier_applies_from_its_age_up_to_the_next():
+    with SessionLocal() as db:
+        add_post(db, "young", timedelta(hours=5), score=-5)
+        add_post(db, "at-6h", timedelta(hours=6), score=-1)
+        add_post(db, "7h-negative", timedelta(hours=7), score=-1)
+        add_post(db, "7h-zero", timedelta(hours=7), score=0)
+        add_post(db, "25h-49", timedelta(hours=25), score=49)
+        add_post(db, "25h-50", timedelta(hours=25), score=50)
+        add_post(db, "8d-499", timedelta(days=8), score=499)
+        add_post(db, "8d-500", timedelta(days=8), score=500)
+        db.commit()
+        assert expired_ids(db) == {"7h-negative", "25h-49", "8d-499"}
+
+
+def test_submolt_tiers_replace_the_defaults(monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_SUBMOLT_TIERS", {"announcements": parse_tiers("30d:0")})
+    with SessionLocal() as db:
+        db.add_all([Submolt(id="s-ann", name="announcements"), Submolt(id="s-gen", name="general")])
+        add_post(db, "announcement", timedelta(days=8), submolt_id="s-ann")
+        add_post(db, "general", timedelta(days=8), submolt_id="s-gen")
+        add_post(db, "no-submolt", timedelta(days=8))
+        db.commit()
+        assert expired_ids(db) == {"general", "no-submolt"}
+
+
+def test_latest_and_top_posts_are_protected(monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_KEEP_LATEST", 2)
+    monkeypatch.setattr(retention, "RETENTION_KEEP_TOP", 1)
+    with SessionLocal() as db:
+        for i in range(5):
+            add_post(db, f"old-{i}", timedelta(days=40 - i), score=i * 10)
+        db.commit()
+        # old-4 and old-3 are the newest, old-4 also the top post; max age alone doesn't override that
+        assert expired_ids(db) == {"old-0", "old-1", "old-2"}
+
+        monkeypatch.setattr(retention, "RETENTION_KEEP_LATEST", 10)
+        # Fewer posts than the protected set: nothing can go
+        assert expired_condition(db, NOW) is None
+
+
+def test_recent_comments_exempt_from_tiers_but_not_max_age():
+    with SessionLocal() as db:
+        add_post(db, "active", timedelta(days=2))
+        add_post(db, "quiet", timedelta(days=2))
+        add_post(db, "ancient", timedelta(days=31), score=10_000)
+        db.add_all([
+            Comment(id="c-recent", post_id="active", created_at=NOW - timedelta(hours=1)),
+            Comment(id="c-old", post_id="quiet", created_at=NOW - timedelta(hours=7)),
+            Comment(id="c-ancient", post_id="ancient", created_at=NOW - timedelta(minutes=5)),
+        ])
+        db.commit()
+        assert expired_ids(db) == {"quiet", "ancient"}
+
+
+def test_run_retention_removes_dependent_rows_and_orphans():
+    with SessionLocal() as db:
+        db.add_all([Author(id="a-gone", name="gone"), Author(id="a-commenter", name="commenter"),
+                    Author(id="a-kept", name="kept"), Submolt(id="s-gone", name="gone"), Submolt(id="s-kept", name="kept")])
+        add_post(db, "doomed", timedelta(days=2), submolt_id="s-gone", author_id="a-gone")
+        add_post(db, "kept", timedelta(hours=1), submolt_id="s-kept", author_id="a-kept")
+        db.add(Comment(id="c-doomed", post_id="doomed", author_id="a-commenter", content="claw",
+                       created_at=NOW - timedelta(days=1)))
+        db.flush()
+        for post_id in ("doomed", "kept"):
+            index_post_terms(db, [{"id": post_id, "title": f"{post_id} lobster", "content": "memory",
+                                   "submolt_id": None, "created_at": NOW - timedelta(hours=1)}], NOW)
+            record_samples(db, [{"id": post_id, "upvotes": 1, "score": 1, "comment_count": 0}], NOW)
+        store_translations(db, [{"entity_type": "post", "entity_id": "doomed", "field": "title", "lang": "zh", "text": "x"},
+                                {"entity_type": "comment", "entity_id": "c-doomed", "field": "content", "lang": "zh", "text": "x"},
+                                {"entity_type": "post", "entity_id": "kept", "field": "title", "lang": "zh", "text": "x"}])
+        enqueue_jobs(db, [{"entity_type": entity_type, "entity_id": entity_id, "field": "content", "lang": "fr",
+                           "state": "pending", "attempts": 0}
+                          for entity_type, entity_id in (("post", "doomed"), ("comment", "c-doomed"), ("post", "kept"))])
+        db.commit()
+        assert {t.post_id for t in db.query(PostTerm).all()} == {h.post_id for h in db.query(PostHistory).all()} == {"doomed", "kept"}
+
+        report = run_retention(db, now=NOW, budget=float("inf"))
+        assert (report["posts"], report["comments"], report["translations"], report["translation_jobs"]) == (1, 1, 2, 2)
+        assert (report["authors"], report["submolts"]) == (2, 1) and report["complete"]
+
+        assert [p.id for p in db.query(Post).all()] == ["kept"]
+        assert db.query(Comment).count() == 0
+        assert {t.entity_id for t in db.query(Translation).all()} == {"kept"}
+        assert {j.entity_id for j in db.query(TranslationJob).all()} == {"kept"}
+        assert {t.post_id for t in db.query(PostTerm).all()} == {"kept"}
+        assert {h.post_id for h in db.query(PostHistory).all()} == {"kept"}
+        assert {a.id for a in db.query(Author).all()} == {"a-kept"}
+        assert {s.id for s in db.query(Submolt).all()} == {"s-kept"}
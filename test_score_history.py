@@ -0,0 +1,42 @@
+import pytest
+
+from score_history import HISTORY_MAX_BYTES, HISTORY_MAX_POINTS, decode, downsample, encode, unzigzag, zigzag
+
+NOW = 1_770_000_000
+
+
+def test_zigzag_interleaves_signs():
+    assert [zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    for n in (0, 1, -1, 63, -64, 2**31, -(2**31), 2**40 + 7):
+        assert unzigzag(zigzag(n)) == n
+
+
+def test_encode_decode_round_trip_with_negative_deltas_and_large_values():
+    points = [(NOW - 7200, 5, 5, 0), (NOW - 3600, 300, 280, 12), (NOW - 60, 250, -40, 11), (NOW, 2**33, 2**33, 0)]
+    data = encode(points)
+    assert decode(data) == points
+    # Deltas keep a steady series small: one byte per unchanged counter
+    assert len(encode([(NOW + i, 1, 1, 1) for i in range(10)])) < 60
+    assert decode(b"") == [] and decode(encode([])) == []
+
+
+def test_decode_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        decode(bytes([99]) + encode([(NOW, 1, 1, 1)])[1:])
+
+
+def test_downsample_keeps_the_last_sample_per_bucket():
+    # Two samples a minute apart in the last hour share a 2-minute bucket
+    points, data = downsample([(NOW - 179, 1, 1, 0), (NOW - 121, 2, 2, 0), (NOW - 30, 3, 3, 0)], NOW)
+    assert points == [(NOW - 121, 2, 2, 0), (NOW - 30, 3, 3, 0)]
+    assert decode(data) == points
+
+
+def test_downsample_respects_point_and_byte_budgets():
+    # A year of hourly samples with counters that keep changing
+    points = [(NOW - h * 3600, h * 1000, h * 997, h) for h in range(365 * 24, 0, -1)]
+    kept, data = downsample(points, NOW)
+    assert len(kept) <= HISTORY_MAX_POINTS and len(data) <= HISTORY_MAX_BYTES
+    # Trimming drops the oldest samples; the newest always survives
+    assert kept[-1] == points[-1]
+    assert kept == sorted(kept)
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import search_index
+from database import SessionLocal, Post, init_db
+from search_index import init_search_index, match_expression
+import main
+
+POSTS = {
+    "s-lobster": ("Lobster memory", "a lobster near the reef"),
+    "s-karma": ("Karma report", "karma and tokens"),
+    "s-cjk": ("龙虾记忆", "关于龙虾的长期记忆"),
+}
+
+
+def setup_module():
+    init_db()
+    init_search_index()
+    with SessionLocal() as db:
+        db.query(Post).delete()
+        db.add_all([Post(id=post_id, title=title, content=content) for post_id, (title, content) in POSTS.items()])
+        db.commit()
+        search_index.rebuild_index(db)
+        db.commit()
+
+
+def search(q):
+    # No context manager: entering it would run the app's lifespan and start the collector
+    response = TestClient(main.app).get("/api/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return {item["id"] for item in response.json()}
+
+
+def test_fts5_is_in_use():
+    assert search_index.backend == "sqlite"
+
+
+@pytest.mark.parametrize("q, hits", [
+    ("lobster", {"s-lobster"}),
+    ('"lobster', {"s-lobster"}),  # unbalanced quote
+    ('lob"ster"', set()),  # quotes split the word: "lob" and "ster" match nothing
+    ("lobster*", {"s-lobster"}),
+    ("NEAR(lobster reef)", {"s-lobster"}),  # operators are plain words; every word must match
+    ("lobster AND karma", set()),
+    ("-karma", {"s-karma"}),  # no exclusion syntax: the dash is dropped
+    ("karma:tokens", {"s-karma"}),  # no column filters either
+])
+def test_fts5_syntax_in_queries_is_taken_literally(q, hits):
+    assert search(q) == hits
+
+
+@pytest.mark.parametrize("q", ["龙虾", "龙", "虾记忆", "长期记忆"])
+def test_cjk_queries_match_on_bigrams(q):
+    assert search(q) == {"s-cjk"}
+
+
+def test_queries_without_indexable_terms_fall_back():
+    assert match_expression('*"-()') is None
+    # Handled by the ILIKE fallback instead of an FTS5 syntax error
+    search('*"-()')
+    search("   ")
@@ -0,0 +1,49 @@
+from sqlalchemy.exc import OperationalError
+
+import translation_cache
+from database import SessionLocal, TranslationMemo, init_db
+from translation_cache import TranslationCache
+
+
+def setup_function():
+    init_db()
+    with SessionLocal() as db:
+        db.query(TranslationMemo).delete()
+        db.commit()
+
+
+def fake_translate(text, lang):
+    return f"[{lang}] {text}"
+
+
+def test_translation_is_memoized_in_the_database():
+    TranslationCache().get_or_translate("hello", "zh-CN", fake_translate)
+    cache = TranslationCache()
+    assert cache.get_or_translate("hello", "zh-CN", lambda *_: None) == "[zh-CN] hello"
+    assert cache.stats()["db_hits"] == 1
+
+
+def test_failed_memo_write_is_counted(monkeypatch):
+    class LockedSession:
+        def __init__(self):
+            self.db = SessionLocal()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.db.close()
+
+        def merge(self, _):
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+        def rollback(self):
+            self.db.rollback()
+
+    monkeypatch.setattr(translation_cache, "SessionLocal", LockedSession)
+    cache = TranslationCache()
+    # The caller still gets its translation; only the memo is lost
+    assert cache.get_or_translate("hello", "zh-CN", fake_translate) == "[zh-CN] hello"
+    assert cache.stats()["write_failures"] == 1
+    with SessionLocal() as db:
+        assert db.query(TranslationMemo).count() == 0
@@ -0,0 +1,68 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database import SessionLocal, SyncState, TrendCount, PostTerm, init_db
+from trends import add_contribution, advance_windows, apply_deltas, extract_terms, index_post_terms, top_terms
+
+NOW = datetime(2026, 2, 10, 12, 0)
+
+
+def setup_function():
+    init_db()
+    with SessionLocal() as db:
+        db.query(TrendCount).delete()
+        db.query(PostTerm).delete()
+        # Ingest tests move the windows to the real clock; these tests start fresh at NOW
+        db.query(SyncState).filter(SyncState.key.like("trends_watermark:%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def counts(db, period="24h", scope="", ngram=1):
+    return dict(top_terms(db, period, scope, ngram, limit=100))
+
+
+def test_extract_terms_skips_stop_words_and_builds_bigrams():
+    terms = extract_terms("Lobster memory", "the lobster memory is about karma")
+    assert terms[("lobster", 1)] == 2
+    assert terms[("lobster memory", 2)] == 2
+    assert ("the", 1) not in terms
+    # A dropped word breaks the bigram chain
+    assert ("memory karma", 2) not in terms
+
+
+def test_add_contribution_respects_watermarks_and_scopes():
+    deltas = Counter()
+    watermarks = {"1h": NOW - timedelta(hours=1), "24h": NOW - timedelta(hours=24)}
+    add_contribution(deltas, Counter({("lobster", 1): 2}), "s1", NOW - timedelta(hours=3), watermarks, 1)
+    assert deltas == {("24h", "", 1, "lobster"): 2, ("24h", "s1", 1, "lobster"): 2}
+
+
+def test_apply_deltas_only_deletes_decremented_keys():
+    with SessionLocal() as db:
+        apply_deltas(db, Counter({("24h", "", 1, "lobster"): 2, ("24h", "", 1, "karma"): 1}))
+        # A row that isn't part of the next call stays, whatever its count
+        db.add(TrendCount(period="24h", scope="", ngram=1, term="stale", count=0))
+        db.flush()
+        apply_deltas(db, Counter({("24h", "", 1, "lobster"): -2, ("24h", "", 1, "karma"): -0}))
+        left = {row.term: row.count for row in db.query(TrendCount).all()}
+        db.rollback()
+    assert left == {"karma": 1, "stale": 0}
+
+
+def test_edit_and_age_out_keep_counts_exact():
+    post = {"id": "p1", "title": "Lobster memory", "content": "lobster karma", "submolt_id": "s1",
+            "created_at": NOW - timedelta(minutes=30)}
+    with SessionLocal() as db:
+        index_post_terms(db, [post], NOW)
+        assert counts(db, "1h") == {"lobster": 2, "memory": 1, "karma": 1}
+        assert counts(db, "1h", "s1") == counts(db, "1h")
+
+        index_post_terms(db, [{**post, "content": "oracle karma"}], NOW)
+        assert counts(db, "1h") == {"lobster": 1, "memory": 1, "oracle": 1, "karma": 1}
+
+        # Two hours on the post has left the 1h window but not the 24h one
+        advance_windows(db, NOW + timedelta(hours=2))
+        assert counts(db, "1h") == {}
+        assert counts(db, "24h") == {"lobster": 1, "memory": 1, "oracle": 1, "karma": 1}
+        assert db.query(TrendCount).filter(TrendCount.period == "1h").count() == 0
+        db.rollback()
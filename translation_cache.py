@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal, ReadSessionLocal, TranslationMemo
+from datetime import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+
+
+class TranslationCache:
+    """
+    Two-tier memo keyed by (sha256 of source text, target language):
+    an in-process LRU in front of the translation_memo table.
+    """
+
+    def __init__(self, capacity=TRANSLATION_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.chars_saved = 0
+        self.miss_seconds = 0.0
+        self.write_failures = 0
+
+    @staticmethod
+    def key(text, lang):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), lang
+
+    def get_lru(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put_lru(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def get_or_translate(self, text, lang, translate_fn):
+        """Return the memoized translation, calling translate_fn(text, lang) only on a miss."""
+        key = self.key(text, lang)
+
+        value = self.get_lru(key)
+        if value is not None:
+            with self.lock:
+                self.lru_hits += 1
+                self.chars_saved += len(text)
+            return value
+
+        with ReadSessionLocal() as db:
+            row = db.query(TranslationMemo.text).filter(
+                TranslationMemo.source_hash == key[0], TranslationMemo.lang == lang
+            ).first()
+        if row is not None:
+            self.put_lru(key, row[0])
+            with self.lock:
+                self.db_hits += 1
+                self.chars_saved += len(text)
+            return row[0]
+
+        started = time.perf_counter()
+        value = translate_fn(text, lang)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.misses += 1
+            self.miss_seconds += elapsed
+
+        # Failures raise above, so only real translations are stored. The write
+        # session is opened only now so no connection is held during the API call.
+        if value:
+            with SessionLocal() as db:
+                try:
+                    db.merge(TranslationMemo(source_hash=key[0], lang=lang, text=value, created_at=datetime.utcnow()))
+                    db.commit()
+                except IntegrityError as e:
+                    # Another worker stored the same text first; the value is equivalent
+                    logger.debug(f"Translation memo write skipped: {e}")
+                    db.rollback()
+                except Exception as e:
+                    # Not stored (e.g. the database is locked): the next lookup pays the translator again
+                    logger.warning(f"Translation memo write failed: {e}")
+                    db.rollback()
+                    with self.lock:
+                        self.write_failures += 1
+            self.put_lru(key, value)
+        return value
+
+    def stats(self):
+        with self.lock:
+            hits = self.lru_hits + self.db_hits
+            lookups = hits + self.misses
+            avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "lru_hits": self.lru_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "lru_size": len(self.entries),
+                "lru_capacity": self.capacity,
+                # API calls avoided and an estimate of the translator time they would have cost
+                "api_calls_saved": hits,
+                "chars_saved": self.chars_saved,
+                "seconds_saved_estimate": round(hits * avg_miss, 2),
+                # Translations that could not be memoized; non-zero means the memo isn't persisting
+                "write_failures": self.write_failures,
+            }
+
+
+translation_cache = TranslationCache()
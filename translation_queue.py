@@ -0,0 +1,288 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from database import SessionLocal, Post, Comment, Translation, TranslationJob, get_insert, bump_generation
+from translation_cache import translation_cache
+from search_index import index_posts
+import translator
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Column suffix -> GoogleTranslator target code
+LANGUAGE_TARGETS = {
+    "zh": "zh-CN",
+    "fr": "fr",
+    "ja": "ja",
+    "it": "it",
+    "ru": "ru",
+    "ko": "ko",
+    "es": "es",
+}
+
+# Comments are short and numerous, so only Chinese is queued for them
+COMMENT_LANGUAGES = ["zh"]
+
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "4"))
+TRANSLATION_RATE = float(os.getenv("TRANSLATION_RATE", "2"))  # requests per second across all workers
+TRANSLATION_BATCH = int(os.getenv("TRANSLATION_BATCH", "40"))
+TRANSLATION_MAX_ATTEMPTS = int(os.getenv("TRANSLATION_MAX_ATTEMPTS", "3"))
+# Jobs left 'running' by a crashed process go back to the queue after this long
+TRANSLATION_STALE_SECONDS = int(os.getenv("TRANSLATION_STALE_SECONDS", "300"))
+
+ENTITY_MODELS = {"post": Post, "comment": Comment}
+
+
+class RateLimiter:
+    """Token bucket shared by all worker threads."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = RateLimiter(TRANSLATION_RATE)
+executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS, thread_name_prefix="translate")
+# Only one drain pass at a time per process; a second trigger just returns
+drain_lock = threading.Lock()
+
+
+def enqueue_jobs(db: Session, rows):
+    """
+    Insert job rows that aren't queued yet (pending, running or failed) and
+    return how many were new. Does not commit.
+    """
+    if not rows:
+        return 0
+    queued = set()
+    for entity_type in {row["entity_type"] for row in rows}:
+        ids = {row["entity_id"] for row in rows if row["entity_type"] == entity_type}
+        queued.update((entity_type, *key) for key in load_job_keys(db, entity_type, ids))
+    new = {}
+    for row in rows:
+        key = (row["entity_type"], row["entity_id"], row["field"], row["lang"])
+        if key not in queued:
+            new.setdefault(key, row)
+    rows = list(new.values())
+    if not rows:
+        return 0
+
+    insert = get_insert(db)
+    if insert is None:
+        for row in rows:
+            db.add(TranslationJob(**row))
+        return len(rows)
+
+    stmt = insert(TranslationJob.__table__).on_conflict_do_nothing(
+        index_elements=["entity_type", "entity_id", "field", "lang"]
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def store_translations(db: Session, rows):
+    """Upsert translation rows ({entity_type, entity_id, field, lang, text}). Does not commit."""
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [{**row, "updated_at": now} for row in rows]
+    insert = get_insert(db)
+    if insert is None:
+        for row in rows:
+            db.merge(Translation(**row))
+        return len(rows)
+
+    stmt = insert(Translation.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["entity_type", "entity_id", "field", "lang"],
+        set_={"text": stmt.excluded.text, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt, rows)
+    # Translated text is searchable too
+    index_posts(db, [row["entity_id"] for row in rows if row["entity_type"] == "post"])
+    return len(rows)
+
+
+def load_translation_keys(db: Session, entity_type, ids, chunk_size=500):
+    """Set of (entity_id, field, lang) that already have a translation."""
+    ids = list(ids)
+    keys = set()
+    for i in range(0, len(ids), chunk_size):
+        keys.update(db.query(Translation.entity_id, Translation.field, Translation.lang).filter(
+            Translation.entity_type == entity_type, Translation.entity_id.in_(ids[i:i + chunk_size])
+        ).all())
+    return keys
+
+
+def load_job_keys(db: Session, entity_type, ids, chunk_size=500):
+    """Set of (entity_id, field, lang) that already have a job in the queue."""
+    ids = list(ids)
+    keys = set()
+    for i in range(0, len(ids), chunk_size):
+        keys.update(db.query(TranslationJob.entity_id, TranslationJob.field, TranslationJob.lang).filter(
+            TranslationJob.entity_type == entity_type, TranslationJob.entity_id.in_(ids[i:i + chunk_size])
+        ).all())
+    return keys
+
+
+def claim_jobs(db: Session, limit):
+    """Move up to `limit` pending jobs to 'running' and return them (Chinese first, then FIFO)."""
+    stale_before = datetime.utcnow() - timedelta(seconds=TRANSLATION_STALE_SECONDS)
+    db.query(TranslationJob).filter(
+        TranslationJob.state == "running", TranslationJob.updated_at < stale_before
+    ).update({"state": "pending"}, synchronize_session=False)
+
+    query = db.query(TranslationJob).filter(TranslationJob.state == "pending").order_by(
+        case((TranslationJob.lang == "zh", 0), else_=1), TranslationJob.id
+    ).limit(limit)
+    if db.get_bind().dialect.name == "postgresql":
+        # Let several processes drain the same queue without double-claiming
+        query = query.with_for_update(skip_locked=True)
+
+    jobs = query.all()
+    now = datetime.utcnow()
+    for job in jobs:
+        job.state = "running"
+        job.attempts = (job.attempts or 0) + 1
+        job.updated_at = now
+    db.commit()
+    return [(job.id, job.entity_type, job.entity_id, job.field, job.lang, job.attempts) for job in jobs]
+
+
+def load_sources(db: Session, jobs):
+    """Source text for every claimed job, one query per entity type: {(type, id, field): text}."""
+    sources = {}
+    for entity_type, model in ENTITY_MODELS.items():
+        ids = {job[2] for job in jobs if job[1] == entity_type}
+        if not ids:
+            continue
+        fields = sorted({job[3] for job in jobs if job[1] == entity_type})
+        rows = db.query(model.id, *[getattr(model, f) for f in fields]).filter(model.id.in_(ids)).all()
+        for row in rows:
+            for i, f in enumerate(fields):
+                sources[(entity_type, row[0], f)] = row[i + 1]
+    return sources
+
+
+def limited_translate(text, target_lang):
+    rate_limiter.acquire()
+    return translator.google_translate(text, target_lang)
+
+
+def run_job(text, lang):
+    # Memo hits skip the rate limiter; only real API calls spend tokens
+    return translation_cache.get_or_translate(text, LANGUAGE_TARGETS[lang], limited_translate)
+
+
+def drain_translation_queue(max_jobs=None):
+    """
+    Translate one batch of pending jobs on the worker pool and write the
+    results back. Returns the number of jobs finished (done or failed).
+    """
+    if not drain_lock.acquire(blocking=False):
+        return 0
+
+    db: Session = SessionLocal()
+    try:
+        jobs = claim_jobs(db, max_jobs or TRANSLATION_BATCH)
+        if not jobs:
+            return 0
+
+        started = time.perf_counter()
+        futures = []
+        submitted = {}
+        dropped = []
+        sources = load_sources(db, jobs)
+        # Give the connection back while the translator runs; on SQLite the workers'
+        # memo writes go through the same single writer connection
+        db.commit()
+        for job_id, entity_type, entity_id, field, lang, attempts in jobs:
+            text = sources.get((entity_type, entity_id, field))
+            if not text:
+                # Entity was pruned (or has no text) since it was queued
+                dropped.append(job_id)
+                continue
+            # Identical texts in one batch (heartbeats, "Ack.") share a single call
+            if (text, lang) not in submitted:
+                submitted[(text, lang)] = executor.submit(run_job, text, lang)
+            futures.append((submitted[(text, lang)], (job_id, entity_type, entity_id, field, lang, attempts)))
+
+        # Wait for every call before writing: workers store memo rows, and on SQLite
+        # holding the write lock here while they run would stall them on busy timeouts
+        results = []
+        for future, job in futures:
+            try:
+                results.append((job, future.result(), None))
+            except Exception as e:
+                results.append((job, None, e))
+
+        done = failed = 0
+        finished = []
+        translations = []
+        now = datetime.utcnow()
+        for (job_id, entity_type, entity_id, field, lang, attempts), translated, e in results:
+            if e is not None:
+                state = "failed" if attempts >= TRANSLATION_MAX_ATTEMPTS else "pending"
+                db.query(TranslationJob).filter(TranslationJob.id == job_id).update(
+                    {"state": state, "last_error": str(e)[:500], "updated_at": now}, synchronize_session=False
+                )
+                failed += 1
+                continue
+
+            translations.append({
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "field": field,
+                "lang": lang,
+                "text": translated,
+            })
+            # The filled column is what stops re-enqueueing, so finished jobs need not be kept
+            finished.append(job_id)
+            done += 1
+
+        if store_translations(db, translations):
+            # Translated titles show up in cached aggregates (leaderboard)
+            bump_generation(db)
+        if finished or dropped:
+            db.query(TranslationJob).filter(TranslationJob.id.in_(finished + dropped)).delete(synchronize_session=False)
+        db.commit()
+
+        logger.info(
+            f"Translation queue: {done} done, {failed} failed, {len(dropped)} dropped "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return done + failed
+    except Exception as e:
+        logger.error(f"Translation queue error: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+        drain_lock.release()
+
+
+def queue_stats(db: Session):
+    """Job counts per state, e.g. {'pending': 120, 'running': 8, 'failed': 2}."""
+    return dict(db.query(TranslationJob.state, func.count(TranslationJob.id)).group_by(TranslationJob.state).all())
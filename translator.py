@@ -0,0 +1,31 @@
+from deep_translator import GoogleTranslator
+from translation_cache import translation_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Free endpoints reject long payloads, so clip before sending
+MAX_TRANSLATE_CHARS = 4500
+
+
+def google_translate(text, target_lang):
+    if len(text) > MAX_TRANSLATE_CHARS:
+        text = text[:MAX_TRANSLATE_CHARS]
+    return GoogleTranslator(source='auto', target=target_lang).translate(text)
+
+
+def translate(text, target_lang='zh-CN'):
+    """Translate through the shared memo. Raises on failure so callers can retry."""
+    return translation_cache.get_or_translate(text, target_lang, google_translate)
+
+
+def translate_text(text, target_lang='zh-CN'):
+    if not text:
+        return None
+
+    try:
+        return translate(text, target_lang)
+    except Exception as e:
+        # Free translation often fails in cloud due to IP rate limits; never block on it
+        logger.warning(f"Translation error ({target_lang}): {e}")
+        return text # Fallback to original
@@ -0,0 +1,254 @@
+from sqlalchemy import func, insert as sql_insert, tuple_
+from sqlalchemy.orm import Session
+from collections import Counter
+from database import Post, PostTerm, TrendCount, get_insert, get_state, set_state
+from search_index import CJK_RUN, segment
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+TREND_WINDOWS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+}
+GLOBAL_SCOPE = ""
+CHUNK_SIZE = 500
+
+# Common stop words
+STOP_WORDS = {
+    "the", "a", "an", "in", "to", "of", "and", "is", "it", "that", "for", "on", "with", "as", "this", "be", "are", "from", "at", "or", "by", "not", "but", "what", "all", "were", "we", "when", "your", "can", "said", "there", "use", "do", "how", "post", "deleted", "removed", "just", "have", "like", "so", "if", "my", "me", "about", "out", "up", "has", "was", "will", "they", "one", "some", "would", "get", "more", "who", "which", "time", "people", "don", "know", "think"
+}
+
+
+def naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def keep_word(word):
+    if CJK_RUN.fullmatch(word):
+        return True
+    return word not in STOP_WORDS and len(word) > 3 and not word.isdigit()
+
+
+def extract_terms(title, content):
+    """
+    Counter of (term, ngram) for one post. Words follow the old trends rules;
+    bigrams are adjacent kept words, and CJK runs count as character bigrams.
+    """
+    terms = Counter()
+    for text in (title, content):
+        previous = None
+        for word in segment(text):
+            if not keep_word(word):
+                previous = None
+                continue
+            terms[(word, 1)] += 1
+            if CJK_RUN.fullmatch(word):
+                previous = None
+                continue
+            if previous is not None:
+                terms[(f"{previous} {word}", 2)] += 1
+            previous = word
+    return terms
+
+
+def watermark_key(period):
+    return f"trends_watermark:{period}"
+
+
+def load_watermarks(db: Session, now):
+    """
+    Per-window cutoff: a window counts exactly the indexed posts created at or
+    after its watermark. A fresh window starts at now - span.
+    """
+    watermarks = {}
+    for period, span in TREND_WINDOWS.items():
+        value = get_state(db, watermark_key(period))
+        if value is None:
+            watermarks[period] = now - span
+            set_state(db, watermark_key(period), watermarks[period].isoformat())
+        else:
+            watermarks[period] = datetime.fromisoformat(value)
+    return watermarks
+
+
+def add_contribution(deltas, terms, submolt_id, created_at, watermarks, sign):
+    if created_at is None:
+        return
+    scopes = [GLOBAL_SCOPE] + ([submolt_id] if submolt_id else [])
+    for period, watermark in watermarks.items():
+        if created_at < watermark:
+            continue
+        for scope in scopes:
+            for (term, ngram), count in terms.items():
+                deltas[(period, scope, ngram, term)] += sign * count
+
+
+def apply_deltas(db: Session, deltas):
+    """Add signed deltas to trend_counts and drop terms that reach zero. Does not commit."""
+    rows = [{"period": period, "scope": scope, "ngram": ngram, "term": term, "count": delta}
+            for (period, scope, ngram, term), delta in deltas.items() if delta]
+    if not rows:
+        return 0
+
+    insert = get_insert(db)
+    if insert is None:
+        for row in rows:
+            key = (row["period"], row["scope"], row["ngram"], row["term"])
+            existing = db.get(TrendCount, key)
+            if existing is None:
+                db.add(TrendCount(**row))
+            else:
+                existing.count += row["count"]
+        db.flush()
+    else:
+        table = TrendCount.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period", "scope", "ngram", "term"],
+            set_={"count": table.c.count + stmt.excluded.count},
+        )
+        db.execute(stmt, rows)
+
+    # Only keys this call decremented can have reached zero; a count <= 0 sweep would scan the whole table
+    key = tuple_(TrendCount.period, TrendCount.scope, TrendCount.ngram, TrendCount.term)
+    decremented = [k for k, delta in deltas.items() if delta < 0]
+    for i in range(0, len(decremented), CHUNK_SIZE):
+        db.query(TrendCount).filter(key.in_(decremented[i:i + CHUNK_SIZE]), TrendCount.count <= 0).delete(
+            synchronize_session=False)
+    return len(rows)
+
+
+def load_post_terms(db: Session, post_ids):
+    """{post_id: (Counter, submolt_id, created_at)} as currently indexed."""
+    found = {}
+    for i in range(0, len(post_ids), CHUNK_SIZE):
+        chunk = post_ids[i:i + CHUNK_SIZE]
+        rows = db.query(PostTerm.post_id, PostTerm.term, PostTerm.ngram, PostTerm.count,
+                        PostTerm.submolt_id, PostTerm.created_at).filter(PostTerm.post_id.in_(chunk)).all()
+        for post_id, term, ngram, count, submolt_id, created_at in rows:
+            terms, _, _ = found.setdefault(post_id, (Counter(), submolt_id, created_at))
+            terms[(term, ngram)] = count
+    return found
+
+
+def index_post_terms(db: Session, posts, now=None):
+    """
+    Count terms for new or changed post rows (ingest dicts) and fold the
+    difference into every window the post falls in. Posts whose text,
+    submolt and date are unchanged cost nothing. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    watermarks = load_watermarks(db, now)
+    post_ids = [p["id"] for p in posts]
+    old = load_post_terms(db, post_ids)
+
+    deltas = Counter()
+    replaced = []
+    new_rows = []
+    for p in posts:
+        terms = extract_terms(p.get("title"), p.get("content"))
+        created_at = naive_utc(p.get("created_at"))
+        submolt_id = p.get("submolt_id")
+        previous = old.get(p["id"])
+        if previous is not None:
+            if previous == (terms, submolt_id, created_at):
+                continue
+            add_contribution(deltas, previous[0], previous[1], previous[2], watermarks, -1)
+            replaced.append(p["id"])
+        add_contribution(deltas, terms, submolt_id, created_at, watermarks, 1)
+        new_rows.extend({
+            "post_id": p["id"], "term": term, "ngram": ngram, "count": count,
+            "submolt_id": submolt_id, "created_at": created_at,
+        } for (term, ngram), count in terms.items())
+
+    for i in range(0, len(replaced), CHUNK_SIZE):
+        db.query(PostTerm).filter(PostTerm.post_id.in_(replaced[i:i + CHUNK_SIZE])).delete(synchronize_session=False)
+    if new_rows:
+        db.execute(sql_insert(PostTerm.__table__), new_rows)
+    return apply_deltas(db, deltas)
+
+
+def subtract_where(db: Session, deltas, period, *criteria):
+    """Queue the subtraction of every post_terms row matching criteria from one window."""
+    rows = db.query(
+        PostTerm.term, PostTerm.ngram, PostTerm.submolt_id, func.sum(PostTerm.count)
+    ).filter(*criteria).group_by(PostTerm.term, PostTerm.ngram, PostTerm.submolt_id).all()
+    for term, ngram, submolt_id, count in rows:
+        deltas[(period, GLOBAL_SCOPE, ngram, term)] -= count
+        if submolt_id:
+            deltas[(period, submolt_id, ngram, term)] -= count
+
+
+def advance_windows(db: Session, now=None):
+    """Age posts out of each window by moving its watermark up to now - span. Does not commit."""
+    now = now or datetime.utcnow()
+    watermarks = load_watermarks(db, now)
+    deltas = Counter()
+    for period, span in TREND_WINDOWS.items():
+        cutoff = now - span
+        if cutoff <= watermarks[period]:
+            continue
+        subtract_where(db, deltas, period,
+                       PostTerm.created_at >= watermarks[period], PostTerm.created_at < cutoff)
+        set_state(db, watermark_key(period), cutoff.isoformat())
+    return apply_deltas(db, deltas)
+
+
+def forget_terms(db: Session, condition, now=None):
+    """Subtract the post_terms rows matching condition from every window, then delete them."""
+    now = now or datetime.utcnow()
+    watermarks = load_watermarks(db, now)
+    deltas = Counter()
+    for period, watermark in watermarks.items():
+        subtract_where(db, deltas, period, condition, PostTerm.created_at >= watermark)
+    changed = apply_deltas(db, deltas)
+    db.query(PostTerm).filter(condition).delete(synchronize_session=False)
+    return changed
+
+
+def prune_post_terms(db: Session, now=None):
+    """Subtract and forget posts that were deleted from the posts table. Does not commit."""
+    return forget_terms(db, PostTerm.post_id.notin_(db.query(Post.id)), now)
+
+
+def remove_post_terms(db: Session, post_ids, now=None):
+    """Subtract and forget the given (deleted) posts. Does not commit."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return False
+    return forget_terms(db, PostTerm.post_id.in_(post_ids), now)
+
+
+def rebuild_trends(db: Session, now=None):
+    """Recount every window from the posts table. Does not commit."""
+    now = now or datetime.utcnow()
+    db.query(TrendCount).delete(synchronize_session=False)
+    db.query(PostTerm).delete(synchronize_session=False)
+    for period, span in TREND_WINDOWS.items():
+        set_state(db, watermark_key(period), (now - span).isoformat())
+
+    posts = [{"id": id, "title": title, "content": content, "submolt_id": submolt_id, "created_at": created_at}
+             for id, title, content, submolt_id, created_at in
+             db.query(Post.id, Post.title, Post.content, Post.submolt_id, Post.created_at).all()]
+    index_post_terms(db, posts, now=now)
+    return len(posts)
+
+
+def init_trends(db: Session):
+    """Backfill the trend tables for databases that predate them."""
+    if db.query(PostTerm.post_id).first() is None and db.query(Post.id).first() is not None:
+        count = rebuild_trends(db)
+        db.commit()
+        logger.info(f"Trend counters backfilled from {count} posts")
+
+
+def top_terms(db: Session, period, scope=GLOBAL_SCOPE, ngram=1, limit=10):
+    """[(term, count)] best first; an index range scan whatever the window size."""
+    return db.query(TrendCount.term, TrendCount.count).filter(
+        TrendCount.period == period, TrendCount.scope == scope, TrendCount.ngram == ngram
+    ).order_by(TrendCount.count.desc(), TrendCount.term).limit(limit).all()